@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Measure what index.html costs to load and check it against the budgets.
+
+The page is parsed and every resource it makes the browser fetch is
+resolved to a local file: stylesheets, scripts, images (the candidate a
+<picture>/srcset would most likely pick), icons, the web app manifest and
+its icons, preloads, and url(...) in inline CSS. For each one, and per
+type, the report gives raw, gzip and brotli sizes. It also lists the
+request count, the render-blocking resources and the critical-path
+estimate: the bytes that must arrive before first render (the document
+plus blocking CSS/JS, compressed as served).
+
+Third-party resources are counted as requests but their sizes are
+unknown, since nothing is fetched from the network.
+
+Budgets:
+    - Every image file (including all srcset candidates) against the
+      per-type limits in the Quick Reference table of docs/IMAGES.md
+    - The critical path (default 14 KB, one round trip of TCP slow start)
+    - Optionally total transfer size and request count
+
+Exits with 1 when a budget is exceeded or a referenced file is missing,
+so it can guard a deploy; the files build.py lists as PENDING_FILES only
+warn. Run it on dist/index.html to measure the built
+page.
+
+Usage:
+    python analyze_page.py [index.html] [--json] [-o REPORT.json] [--budgets docs/IMAGES.md]
+                           [--max-critical-bytes N] [--max-total-bytes N] [--max-requests N]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from urllib.parse import urlsplit
+
+from build import is_pending, resolve, site_origins
+from html_assets import CSS_URL, parse_html
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_BUDGETS_DOC = 'docs/IMAGES.md'
+
+# Rows of the docs/IMAGES.md Quick Reference table -> budget names (the
+# same names optimize_image.py --budget uses)
+BUDGET_ROWS = {
+    'profile images': 'profile',
+    'open graph (social)': 'og',
+    'content images': 'content',
+    'icons & logos': 'icon',
+    'screenshots': 'screenshot',
+}
+
+# 10 TCP segments: what the server can send in the first round trip
+DEFAULT_CRITICAL_BUDGET = 14 * 1024
+
+# Resource types by file extension
+RESOURCE_TYPES = {
+    '.html': 'html', '.htm': 'html',
+    '.css': 'css',
+    '.js': 'js', '.mjs': 'js',
+    '.avif': 'image', '.gif': 'image', '.ico': 'image', '.jpeg': 'image', '.jpg': 'image',
+    '.png': 'image', '.svg': 'image', '.webp': 'image',
+    '.otf': 'font', '.ttf': 'font', '.woff': 'font', '.woff2': 'font',
+    '.json': 'manifest', '.webmanifest': 'manifest',
+}
+
+# <link rel=preload as=...> values -> resource types
+PRELOAD_TYPES = {'style': 'css', 'script': 'js', 'font': 'font', 'image': 'image', 'fetch': 'other'}
+
+# Types the server compresses on the fly (the rest are sent as stored)
+COMPRESSED_TYPES = ('html', 'css', 'js', 'manifest')
+
+
+def load_budgets(path):
+    """
+    Read the per-type image budgets from the Quick Reference table.
+
+    Returns:
+        Dict of budget name -> bytes
+    """
+    budgets = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            cells = [cell.strip().strip('*').strip() for cell in line.strip().strip('|').split('|')]
+            if len(cells) < 2:
+                continue
+            name = BUDGET_ROWS.get(cells[0].lower())
+            size = re.fullmatch(r'([\d.]+)\s*(KB|MB)', cells[1], re.I)
+            if name and size:
+                budgets[name] = int(float(size.group(1)) * (1024 if size.group(2).upper() == 'KB' else 1024 * 1024))
+    return budgets
+
+
+def compressed_sizes(data):
+    """
+    Return (gzip, brotli) sizes of data; brotli is None without the module.
+    """
+    gz = len(gzip.compress(data, compresslevel=9, mtime=0))
+    br = len(brotli.compress(data, quality=11)) if brotli is not None else None
+    return gz, br
+
+
+def resource_type(url, default='other'):
+    """
+    Guess a resource's type from the extension of its URL.
+    """
+    return RESOURCE_TYPES.get(os.path.splitext(urlsplit(url).path)[1].lower(), default)
+
+
+def _largest_candidate(srcset):
+    candidates = []
+    for candidate in srcset.split(','):
+        parts = candidate.split()
+        if parts:
+            descriptor = parts[1] if len(parts) > 1 else '1x'
+            candidates.append((float(descriptor[:-1] or 0) if descriptor[-1] in 'wx' else 0, parts[0]))
+    return max(candidates)[1] if candidates else None
+
+
+def _all_candidates(srcset):
+    return [candidate.split()[0] for candidate in srcset.split(',') if candidate.strip()]
+
+
+def page_resources(source):
+    """
+    List the resources a page makes the browser fetch.
+
+    Returns:
+        List of dicts with 'url', 'type', 'blocking' (delays first render),
+        'lazy' (fetched after load or on demand), 'category' (image budget
+        name or None) and 'alternates' (other srcset files, not fetched
+        but budget-checked)
+    """
+    document = parse_html(source)
+    resources = []
+
+    def add(url, type_=None, blocking=False, lazy=False, category=None, alternates=()):
+        if url and not url.startswith('data:'):
+            resources.append({'url': url, 'type': type_ or resource_type(url), 'blocking': blocking,
+                              'lazy': lazy, 'category': category, 'alternates': list(alternates)})
+
+    picture_sources = []
+    for tag in document.tags:
+        rel = (tag.attrs.get('rel') or '').lower().split()
+        if tag.name == 'link' and tag.attrs.get('href'):
+            href = tag.attrs['href']
+            media = (tag.attrs.get('media') or 'all').lower()
+            if 'stylesheet' in rel:
+                add(href, 'css', blocking=media in ('all', 'screen') or 'screen' in media)
+            elif 'icon' in rel or 'apple-touch-icon' in rel:
+                add(href, 'image', lazy='apple-touch-icon' in rel, category='icon')
+            elif 'manifest' in rel:
+                add(href, 'manifest', lazy=True)
+            elif 'preload' in rel or 'modulepreload' in rel:
+                add(href, PRELOAD_TYPES.get(tag.attrs.get('as')))
+        elif tag.name == 'script' and tag.attrs.get('src'):
+            deferred = 'async' in tag.attrs or 'defer' in tag.attrs or tag.attrs.get('type') == 'module'
+            add(tag.attrs['src'], 'js', blocking='head' in tag.ancestors and not deferred)
+        elif tag.name == 'picture':
+            picture_sources = []
+        elif tag.name == 'source' and 'picture' in tag.ancestors and tag.attrs.get('srcset'):
+            picture_sources.append(tag)
+        elif tag.name == 'img':
+            category = 'profile' if 'profile' in (tag.attrs.get('class') or '') + (tag.attrs.get('src') or '') \
+                else 'content'
+            lazy = tag.attrs.get('loading') == 'lazy'
+            # The browser takes the first <source> it supports (modern
+            # formats come first) and, on a wide or dense screen, its
+            # largest candidate; the other files are only budget-checked
+            sources = picture_sources if 'picture' in tag.ancestors else []
+            alternates = [url for source in sources for url in _all_candidates(source.attrs['srcset'])]
+            if tag.attrs.get('srcset'):
+                alternates += _all_candidates(tag.attrs['srcset'])
+            if tag.attrs.get('src'):
+                alternates.append(tag.attrs['src'])
+            first = sources[0].attrs['srcset'] if sources else tag.attrs.get('srcset')
+            fetched = _largest_candidate(first) if first else tag.attrs.get('src')
+            add(fetched, 'image', lazy=lazy, category=category,
+                alternates=[url for url in dict.fromkeys(alternates) if url != fetched])
+        elif tag.name == 'iframe' and tag.attrs.get('src'):
+            add(tag.attrs['src'], 'html', lazy='srcdoc' in tag.attrs or tag.attrs.get('loading') == 'lazy')
+        elif tag.name == 'meta' and tag.attrs.get('property', tag.attrs.get('name')) in ('og:image', 'twitter:image'):
+            # Fetched by link-preview crawlers, not by visitors
+            add(tag.attrs.get('content'), 'image', lazy=True, category='og')
+
+        if tag.name == 'style':
+            for match in CSS_URL.finditer(tag.inner(source)):
+                add(match.group(2))
+        elif tag.attrs.get('style'):
+            for match in CSS_URL.finditer(tag.attrs['style']):
+                add(match.group(2))
+    return resources
+
+
+def analyze(page, budgets, critical_budget=DEFAULT_CRITICAL_BUDGET, total_budget=None, request_budget=None):
+    """
+    Analyze a page and check it against the budgets.
+
+    Args:
+        page: HTML file
+        budgets: Dict of image budget name -> bytes (see load_budgets())
+        critical_budget: Limit for the critical-path bytes, or None
+        total_budget: Limit for the total transfer size, or None
+        request_budget: Limit for the number of requests, or None
+
+    Returns:
+        Report dict: request counts, total transfer, per-type sizes (of
+        what visitors fetch), crawler-only link-preview images,
+        critical-path bytes, render-blocking resources, every resource,
+        the budget checks and a list of 'violations' (empty when
+        everything is within budget)
+    """
+    site_root = os.path.dirname(page) or '.'
+    with open(page, 'rb') as f:
+        html_bytes = f.read()
+    source = html_bytes.decode('utf-8')
+    origins = site_origins(site_root)
+
+    sizes = {}
+
+    def measure(path):
+        if path not in sizes:
+            with open(path, 'rb') as f:
+                data = f.read()
+            sizes[path] = (len(data),) + compressed_sizes(data)
+        return sizes[path]
+
+    raw, gz, br = measure(page)
+    entries = [{'url': os.path.basename(page), 'type': 'html', 'blocking': True, 'lazy': False,
+                'category': None, 'alternates': [], 'path': page, 'bytes': raw, 'gzip': gz, 'brotli': br,
+                'external': False}]
+    missing = []
+    pending = []
+    checked = []
+
+    def note_missing(url, path):
+        # Files that are known not to be committed yet only warn
+        (pending if is_pending(path, site_root) else missing).append(url)
+
+    resources = page_resources(source)
+    # Follow the web app manifest to the icons it lists
+    for resource in list(resources):
+        path = resolve(resource['url'], site_root, origins)
+        if resource['type'] == 'manifest' and path and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for icon in manifest.get('icons', []):
+                resources.append({'url': icon['src'], 'type': 'image', 'blocking': False, 'lazy': True,
+                                  'category': 'icon', 'alternates': []})
+
+    seen = set()
+    for resource in resources:
+        path = resolve(resource['url'], site_root, origins)
+        # One file is one request however it is spelled (relative, root-
+        # relative or absolute); crawler-only fetches are counted apart
+        key = (resource['category'] == 'og', os.path.normpath(path) if path is not None else resource['url'])
+        if key in seen:
+            continue
+        seen.add(key)
+        entry = dict(resource, path=path, bytes=None, gzip=None, brotli=None, external=path is None)
+        if path is not None:
+            if not os.path.isfile(path):
+                note_missing(resource['url'], path)
+                continue
+            entry['bytes'], entry['gzip'], entry['brotli'] = measure(path)
+        entries.append(entry)
+
+        # Budget-check the fetched file and every srcset alternative
+        if resource['category'] and resource['category'] in budgets:
+            for url in [resource['url']] + resource['alternates']:
+                candidate = resolve(url, site_root, origins)
+                if candidate is None:
+                    continue
+                if not os.path.isfile(candidate):
+                    note_missing(url, candidate)
+                    continue
+                checked.append({'url': url, 'category': resource['category'],
+                                'bytes': measure(candidate)[0], 'limit': budgets[resource['category']]})
+
+    def transfer(entry):
+        if entry['bytes'] is None:
+            return 0
+        return entry['gzip'] if entry['type'] in COMPRESSED_TYPES else entry['bytes']
+
+    requests = [entry for entry in entries if entry['category'] != 'og']
+    by_type = {}
+    for entry in requests:
+        if entry['external']:
+            continue
+        totals = by_type.setdefault(entry['type'], {'count': 0, 'bytes': 0, 'gzip': 0, 'brotli': 0, 'transfer': 0})
+        totals['count'] += 1
+        totals['bytes'] += entry['bytes']
+        totals['gzip'] += entry['gzip']
+        totals['brotli'] = None if entry['brotli'] is None or totals['brotli'] is None \
+            else totals['brotli'] + entry['brotli']
+        totals['transfer'] += transfer(entry)
+
+    blocking = [entry for entry in entries if entry['blocking']]
+    critical = sum(transfer(entry) for entry in blocking)
+    total_transfer = sum(transfer(entry) for entry in requests)
+
+    violations = []
+    for url in dict.fromkeys(missing):
+        violations.append(f"{url} is referenced but does not exist")
+    for check in checked:
+        if check['bytes'] > check['limit']:
+            violations.append(f"{check['url']} is {check['bytes']:,} bytes, over the {check['category']} "
+                              f"budget of {check['limit']:,}")
+    if critical_budget is not None and critical > critical_budget:
+        violations.append(f"critical path is {critical:,} bytes, over the budget of {critical_budget:,}")
+    if total_budget is not None and total_transfer > total_budget:
+        violations.append(f"total transfer is {total_transfer:,} bytes, over the budget of {total_budget:,}")
+    if request_budget is not None and len(requests) > request_budget:
+        violations.append(f"{len(requests)} requests, over the budget of {request_budget}")
+
+    return {
+        'page': page,
+        'requests': len(requests),
+        'external_requests': sum(1 for entry in requests if entry['external']),
+        'total_transfer': total_transfer,
+        'by_type': by_type,
+        'critical_path_bytes': critical,
+        'link_previews': [{'url': entry['url'], 'bytes': entry['bytes'], 'external': entry['external']}
+                          for entry in entries if entry['category'] == 'og'],
+        'render_blocking': [{'url': entry['url'], 'type': entry['type'], 'external': entry['external'],
+                             'transfer': transfer(entry) if not entry['external'] else None}
+                            for entry in blocking],
+        'resources': [{key: entry[key] for key in ('url', 'type', 'bytes', 'gzip', 'brotli', 'blocking', 'lazy',
+                                                   'external')} for entry in entries],
+        'budgets': [dict(check, ok=check['bytes'] <= check['limit']) for check in checked],
+        'pending': list(dict.fromkeys(pending)),
+        'violations': violations,
+    }
+
+
+def _kb(size):
+    return '-' if size is None else f"{size / 1024:.1f} KB"
+
+
+def print_report(report):
+    """
+    Print a report in the human-readable format.
+    """
+    print(f"Page: {report['page']}")
+    print(f"  {'type':<10} {'count':>5} {'raw':>10} {'gzip':>10} {'brotli':>10} {'transfer':>10}")
+    for type_, totals in sorted(report['by_type'].items()):
+        print(f"  {type_:<10} {totals['count']:>5} {_kb(totals['bytes']):>10} {_kb(totals['gzip']):>10} "
+              f"{_kb(totals['brotli']):>10} {_kb(totals['transfer']):>10}")
+    print(f"Requests: {report['requests']} ({report['external_requests']} third-party, size unknown)")
+    print(f"Total transfer (local): {_kb(report['total_transfer'])}")
+    for entry in report['link_previews']:
+        note = 'third-party' if entry['external'] else _kb(entry['bytes'])
+        print(f"  link-preview image (crawlers only): {entry['url']} ({note})")
+    print(f"Critical path: {_kb(report['critical_path_bytes'])}")
+    for entry in report['render_blocking']:
+        note = 'third-party' if entry['external'] else _kb(entry['transfer'])
+        print(f"  render-blocking {entry['type']}: {entry['url']} ({note})")
+    for check in report['budgets']:
+        mark = '✓' if check['ok'] else '✗'
+        print(f"{mark} {check['url']}: {_kb(check['bytes'])} of {_kb(check['limit'])} ({check['category']})")
+    for url in report['pending']:
+        print(f"⚠ {url} is referenced but not committed yet", file=sys.stderr)
+    for violation in report['violations']:
+        print(f"✗ {violation}", file=sys.stderr)
+    if not report['violations']:
+        print("✓ Page is within budget")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report page weight and critical path, and check budgets")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('-o', '--output', help="also write the JSON report to this file")
+    parser.add_argument('--budgets', default=DEFAULT_BUDGETS_DOC,
+                        help=f"document with the image budget table (default {DEFAULT_BUDGETS_DOC})")
+    parser.add_argument('--max-critical-bytes', type=int, default=DEFAULT_CRITICAL_BUDGET,
+                        help=f"critical-path budget in bytes, 0 to disable (default {DEFAULT_CRITICAL_BUDGET})")
+    parser.add_argument('--max-total-bytes', type=int, help="total transfer budget in bytes")
+    parser.add_argument('--max-requests', type=int, help="request count budget")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"✗ {args.input} not found", file=sys.stderr)
+        return 1
+    budgets = load_budgets(args.budgets) if os.path.exists(args.budgets) else {}
+    if not budgets:
+        print(f"⚠ No image budgets found in {args.budgets}", file=sys.stderr)
+
+    report = analyze(args.input, budgets, args.max_critical_bytes or None, args.max_total_bytes, args.max_requests)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if brotli is None and not args.json:
+        print("⚠ brotli is not installed (pip install brotli), brotli sizes omitted", file=sys.stderr)
+    return 1 if report['violations'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
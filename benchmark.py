@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PNG encoder, the icon generators and the image optimizer.
+
+Every case runs locally on synthetic input, so results don't depend on the
+network or on the images in the repository:
+
+    create_png/<input>/<size>           default options, 16 up to 2048 px
+    create_png/<input>/256/<option>     each filter strategy, palette and
+                                        quantizer mode and zlib level
+    create_favicon/<size>, create_apple_touch_icon
+    optimize_image/<input>/<size>       JPEG at the default settings
+    optimize_image/photo/1024/<option>  each JPEG option, PNG output and a
+                                        byte budget
+
+<input> is 'photo' (smooth gradients with sensor-like noise, more colors
+than a palette holds) or 'flat' (a few solid color bands, like a logo).
+
+For each case the suite records the best wall time of --repeat runs, the
+peak memory of one run under tracemalloc (Python allocations only; Pillow's
+own buffers are not traced) and the size of the output. Each time is also
+stored relative to a fixed calibration workload (a Python loop over bytes
+plus zlib), timed before the first case and again after every case with
+the fastest run kept, so the baseline describes how fast a case is
+compared with the machine rather than in seconds.
+
+The results are compared with the baseline file: a case regresses when it
+is more than --threshold slower (its relative time scaled to this
+machine's calibration) or more memory hungry, or when its output grows at
+all. When the Python version, architecture, Pillow version or rasterizer
+differ from the baseline's, the ratios between cases shift too, so the
+timing comparison is skipped with a warning and only memory and output
+sizes are checked. Refresh the baseline with --update-baseline after an
+intended change.
+
+With --check, exits with 1 if any case regressed; otherwise regressions
+are only reported.
+
+Usage:
+    python benchmark.py [--quick] [--filter PATTERN] [--repeat N] [--threshold 0.25] [--check]
+                        [--baseline benchmark-baseline.json] [--update-baseline] [--json] [-o FILE]
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from functools import lru_cache
+
+import png_encoder
+from build_cache import write_if_changed
+from generate_apple_icon import create_apple_touch_icon
+from generate_png_favicons import create_favicon
+from png_encoder import FILTER_STRATEGIES, create_png
+from rasterizer import default_backend
+
+try:
+    import PIL
+    from PIL import Image
+    from optimize_image import optimize_image
+except ImportError:
+    PIL = None  # optimize_image cases are skipped
+
+DEFAULT_BASELINE = 'benchmark-baseline.json'
+
+PNG_SIZES = (16, 64, 256, 1024, 2048)
+OPTIMIZE_SIZES = (256, 1024, 2048)
+FAVICON_SIZES = (16, 32, 48, 64)
+QUICK_MAX_SIZE = 256
+OPTIONS_SIZE = 256
+OPTIMIZE_OPTIONS_SIZE = 1024
+
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_SLOWDOWN_SECONDS = 0.002
+
+# A case that takes longer than this is timed once instead of --repeat times
+LONG_RUN_SECONDS = 2.0
+
+# Calibration workload: input size and number of timed rounds (best kept)
+CALIBRATION_SIZE = 256
+CALIBRATION_ROUNDS = 5
+
+# Environment entries that change how fast cases are relative to each
+# other; the timing comparison is skipped when one differs
+TIMING_ENVIRONMENT = ('python', 'machine', 'pillow', 'rasterizer')
+
+INPUTS = ('photo', 'flat')
+
+# Solid colors of the 'flat' input, from the site palette
+FLAT_COLORS = (
+    (54, 188, 171), (255, 255, 255), (85, 85, 85), (221, 221, 221), (52, 152, 219), (41, 128, 185),
+)
+
+
+@lru_cache(maxsize=None)
+def synthetic_pixels(kind, size):
+    """
+    Return a deterministic size x size image as packed RGB bytes.
+
+    Args:
+        kind: 'photo' or 'flat'
+        size: Width and height in pixels
+    """
+    if kind == 'flat':
+        # Horizontal bands, each split into two colors down the middle
+        count = len(FLAT_COLORS)
+        half = size // 2
+        rows = []
+        for y in range(size):
+            band = y * count // size
+            left, right = bytes(FLAT_COLORS[band]), bytes(FLAT_COLORS[(band + count // 2) % count])
+            rows.append(left * half + right * (size - half))
+        return b''.join(rows)
+
+    # Gradients in every channel (scaled to leave headroom for the noise)
+    # plus 4 bits of uniform noise, seeded so every run encodes the same bytes
+    rnd = random.Random(size)
+    noise_table = bytes(value & 15 for value in range(256))
+    rows = []
+    for y in range(size):
+        gradient = bytearray()
+        for x in range(size):
+            gradient += bytes((x * 240 // size, y * 240 // size, (x + y) * 120 // size))
+        noise = rnd.randbytes(size * 3).translate(noise_table)
+        rows.append(bytes(a + b for a, b in zip(gradient, noise)))
+    return b''.join(rows)
+
+
+def _png_case(kind, size, **options):
+    pixels = synthetic_pixels(kind, size)
+    return lambda: len(create_png(size, size, pixels, **options))
+
+
+def _optimize_case(workdir, kind, size, output_ext='.jpg', **options):
+    source = os.path.join(workdir, f'{kind}-{size}.png')
+    output = os.path.join(workdir, f'out-{kind}-{size}{output_ext}')
+
+    def run():
+        if not os.path.exists(source):
+            Image.frombytes('RGB', (size, size), synthetic_pixels(kind, size)).save(source)
+        # A leftover output would make write_if_changed skip the write
+        if os.path.exists(output):
+            os.remove(output)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not optimize_image(source, output, **options):
+                raise RuntimeError(f"optimize_image failed on {source}")
+        return os.path.getsize(output)
+
+    return run
+
+
+def benchmark_cases(workdir, quick=False):
+    """
+    Return every benchmark as a list of (name, function returning the
+    output size in bytes).
+
+    Args:
+        workdir: Scratch directory for optimize_image inputs and outputs
+        quick: Only sizes up to QUICK_MAX_SIZE
+    """
+    def sizes(values):
+        return [size for size in values if not quick or size <= QUICK_MAX_SIZE]
+
+    cases = []
+    for kind in INPUTS:
+        for size in sizes(PNG_SIZES):
+            cases.append((f'create_png/{kind}/{size}', _png_case(kind, size)))
+
+    for kind in INPUTS:
+        for strategy in FILTER_STRATEGIES:
+            cases.append((f'create_png/{kind}/{OPTIONS_SIZE}/filter-{strategy}',
+                          _png_case(kind, OPTIONS_SIZE, filter_strategy=strategy)))
+        for level in (1, 6):
+            cases.append((f'create_png/{kind}/{OPTIONS_SIZE}/level-{level}',
+                          _png_case(kind, OPTIONS_SIZE, compression_level=level)))
+        cases.append((f'create_png/{kind}/{OPTIONS_SIZE}/rgb',
+                      _png_case(kind, OPTIONS_SIZE, indexed=False)))
+    for quantizer in png_encoder.QUANTIZERS:
+        cases.append((f'create_png/photo/{OPTIONS_SIZE}/quantize-{quantizer}',
+                      _png_case('photo', OPTIONS_SIZE, indexed=True, quantize=quantizer)))
+
+    for size in FAVICON_SIZES:
+        cases.append((f'create_favicon/{size}', lambda size=size: len(create_favicon(size))))
+    cases.append(('create_apple_touch_icon', lambda: len(create_apple_touch_icon())))
+
+    if PIL is None:
+        print("⚠ Pillow is not installed, skipping the optimize_image cases", file=sys.stderr)
+        return cases
+
+    for kind in INPUTS:
+        for size in sizes(OPTIMIZE_SIZES):
+            cases.append((f'optimize_image/{kind}/{size}', _optimize_case(workdir, kind, size)))
+    if not quick:
+        size = OPTIMIZE_OPTIONS_SIZE
+        variants = {
+            'baseline': {'jpeg_options': {'progressive': False}},
+            'quality-60': {'quality': 60},
+            'png': {'output_ext': '.png'},
+            'budget-40k': {'budget': 40 * 1024},
+        }
+        for subsampling in ('4:4:4', '4:2:2'):
+            variants[f'subsampling-{subsampling}'] = {'jpeg_options': {'subsampling': subsampling}}
+        for name, options in variants.items():
+            output_ext = options.pop('output_ext', '.jpg')
+            case_dir = os.path.join(workdir, name.replace(':', ''))
+            os.makedirs(case_dir, exist_ok=True)
+            cases.append((f'optimize_image/photo/{size}/{name}',
+                          _optimize_case(case_dir, 'photo', size, output_ext, **options)))
+    return cases
+
+
+def calibrate(rounds=CALIBRATION_ROUNDS):
+    """
+    Time a fixed workload that exercises what the cases spend their time
+    on (a Python loop over pixel bytes and zlib compression).
+
+    Returns:
+        Best wall time of rounds runs, in seconds
+    """
+    data = synthetic_pixels('photo', CALIBRATION_SIZE)
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        total = 0
+        for value in data:
+            total += value
+        zlib.compress(data, 6)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(func, repeat=DEFAULT_REPEAT):
+    """
+    Run one benchmark case.
+
+    The first run is traced with tracemalloc for the peak memory; the
+    timed runs that follow are not, since tracing slows allocation down.
+
+    Returns:
+        Dict with 'seconds' (best of the timed runs), 'peak_bytes' and
+        'output_bytes'
+    """
+    tracemalloc.start()
+    try:
+        output_bytes = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        if elapsed > LONG_RUN_SECONDS:
+            break
+    return {'seconds': round(best, 6), 'peak_bytes': peak, 'output_bytes': output_bytes}
+
+
+def environment():
+    """
+    Describe what the timings depend on, for comparing with a baseline.
+    """
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pillow': PIL.__version__ if PIL is not None else None,
+        'rasterizer': default_backend(),
+        'encoder': png_encoder.ENCODER_VERSION,
+    }
+
+
+def timing_environment_differences(environment, baseline_environment):
+    """
+    Return the TIMING_ENVIRONMENT entries that differ between this run and
+    the baseline (an empty list when the timings can be compared).
+    """
+    baseline_environment = baseline_environment or {}
+    return [key for key in TIMING_ENVIRONMENT if environment.get(key) != baseline_environment.get(key)]
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, calibration=None, times=True):
+    """
+    Compare results with a baseline.
+
+    Args:
+        results: Dict of case name -> measure() result
+        baseline: Dict of case name -> measure() result
+        threshold: Allowed relative growth of time and peak memory
+        calibration: This run's calibrate() seconds; baseline times
+            recorded relative to the calibration are scaled by it, others
+            are compared in seconds
+        times: Compare timings at all (False when the environments differ)
+
+    Returns:
+        List of (case name, message) for every regression
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if calibration and 'relative' in base:
+            expected = base['relative'] * calibration
+        else:
+            expected = base['seconds']
+        slowdown = current['seconds'] - expected
+        if times and current['seconds'] > expected * (1 + threshold) and slowdown > MIN_SLOWDOWN_SECONDS:
+            regressions.append((name, f"{expected * 1000:.1f} ms expected on this machine -> "
+                                      f"{current['seconds'] * 1000:.1f} ms"))
+        if current['peak_bytes'] > base['peak_bytes'] * (1 + threshold):
+            regressions.append((name, f"peak memory {base['peak_bytes']:,} -> {current['peak_bytes']:,} bytes"))
+        if current['output_bytes'] > base['output_bytes']:
+            regressions.append((name, f"output {base['output_bytes']:,} -> {current['output_bytes']:,} bytes"))
+    return regressions
+
+
+def load_baseline(path):
+    """
+    Return the stored baseline ({'environment', 'results'}), or None.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PNG encoder, icon generators and image optimizer")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"only sizes up to {QUICK_MAX_SIZE}px and no optimize_image option sweep")
+    parser.add_argument('--filter', metavar='PATTERN',
+                        help="only run cases whose name matches this glob (e.g. 'create_png/*')")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"timed runs per case; the best is kept (default {DEFAULT_REPEAT})")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown and memory growth (default {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument('--check', action='store_true', help="exit with 1 if any case regressed")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help=f"baseline file (default {DEFAULT_BASELINE})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the baseline instead of comparing")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('-o', '--output', help="also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        cases = benchmark_cases(workdir, args.quick)
+        if args.filter:
+            cases = [(name, func) for name, func in cases if fnmatch.fnmatchcase(name, args.filter)]
+        if not cases:
+            print("✗ No benchmark cases match", file=sys.stderr)
+            return 1
+
+        calibration = calibrate()
+        results = {}
+        for name, func in cases:
+            results[name] = measure(func, args.repeat)
+            if not args.json:
+                result = results[name]
+                print(f"  {name:<44} {result['seconds'] * 1000:10.1f} ms {result['peak_bytes']:>13,} B peak "
+                      f"{result['output_bytes']:>11,} B out")
+            # Like the best-of-repeat case times, the fastest calibration is
+            # the one least disturbed by other load on the machine
+            calibration = min(calibration, calibrate(rounds=1))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results.values():
+        result['relative'] = round(result['seconds'] / calibration, 4)
+    if not args.json:
+        print(f"  {'calibration':<44} {calibration * 1000:10.1f} ms")
+
+    report = {'environment': dict(environment(), calibration_seconds=round(calibration, 6)), 'results': results}
+    if args.output:
+        write_if_changed(args.output, (json.dumps(report, indent=2) + '\n').encode('utf-8'))
+
+    if args.update_baseline:
+        # Keep the cases that were not run this time
+        stored = load_baseline(args.baseline) or {}
+        merged = dict(stored.get('results', {}), **results)
+        baseline = {'environment': report['environment'], 'results': dict(sorted(merged.items()))}
+        write_if_changed(args.baseline, (json.dumps(baseline, indent=2) + '\n').encode('utf-8'))
+        print(f"✓ Stored {len(results)} result(s) in {args.baseline}", file=sys.stderr)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    if baseline is None:
+        print(f"⚠ No baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+    else:
+        differing = timing_environment_differences(report['environment'], baseline.get('environment'))
+        if differing:
+            print(f"⚠ Baseline was recorded with a different {', '.join(differing)}; "
+                  f"skipping the timing comparison", file=sys.stderr)
+        regressions = compare(results, baseline.get('results', {}), args.threshold, calibration,
+                              times=not differing)
+    report['regressions'] = [{'case': name, 'message': message} for name, message in regressions]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    for name, message in regressions:
+        print(f"✗ {name}: {message}", file=sys.stderr)
+    if baseline is not None and not regressions:
+        print(f"✓ No regressions against {args.baseline} ({len(results)} case(s))", file=sys.stderr)
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Build the deployable site into dist/.
+
+Starting from index.html, this follows every local reference the site
+makes - <img>/<source> src and srcset, <link> icons and manifest, <script>
+and <a> targets, url(...) in inline CSS, same-origin og:image/twitter:image
+and JSON-LD URLs, and the icons listed in site.webmanifest - and puts only
+those files into dist/ (hard-linked when possible, copied otherwise), plus
+CNAME. The scripts, docs and reports in the repository never reach Pages.
+
+The entry page's local <img> tags are first rewritten as <picture>
+elements by responsive_images.py; the width ladder it encodes is written
+to images/responsive/ (git-ignored) and shipped like any other asset.
+image_placeholders.py then gives every <img> explicit width/height and
+an inline blurred preview as its background. Both steps need Pillow and
+are skipped with a warning without it.
+subset_fonts.py then replaces the Google Fonts links with subsets of the
+vendored heading font, written to fonts/subset/ (git-ignored); it needs
+fontTools and fonts/Oswald-VariableFont_wght.ttf and is skipped with a
+warning when either is missing.
+
+Pages are passed through iframe_facades.py (third-party iframes load
+behind a placeholder) and minified with minify_html.py on the way. A reference
+to a file that doesn't exist fails the build, since it would be a broken
+image or link on the live site; files listed in PENDING_FILES (not
+committed yet) only warn, as does everything with --allow-missing.
+
+PNG assets are shipped losslessly recompressed by optimize_png.py (the
+smallest of its fast trials); the copies are kept in PNG_CACHE_DIR and
+only redone when the source changes, and the files in the repository are
+left alone.
+
+Every asset except the pages and CNAME is fingerprinted: it is written as
+name.<hash>.ext, where the hash is taken from its (final) contents, and
+the references to it are rewritten, so the files can be cached as
+immutable and a regenerated icon still reaches every visitor. The
+old -> new name mapping goes to build/asset-manifest.json.
+
+Usage:
+    python build.py [-o dist] [--no-responsive] [--no-placeholders] [--no-font-subset] [--no-minify]
+                    [--no-facades] [--no-png-recompress] [--no-fingerprint] [--precompress] [--copy]
+                    [--force] [--allow-missing]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+from build_cache import CACHE_PATH, BuildCache, cache_key, file_digest, write_if_changed
+from html_assets import CSS_URL, apply_edits, is_local_url, local_path, parse_html
+from iframe_facades import add_facades
+from minify_html import minify_html, precompress
+from optimize_png import OPTIMIZER_VERSION, recompress_png
+from subset_fonts import (DEFAULT_FAMILY, DEFAULT_FONTS, FONT_SUBSET_DIR, missing_requirements, rewrite_head,
+                          subset_faces)
+
+try:
+    from image_placeholders import add_placeholders
+    from responsive_images import rewrite_images
+except ImportError:
+    add_placeholders = rewrite_images = None  # Pillow is not installed: images ship as they are
+
+# Attributes that hold a URL (or a srcset) on each element
+URL_ATTRIBUTES = {
+    'a': ('href',),
+    'audio': ('src',),
+    'img': ('src', 'srcset'),
+    'link': ('href',),
+    'script': ('src',),
+    'source': ('src', 'srcset'),
+    'video': ('src', 'poster'),
+}
+
+# <meta> properties whose content is a URL
+URL_META_PROPERTIES = ('og:image', 'og:image:url', 'og:image:secure_url', 'twitter:image')
+
+# Files Pages needs even though no page links to them
+EXTRA_FILES = ('CNAME',)
+
+# Files the page already references but that are not committed yet (the
+# headshot); a missing one is a warning instead of a build failure
+PENDING_FILES = ('images/profile.jpg',)
+
+# Where the responsive image variants are generated, relative to the site root
+RESPONSIVE_DIR = 'images/responsive'
+
+# Where recompressed copies of the PNG assets are kept between builds
+PNG_CACHE_DIR = '.build-cache/png'
+
+# Hex digits of the content hash in fingerprinted names
+FINGERPRINT_LENGTH = 10
+
+# Files that get .gz/.br copies with --precompress
+PRECOMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.webmanifest')
+
+def site_origins(site_root):
+    """
+    Return the host names the site is served from (from CNAME), so that
+    absolute URLs to them can be mapped to local files.
+    """
+    path = os.path.join(site_root, 'CNAME')
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        domain = f.read().strip().lower()
+    return {domain, 'www.' + domain} if domain else set()
+
+
+def resolve(url, site_root, origins):
+    """
+    Map a URL to the file that serves it.
+
+    Returns:
+        A path under site_root, or None for URLs on other origins, data:
+        URIs and in-page anchors. Directory URLs map to their index.html.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    parts = urlsplit(url)
+    if parts.netloc:
+        if parts.scheme not in ('', 'http', 'https') or parts.hostname not in origins:
+            return None
+        url = parts.path or '/'
+    elif not is_local_url(url):
+        return None
+    path = local_path(url, site_root)
+    if url.split('?')[0].split('#')[0].endswith('/') or os.path.isdir(path):
+        path = os.path.join(path, 'index.html')
+    return os.path.normpath(path)
+
+
+def srcset_urls(value):
+    """
+    Return the URLs of a srcset attribute.
+    """
+    return [candidate.split()[0] for candidate in value.split(',') if candidate.strip()]
+
+
+def _json_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _json_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_strings(item)
+
+
+def page_references(source):
+    """
+    Return every URL an HTML page references, in document order.
+    """
+    document = parse_html(source)
+    urls = []
+    for tag in document.tags:
+        for name in URL_ATTRIBUTES.get(tag.name, ()):
+            value = tag.attrs.get(name)
+            if value:
+                urls.extend(srcset_urls(value) if name == 'srcset' else [value])
+        if tag.name == 'meta' and tag.attrs.get('property', tag.attrs.get('name')) in URL_META_PROPERTIES:
+            urls.append(tag.attrs.get('content'))
+        if tag.attrs.get('style'):
+            urls.extend(match.group(2) for match in CSS_URL.finditer(tag.attrs['style']))
+        if tag.name == 'style':
+            urls.extend(match.group(2) for match in CSS_URL.finditer(tag.inner(source)))
+        if tag.name == 'script' and tag.attrs.get('type') == 'application/ld+json':
+            try:
+                data = json.loads(tag.inner(source))
+            except ValueError:
+                print("⚠ Skipping invalid JSON-LD block", file=sys.stderr)
+                continue
+            # Only absolute URLs count here; resolve() drops other origins
+            urls.extend(value for value in _json_strings(data) if value.startswith(('http://', 'https://')))
+    return [url for url in urls if url]
+
+
+def manifest_references(text):
+    """
+    Return the URLs a web app manifest references (icons, screenshots).
+    """
+    try:
+        manifest = json.loads(text)
+    except ValueError:
+        print("⚠ Skipping invalid web app manifest", file=sys.stderr)
+        return []
+    urls = []
+    for key in ('icons', 'screenshots'):
+        urls.extend(entry.get('src') for entry in manifest.get(key, []) if isinstance(entry, dict))
+    return [url for url in urls if url]
+
+
+def reference_scanner(path):
+    """
+    Return the function that lists the URLs a file references
+    (page_references or manifest_references), or None for files that
+    can't reference anything.
+    """
+    if path.endswith(('.html', '.htm')):
+        return page_references
+    if path.endswith(('.webmanifest', 'manifest.json')):
+        return manifest_references
+    return None
+
+
+def is_pending(path, site_root):
+    """
+    True if path is one of the PENDING_FILES of the site.
+    """
+    return path is not None and os.path.relpath(path, site_root).replace(os.sep, '/') in PENDING_FILES
+
+
+def read_text(path, pages=None):
+    """
+    Return a page or manifest's text, preferring a rewritten copy from pages.
+    """
+    if pages and path in pages:
+        return pages[path]
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def collect_assets(site_root, entry='index.html', pages=None):
+    """
+    Find every file reachable from the entry page.
+
+    Linked pages and manifests are scanned in turn, so a second local page
+    pulls in its own assets.
+
+    Args:
+        site_root: Directory the site is served from
+        entry: Page to start from, relative to site_root
+        pages: Optional dict of path -> text for pages rewritten in memory
+            (see prepare_entry()); they are scanned instead of the file
+
+    Returns:
+        (dict of path -> first page that referenced it,
+         list of (url, referring page) for references to missing files)
+    """
+    origins = site_origins(site_root)
+    start = os.path.normpath(os.path.join(site_root, entry))
+    assets = {start: None}
+    missing = []
+    queue = [start]
+
+    while queue:
+        page = queue.pop(0)
+        scan = reference_scanner(page)
+        if scan is None:
+            continue
+        urls = scan(read_text(page, pages))
+
+        for url in urls:
+            path = resolve(url, site_root, origins)
+            if path is None or path in assets:
+                continue
+            if not os.path.isfile(path):
+                if (url, page) not in missing:
+                    missing.append((url, page))
+                continue
+            assets[path] = page
+            queue.append(path)
+
+    for name in EXTRA_FILES:
+        path = os.path.join(site_root, name)
+        if os.path.isfile(path):
+            assets.setdefault(os.path.normpath(path), None)
+    return assets, missing
+
+
+def prepare_entry(site_root, entry='index.html', responsive=True, placeholders=True, fonts=True, force=False):
+    """
+    Apply the image and font steps that rewrite the entry page before it
+    is built.
+
+    Responsive variants are generated under RESPONSIVE_DIR and font subsets
+    under FONT_SUBSET_DIR, with the build cache skipping the ones that are
+    up to date, and the page is rewritten in memory; index.html itself is
+    never modified. Placeholders are added after the rewrite, so they are
+    computed from the fallback variants.
+
+    Args:
+        site_root: Directory the site is served from
+        entry: Page to rewrite, relative to site_root
+        responsive: Rewrite <img> tags as <picture> with rewrite_images()
+        placeholders: Add inline previews and sizes with add_placeholders()
+        fonts: Replace Google Fonts with self-hosted subsets (subset_fonts.py)
+        force: Re-encode variants and subsets even when the cache says they
+            are fresh
+
+    Returns:
+        Dict of path -> rewritten text, for collect_assets() and build()
+    """
+    if (responsive or placeholders) and rewrite_images is None:
+        print("⚠ Pillow is not installed (pip install Pillow), images get no variants or placeholders",
+              file=sys.stderr)
+        responsive = placeholders = False
+    font_paths = [os.path.join(site_root, path) for path in DEFAULT_FONTS]
+    if fonts:
+        problem = missing_requirements(font_paths)
+        if problem:
+            print(f"⚠ {problem}; keeping Google Fonts (skip with --no-font-subset)", file=sys.stderr)
+            fonts = False
+    if not (responsive or placeholders or fonts):
+        return {}
+
+    path = os.path.normpath(os.path.join(site_root, entry))
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    with BuildCache(os.path.join(site_root, CACHE_PATH), enabled=not force) as cache:
+        if responsive:
+            text, count = rewrite_images(text, site_root, os.path.join(site_root, RESPONSIVE_DIR), cache=cache)
+            print(f"✓ Rewrote {count} image(s) in {entry} as responsive <picture> elements")
+        if placeholders:
+            text, count = add_placeholders(text, site_root)
+            print(f"✓ Added placeholders to {count} image(s) in {entry}")
+        if fonts:
+            faces = subset_faces(text, font_paths, DEFAULT_FAMILY, os.path.join(site_root, FONT_SUBSET_DIR),
+                                 cache=cache)
+            rewritten = rewrite_head(text, DEFAULT_FAMILY, faces, site_root) if faces else None
+            if rewritten is None:
+                print(f"⚠ Nothing to self-host: {entry} renders no {DEFAULT_FAMILY} text or has no Google Fonts links",
+                      file=sys.stderr)
+            else:
+                text = rewritten
+                print(f"✓ Self-hosted {len(faces)} {DEFAULT_FAMILY} subset(s) in {entry}")
+    return {path: text}
+
+
+def recompressed_png(path, site_root, cache):
+    """
+    Return the path of a losslessly recompressed copy of a PNG asset.
+
+    The copy is made with recompress_png() (fast trials) under
+    PNG_CACHE_DIR and reused while the source is unchanged; it holds the
+    original bytes when recompressing doesn't make the file smaller.
+    Responsive variants are recompressed when they are generated, so they
+    are returned as they are.
+    """
+    relative = os.path.relpath(path, site_root)
+    if relative.replace(os.sep, '/').startswith(RESPONSIVE_DIR + '/'):
+        return path
+    output = os.path.join(site_root, PNG_CACHE_DIR, relative)
+    key = cache_key({'optimizer': OPTIMIZER_VERSION, 'fast': True}, [path])
+    if cache.is_fresh(output, key):
+        return output
+
+    with open(path, 'rb') as f:
+        original = f.read()
+    try:
+        best, _ = recompress_png(original, fast=True)
+    except (ValueError, zlib.error) as e:
+        print(f"⚠ {relative}: {e}, shipping it as it is", file=sys.stderr)
+        return path
+    write_if_changed(output, min(original, best, key=len))
+    cache.record(output, key)
+    if len(best) < len(original):
+        print(f"✓ Recompressed {relative}: {len(original):,} -> {len(best):,} bytes")
+    return output
+
+
+def fingerprinted_name(relative, digest):
+    """
+    Insert a content hash before the extension: images/icon.png ->
+    images/icon.<hash>.png.
+    """
+    base, ext = os.path.splitext(relative)
+    return f"{base}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def renamed_url(url, relative):
+    """
+    Point a URL at a renamed file, keeping its form (relative or absolute,
+    query and fragment); only the last path segment changes.
+    """
+    parts = urlsplit(url)
+    directory = parts.path.rsplit('/', 1)[0] + '/' if '/' in parts.path else ''
+    return urlunsplit(parts._replace(path=directory + os.path.basename(relative)))
+
+
+def rewrite_references(text, url_map, is_page=True):
+    """
+    Replace whole-URL occurrences of the url_map keys in a file.
+
+    In HTML only start tags, <style> blocks and JSON-LD are rewritten, so
+    a URL quoted in the page's text stays as written.
+    """
+    if not url_map:
+        return text
+    pattern = re.compile(r'(?<![^\s"\'(,])(' + '|'.join(map(re.escape, sorted(url_map, key=len, reverse=True)))
+                         + r')(?=[\s"\'),]|$)')
+
+    def replace(part):
+        return pattern.sub(lambda match: url_map[match.group(1)], part)
+
+    if not is_page:
+        return replace(text)
+    edits = []
+    for tag in parse_html(text).tags:
+        regions = [(tag.start, tag.end)]
+        if tag.name == 'style' or (tag.name == 'script' and tag.attrs.get('type') == 'application/ld+json'):
+            if tag.close_start is not None:
+                regions.append((tag.end, tag.close_start))
+        for start, end in regions:
+            rewritten = replace(text[start:end])
+            if rewritten != text[start:end]:
+                edits.append((start, end, rewritten))
+    return apply_edits(text, edits)
+
+
+def place_file(source, destination, copy=False):
+    """
+    Hard-link source to destination, falling back to a copy across file
+    systems (or always copying with copy=True).
+    """
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    if not copy:
+        try:
+            os.link(source, destination)
+            return
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+
+
+def tree_size(root, exclude=()):
+    """
+    Return (file count, total bytes) of a directory tree, skipping .git
+    and the given directory names, the way upload-pages-artifact does.
+    """
+    count = total = 0
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in ('.git', '.github') + tuple(exclude)]
+        for name in files:
+            count += 1
+            total += os.path.getsize(os.path.join(directory, name))
+    return count, total
+
+
+def build(site_root='.', output_dir='dist', entry='index.html', minify=True, facades=True, fingerprint=True,
+          compress=False, copy=False, asset_manifest=None, responsive=True, placeholders=True, fonts=True,
+          recompress=True, force=False, allow_missing=False):
+    """
+    Build the deployable tree.
+
+    Args:
+        site_root: Directory the site is served from
+        output_dir: Directory to build into; it is emptied first
+        entry: Page to start from, relative to site_root
+        minify: Minify HTML pages with minify_html()
+        facades: Put third-party iframes behind add_facades() placeholders
+        fingerprint: Rename assets to name.<hash>.ext and rewrite references
+        compress: Write .gz/.br copies of text files next to them
+        copy: Always copy instead of hard-linking
+        asset_manifest: Optional JSON file for the fingerprint mapping
+        responsive: Serve the entry page's images as responsive <picture>s
+        placeholders: Give the entry page's images inline preview backgrounds
+        fonts: Self-host subsets of the heading font instead of Google Fonts
+        recompress: Ship PNG assets recompressed with recompressed_png()
+        force: Regenerate image variants, font subsets and recompressed PNGs
+            even if they are up to date
+        allow_missing: Warn about every reference to a missing file instead
+            of failing (by default only PENDING_FILES are let through)
+
+    Returns:
+        List of (path relative to output_dir, size) for the manifest, or
+        None if the site has dangling references
+    """
+    pages = prepare_entry(site_root, entry, responsive, placeholders, fonts, force)
+    assets, missing = collect_assets(site_root, entry, pages)
+    origins = site_origins(site_root)
+    failed = False
+    for url, page in missing:
+        if allow_missing or is_pending(resolve(url, site_root, origins), site_root):
+            print(f"⚠ {os.path.relpath(page, site_root)} references {url}, which does not exist yet",
+                  file=sys.stderr)
+        else:
+            print(f"✗ {os.path.relpath(page, site_root)} references {url}, which does not exist",
+                  file=sys.stderr)
+            failed = True
+    if failed:
+        return None
+
+    site = os.path.abspath(site_root)
+    output = os.path.abspath(output_dir)
+    if output == site or site.startswith(output + os.sep):
+        raise ValueError(f"Output directory {output_dir} would contain the site itself")
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+
+    extra = {os.path.normpath(os.path.join(site_root, name)) for name in EXTRA_FILES}
+
+    def order(path):
+        # Referenced files go first, so their final names are known by the
+        # time the manifests and pages that point at them are rewritten
+        scan = reference_scanner(path)
+        return (0 if scan is None else 1 if scan is manifest_references else 2, path)
+
+    renamed = {}
+    manifest = []
+    with BuildCache(os.path.join(site_root, CACHE_PATH), enabled=not force) as cache:
+        for path in sorted(assets, key=order):
+            relative = os.path.relpath(path, site_root)
+            scan = reference_scanner(path)
+            data = None
+            source = path
+            if scan is not None:
+                text = read_text(path, pages)
+                url_map = {}
+                for url in scan(text):
+                    target = resolve(url, site_root, origins)
+                    if target in renamed:
+                        url_map[url] = renamed_url(url, renamed[target])
+                text = rewrite_references(text, url_map, is_page=scan is page_references)
+                if facades and scan is page_references:
+                    text, _ = add_facades(text)
+                if minify and scan is page_references:
+                    text = minify_html(text)
+                data = text.encode('utf-8')
+            elif recompress and path.lower().endswith('.png'):
+                source = recompressed_png(path, site_root, cache)
+
+            if fingerprint and scan is not page_references and path not in extra:
+                digest = hashlib.sha256(data).hexdigest() if data is not None else file_digest(source)
+                relative = fingerprinted_name(relative, digest)
+                renamed[path] = relative
+
+            destination = os.path.join(output, relative)
+            if data is not None:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                write_if_changed(destination, data)
+            else:
+                place_file(source, destination, copy)
+            manifest.append((relative, os.path.getsize(destination)))
+
+            if compress and path.endswith(PRECOMPRESS_EXTENSIONS):
+                for written, size in precompress(destination).items():
+                    manifest.append((os.path.relpath(written, output), size))
+
+    if asset_manifest and renamed:
+        mapping = {os.path.relpath(path, site_root).replace(os.sep, '/'): relative.replace(os.sep, '/')
+                   for path, relative in sorted(renamed.items())}
+        os.makedirs(os.path.dirname(asset_manifest) or '.', exist_ok=True)
+        write_if_changed(asset_manifest, (json.dumps(mapping, indent=2) + '\n').encode('utf-8'))
+    return sorted(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the files index.html references into a deployable tree")
+    parser.add_argument('-o', '--output-dir', default='dist', help="output directory (default dist)")
+    parser.add_argument('--entry', default='index.html', help="page to start from (default index.html)")
+    parser.add_argument('--no-responsive', action='store_true',
+                        help="keep <img> tags as written instead of serving a width ladder")
+    parser.add_argument('--no-placeholders', action='store_true',
+                        help="don't inline blurred image previews into the page")
+    parser.add_argument('--no-font-subset', action='store_true',
+                        help="keep loading the heading font from Google Fonts")
+    parser.add_argument('--no-minify', action='store_true', help="copy HTML pages as they are")
+    parser.add_argument('--no-facades', action='store_true', help="load third-party iframes eagerly")
+    parser.add_argument('--no-png-recompress', action='store_true',
+                        help="ship PNG assets as committed instead of losslessly recompressed")
+    parser.add_argument('--no-fingerprint', action='store_true', help="keep the original asset names")
+    parser.add_argument('--asset-manifest', default='build/asset-manifest.json',
+                        help="where to write the fingerprint mapping (default build/asset-manifest.json)")
+    parser.add_argument('--precompress', action='store_true',
+                        help="also write .gz/.br copies (for hosts that serve them; Pages does not)")
+    parser.add_argument('--copy', action='store_true', help="copy files instead of hard-linking them")
+    parser.add_argument('--allow-missing', action='store_true',
+                        help="warn about references to missing files instead of failing")
+    parser.add_argument('--force', action='store_true',
+                        help="regenerate image variants, font subsets and PNGs even if up to date")
+    args = parser.parse_args()
+
+    try:
+        manifest = build('.', args.output_dir, args.entry, minify=not args.no_minify,
+                         facades=not args.no_facades, fingerprint=not args.no_fingerprint, compress=args.precompress, copy=args.copy,
+                         asset_manifest=args.asset_manifest, responsive=not args.no_responsive,
+                         placeholders=not args.no_placeholders, fonts=not args.no_font_subset,
+                         recompress=not args.no_png_recompress, force=args.force,
+                         allow_missing=args.allow_missing)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    if manifest is None:
+        print("✗ Build failed: fix or remove the dangling references above", file=sys.stderr)
+        return 1
+
+    width = max(len(path) for path, _ in manifest)
+    for path, size in manifest:
+        print(f"  {path:<{width}}  {size:>9,} bytes")
+    total = sum(size for _, size in manifest)
+    repo_count, repo_total = tree_size('.', exclude=(os.path.normpath(args.output_dir), '.build-cache', 'build'))
+    print(f"✓ Built {len(manifest)} files, {total:,} bytes, into {args.output_dir}/ "
+          f"(the repository root is {repo_count} files, {repo_total:,} bytes)")
+    if not args.no_fingerprint:
+        print(f"✓ Fingerprint mapping written to {args.asset_manifest}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
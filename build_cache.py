@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Content-addressed build cache for generated assets.
+
+Each output file is recorded with a key (a hash of everything that went
+into it: source bytes, generator parameters, code/encoder versions) and a
+checksum of the bytes that were written. A later run can skip an output
+when its key is unchanged and the file on disk still matches the
+checksum; a stale, edited or corrupted output is rebuilt.
+
+The manifest lives in .build-cache/ (git-ignored) and is only a cache:
+deleting it just forces a full rebuild.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+CACHE_PATH = '.build-cache/manifest.json'
+
+# Bump when the manifest layout changes; older manifests are discarded
+CACHE_FORMAT = 1
+
+
+def file_digest(path):
+    """
+    Return the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(params, sources=(), data=None):
+    """
+    Build a cache key from generator parameters and input contents.
+
+    Args:
+        params: JSON-serializable parameters (sizes, colors, quality,
+            encoder version, ...)
+        sources: Paths of input files whose bytes affect the output
+            (source images, generator code)
+        data: Optional input bytes that are not on disk
+
+    Returns:
+        Hex digest identifying this exact build input
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    for source in sources:
+        digest.update(b'\0' + os.path.normpath(source).encode('utf-8') + b'\0')
+        digest.update(file_digest(source).encode('ascii'))
+    if data is not None:
+        digest.update(b'\0data\0')
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def write_if_changed(path, data):
+    """
+    Write data to path unless the file already holds exactly those bytes,
+    so unchanged outputs keep their mtime and never show up as modified.
+
+    Returns:
+        True if the file was written
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+class BuildCache:
+    """
+    Manifest of output path -> (cache key, checksum of the written file).
+
+    Use as a context manager to save the manifest on exit:
+
+        with BuildCache() as cache:
+            key = cache_key({'size': 32}, sources=[__file__])
+            if not cache.is_fresh(output, key):
+                write_if_changed(output, build())
+                cache.record(output, key)
+
+    Subclasses that store other kinds of entries (see
+    validate_workflow.ResultCache) override FORMAT and reuse the loading
+    and atomic saving.
+
+    Args:
+        path: Manifest location (default .build-cache/manifest.json)
+        enabled: When False, nothing is ever fresh (forces a rebuild) but
+            new results are still recorded
+    """
+
+    FORMAT = CACHE_FORMAT
+
+    def __init__(self, path=CACHE_PATH, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.entries = {}
+        self._dirty = False
+
+        try:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('format') == self.FORMAT:
+                self.entries = manifest.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError) as e:
+            print(f"⚠ Ignoring unreadable build cache {path}: {e}", file=sys.stderr)
+
+    def is_fresh(self, output_path, key):
+        """
+        True if output_path was built from key and is intact on disk.
+        """
+        if not self.enabled:
+            return False
+        entry = self.entries.get(os.path.normpath(output_path))
+        if not entry or entry.get('key') != key:
+            return False
+        try:
+            return file_digest(output_path) == entry.get('sha256')
+        except FileNotFoundError:
+            return False
+
+    def record(self, output_path, key):
+        """
+        Remember that output_path (as currently on disk) was built from key.
+        """
+        self.entries[os.path.normpath(output_path)] = {
+            'key': key,
+            'sha256': file_digest(output_path),
+            'size': os.path.getsize(output_path),
+        }
+        self._dirty = True
+
+    def save(self):
+        """
+        Write the manifest if anything changed (atomically via rename).
+        """
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': self.FORMAT, 'entries': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+        return False
@@ -1,109 +1,36 @@
 #!/usr/bin/env python3
 """
-Generate a 180x180 Apple touch icon PNG without PIL.
-Creates a simple geometric design suitable for a personal portfolio site.
-"""
-
-import struct
-import zlib
-
-def create_png(width, height, pixels):
-    """
-    Create a PNG file from pixel data.
-    pixels should be a list of (r, g, b) tuples for each pixel.
-    """
-    # PNG signature
-    png_signature = b'\x89PNG\r\n\x1a\n'
-
-    # IHDR chunk (image header)
-    def make_chunk(chunk_type, data):
-        chunk = chunk_type + data
-        crc = zlib.crc32(chunk) & 0xffffffff
-        return struct.pack('>I', len(data)) + chunk + struct.pack('>I', crc)
+Generate the 180x180 Apple touch icon PNG without PIL.
 
-    # IHDR: width, height, bit_depth=8, color_type=2 (RGB), compression=0, filter=0, interlace=0
-    ihdr_data = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
-    ihdr_chunk = make_chunk(b'IHDR', ihdr_data)
-
-    # IDAT chunk (image data)
-    # Build raw image data with filter byte (0 = no filter) for each scanline
-    raw_data = b''
-    for y in range(height):
-        raw_data += b'\x00'  # filter type for this scanline
-        for x in range(width):
-            r, g, b = pixels[y * width + x]
-            raw_data += bytes([r, g, b])
+The icon is built by generate_icons.py, which is the only writer of the
+site's icon files; this script rebuilds just apple-touch-icon.png. It is
+skipped when the build cache shows it is up to date; pass --force to
+regenerate it anyway, and --profile to time each stage.
+"""
 
-    # Compress the raw data
-    compressed_data = zlib.compress(raw_data, 9)
-    idat_chunk = make_chunk(b'IDAT', compressed_data)
+import argparse
+import sys
 
-    # IEND chunk (end of file)
-    iend_chunk = make_chunk(b'IEND', b'')
+import generate_icons
+import profiling
 
-    # Combine all chunks
-    png_data = png_signature + ihdr_chunk + idat_chunk + iend_chunk
-    return png_data
+OUTPUT = './images/apple-touch-icon.png'
 
 
 def create_apple_touch_icon():
     """
-    Create a 180x180 Apple touch icon with a simple, professional design.
-    Uses a gradient background with a stylized 'A' or geometric pattern.
+    Create the 180x180 Apple touch icon PNG (as generate_icons.py does).
     """
-    width = 180
-    height = 180
+    return generate_icons.encode_icon(180, generate_icons.render_icon(180))
 
-    # Define color palette - professional blue/teal gradient
-    bg_color_top = (52, 152, 219)      # Blue
-    bg_color_bottom = (41, 128, 185)   # Darker blue
-    accent_color = (255, 255, 255)     # White
 
-    pixels = []
-
-    for y in range(height):
-        # Create vertical gradient
-        t = y / height
-        bg_r = int(bg_color_top[0] * (1 - t) + bg_color_bottom[0] * t)
-        bg_g = int(bg_color_top[1] * (1 - t) + bg_color_bottom[1] * t)
-        bg_b = int(bg_color_top[2] * (1 - t) + bg_color_bottom[2] * t)
-
-        for x in range(width):
-            # Create a simple centered circle/badge design
-            center_x = width // 2
-            center_y = height // 2
-
-            # Distance from center
-            dx = x - center_x
-            dy = y - center_y
-            distance = (dx * dx + dy * dy) ** 0.5
-
-            # Create concentric circles pattern
-            if distance < 70:
-                # Inner circle - white/accent
-                if distance < 60:
-                    pixels.append(accent_color)
-                else:
-                    # Soft edge blend
-                    blend = (70 - distance) / 10
-                    r = int(accent_color[0] * blend + bg_r * (1 - blend))
-                    g = int(accent_color[1] * blend + bg_g * (1 - blend))
-                    b = int(accent_color[2] * blend + bg_b * (1 - blend))
-                    pixels.append((r, g, b))
-            else:
-                # Background with gradient
-                pixels.append((bg_r, bg_g, bg_b))
-
-    return create_png(width, height, pixels)
+def main():
+    parser = argparse.ArgumentParser(description="Generate the 180x180 Apple touch icon")
+    generate_icons.add_arguments(parser)
+    args = parser.parse_args()
+    return profiling.run(lambda: generate_icons.run(args, (OUTPUT,)), args.profile, args.cprofile,
+                         name='generate_apple_icon')
 
 
 if __name__ == '__main__':
-    print("Generating 180x180 Apple touch icon...")
-    png_data = create_apple_touch_icon()
-
-    output_file = './images/apple-touch-icon.png'
-    with open(output_file, 'wb') as f:
-        f.write(png_data)
-
-    print(f"✓ Created {output_file}")
-    print(f"  File size: {len(png_data)} bytes")
+    sys.exit(main())
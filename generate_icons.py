@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Build every site icon from a single high-resolution render.
+
+The master artwork (gradient background with a soft-edged white badge) is
+rendered once and box-filtered down to each target size. Favicon sizes
+(up to SMALL_ICON_MAX_SIZE) are instead drawn directly at their size with a
+hard-edged badge: anti-aliased edges at 16-48px add so many colors that the
+files grow 2-3x for no visible gain. The targets are PNG-encoded
+concurrently on a process pool, so the build takes about as long as the
+slowest single encode. Also writes favicon.ico and site.webmanifest.
+
+This is the only script that writes the icons served by the site;
+generate_png_favicons.py and generate_apple_icon.py are shortcuts that
+rebuild a subset of its outputs.
+
+Outputs are tracked in the build cache: when nothing that affects an icon
+has changed and the file on disk is intact, it is skipped, and a fully
+warm run does not render anything at all.
+
+Usage:
+    python generate_icons.py [--master-size 1024] [--workers N] [--ico-64] [--force] [--profile]
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import png_encoder
+import profiling
+import rasterizer
+from build_cache import BuildCache, cache_key, write_if_changed
+from png_encoder import ENCODER_VERSION, create_ico, create_png
+from profiling import span
+from rasterizer import Canvas
+
+# Code that determines the output bytes; part of every cache key
+CODE_SOURCES = (__file__, png_encoder.__file__, rasterizer.__file__)
+
+# Define color palette - professional blue/teal gradient (matching apple-touch-icon)
+BG_COLOR_TOP = (52, 152, 219)      # Blue
+BG_COLOR_BOTTOM = (41, 128, 185)   # Darker blue
+ACCENT_COLOR = (255, 255, 255)     # White
+
+# Badge geometry as a fraction of the icon size (60px / 70px at 180px).
+# The outer radius (0.389) stays inside the 0.4 radius safe zone of
+# maskable icons, so icon-512.png is listed as maskable as well.
+INNER_RADIUS = 60 / 180
+OUTER_RADIUS = 70 / 180
+
+# Icons up to this size are drawn directly with a hard-edged badge of radius
+# size // 2.5 instead of being downsampled from the master
+SMALL_ICON_MAX_SIZE = 48
+
+DEFAULT_MASTER_SIZE = 1024
+
+# Output path -> pixel size
+TARGETS = {
+    './images/favicon-16x16.png': 16,
+    './images/favicon-32x32.png': 32,
+    './images/apple-touch-icon.png': 180,
+    './images/icon-192.png': 192,
+    './images/icon-512.png': 512,
+}
+
+ICO_OUTPUT = './images/favicon.ico'
+ICO_SIZES = (16, 32, 48)
+
+MANIFEST_OUTPUT = './site.webmanifest'
+MANIFEST = {
+    'name': 'Abe Diaz',
+    'short_name': 'Abe Diaz',
+    'description': 'Seattle/Tech/Evangelist',
+    'start_url': '/',
+    'display': 'standalone',
+    'background_color': '#FFFFFF',
+    'theme_color': '#3498DB',
+}
+
+
+def render_master(size):
+    """
+    Render the master icon artwork at size x size pixels.
+
+    Args:
+        size: Width and height of the master canvas; should be at least
+            twice the largest target so every target is supersampled
+    """
+    canvas = Canvas(size, size)
+    canvas.fill_vertical_gradient(BG_COLOR_TOP, BG_COLOR_BOTTOM)
+    center = size // 2
+    canvas.fill_circle(center, center, size * INNER_RADIUS, ACCENT_COLOR)
+    canvas.blend_ring(center, center, size * INNER_RADIUS, size * OUTER_RADIUS, ACCENT_COLOR)
+    return canvas
+
+
+def render_small_icon(size):
+    """
+    Render a favicon-sized icon directly at size x size pixels, with a
+    hard-edged badge so it stays a handful of palette colors.
+    """
+    canvas = Canvas(size, size)
+    canvas.fill_vertical_gradient(BG_COLOR_TOP, BG_COLOR_BOTTOM)
+    canvas.fill_circle(size // 2, size // 2, size // 2.5, ACCENT_COLOR)
+    return canvas
+
+
+def render_icon(size, master=None):
+    """
+    Return the packed RGB pixels of the icon at size x size.
+
+    Args:
+        size: Icon size in pixels
+        master: Master canvas to downsample from (rendered at
+            DEFAULT_MASTER_SIZE if needed and not given)
+    """
+    if size <= SMALL_ICON_MAX_SIZE:
+        return render_small_icon(size).tobytes()
+    if master is None:
+        master = render_master(DEFAULT_MASTER_SIZE)
+    return master.resample(size, size).tobytes()
+
+
+def encode_icon(size, pixels):
+    """
+    Encode one downsampled icon; runs in a worker process.
+    """
+    return create_png(size, size, pixels, filter_strategy='brute')
+
+
+def build_manifest():
+    """
+    Return the contents of site.webmanifest.
+    """
+    manifest = dict(MANIFEST)
+    manifest['icons'] = [
+        {'src': '/images/icon-192.png', 'sizes': '192x192', 'type': 'image/png'},
+        {'src': '/images/icon-512.png', 'sizes': '512x512', 'type': 'image/png'},
+        {'src': '/images/icon-512.png', 'sizes': '512x512',
+         'type': 'image/png', 'purpose': 'maskable'},
+    ]
+    return json.dumps(manifest, indent=2) + '\n'
+
+
+def generate_icons(master_size=DEFAULT_MASTER_SIZE, workers=None, force=False, ico_sizes=ICO_SIZES,
+                   outputs=None):
+    """
+    Render, downsample, encode and write every icon target that is not
+    already up to date.
+
+    Args:
+        master_size: Resolution of the master render (default 1024)
+        workers: Worker processes for encoding (default: one per CPU);
+            1 encodes in this process
+        force: Ignore the build cache and rebuild everything
+        ico_sizes: Sizes embedded in favicon.ico
+        outputs: Paths to build (default: every target, favicon.ico and
+            site.webmanifest)
+
+    Returns:
+        Dict of output path -> bytes written, or None if it was up to date
+    """
+    sizes = set(TARGETS.values()) | set(ico_sizes)
+    if master_size < max(sizes):
+        raise ValueError(f"Master size must be at least {max(sizes)}px, got {master_size}")
+
+    params = {
+        'master_size': master_size,
+        'colors': [BG_COLOR_TOP, BG_COLOR_BOTTOM, ACCENT_COLOR],
+        'radii': [INNER_RADIUS, OUTER_RADIUS],
+        'small_max': SMALL_ICON_MAX_SIZE,
+        'encoder': ENCODER_VERSION,
+    }
+    keys = {path: cache_key(dict(params, size=size), CODE_SOURCES) for path, size in TARGETS.items()}
+    keys[ICO_OUTPUT] = cache_key(dict(params, ico_sizes=list(ico_sizes)), CODE_SOURCES)
+    keys[MANIFEST_OUTPUT] = cache_key(MANIFEST, CODE_SOURCES)
+    if outputs is not None:
+        keys = {path: key for path, key in keys.items() if path in outputs}
+
+    with BuildCache(enabled=not force) as cache:
+        with span('cache'):
+            stale = [path for path, key in keys.items() if not cache.is_fresh(path, key)]
+        results = {path: None for path in keys}
+
+        # Only render and encode the sizes that some stale output needs
+        needed = {TARGETS[path] for path in stale if path in TARGETS}
+        if ICO_OUTPUT in stale:
+            needed |= set(ico_sizes)
+
+        pngs = {}
+        if needed:
+            with span('rasterize'):
+                master = None
+                if max(needed) > SMALL_ICON_MAX_SIZE:
+                    print(f"Rendering {master_size}x{master_size} master icon...")
+                    master = render_master(master_size)
+                pixels = {size: render_icon(size, master) for size in sorted(needed)}
+
+            # With one worker, encode in this process so --profile sees it
+            with span('encode'):
+                with ProcessPoolExecutor(max_workers=workers) if workers != 1 else contextlib.nullcontext() as pool:
+                    if pool is None:
+                        pngs = {size: encode_icon(size, pixels[size]) for size in needed}
+                    else:
+                        futures = {size: pool.submit(encode_icon, size, pixels[size]) for size in needed}
+                        pngs = {size: future.result() for size, future in futures.items()}
+
+        with span('write'):
+            for path in stale:
+                if path == ICO_OUTPUT:
+                    data = create_ico([pngs[size] for size in ico_sizes])
+                elif path == MANIFEST_OUTPUT:
+                    data = build_manifest().encode('utf-8')
+                else:
+                    data = pngs[TARGETS[path]]
+                write_if_changed(path, data)
+                cache.record(path, keys[path])
+                results[path] = len(data)
+
+    return results
+
+
+def run(args, outputs=None):
+    """
+    Build the icons for parsed command-line arguments and print a report.
+
+    Args:
+        args: Namespace with master_size, workers, ico_64 and force
+        outputs: Paths to build, see generate_icons()
+
+    Returns:
+        Exit status
+    """
+    start = time.perf_counter()
+    ico_sizes = ICO_SIZES + ((64,) if args.ico_64 else ())
+    try:
+        written = generate_icons(args.master_size, args.workers, args.force, ico_sizes, outputs)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+
+    for path, size in written.items():
+        if size is None:
+            print(f"✓ {path} is up to date, skipping")
+            continue
+        print(f"✓ Created {path}")
+        print(f"  File size: {size} bytes")
+    print(f"\n✓ All icons generated in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def add_arguments(parser):
+    """
+    Add the icon build options to an argparse parser.
+    """
+    parser.add_argument('--master-size', type=int, default=DEFAULT_MASTER_SIZE,
+                        help=f"resolution of the master render in pixels (default {DEFAULT_MASTER_SIZE})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="encoder processes (default: one per CPU)")
+    parser.add_argument('--ico-64', action='store_true', help="also embed a 64x64 entry in favicon.ico")
+    parser.add_argument('--force', action='store_true',
+                        help="ignore the build cache and rebuild every icon")
+    profiling.add_arguments(parser)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build all site icons from one master render")
+    add_arguments(parser)
+    args = parser.parse_args()
+    return profiling.run(lambda: run(args), args.profile, args.cprofile, name='generate_icons')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Helpers for locating and rewriting tags in index.html.
+
+The build steps that transform the page (responsive images, placeholders,
+fingerprinting, ...) need to edit individual tags without reformatting
+the rest of the hand-written document. parse_html() records every tag with
+its exact character offsets, so a step can splice in replacements with
+apply_edits() and leave everything else byte-for-byte intact.
+"""
+
+import html
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'source', 'track', 'wbr',
+}
+
+# url(...) in CSS; group 2 is the URL without its quotes
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+class Tag:
+    """
+    One element of the document.
+
+    Attributes:
+        name: Lowercase tag name
+        attrs: Dict of attribute name -> value (None for bare attributes)
+        start: Offset of the '<' of the start tag
+        end: Offset just past the '>' of the start tag
+        close_start: Offset of the matching end tag, or None
+        close_end: Offset just past the matching end tag, or None
+        ancestors: Names of the enclosing elements, outermost first
+    """
+
+    def __init__(self, name, attrs, start, end, ancestors):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = start
+        self.end = end
+        self.close_start = None
+        self.close_end = None
+        self.ancestors = ancestors
+
+    @property
+    def outer_end(self):
+        """
+        Offset just past the whole element (end tag included if present).
+        """
+        return self.close_end if self.close_end is not None else self.end
+
+    def inner(self, source):
+        """
+        Return the raw text between the start and end tags.
+        """
+        if self.close_start is None:
+            return ''
+        return source[self.end:self.close_start]
+
+    def __repr__(self):
+        return f"<Tag {self.name} {self.attrs!r} @{self.start}>"
+
+
+class Document:
+    """
+    Result of parse_html(): all tags and text nodes in document order.
+
+    Attributes:
+        source: The parsed HTML string
+        tags: List of Tag objects
+        texts: List of (text, ancestor Tags) for every text node
+    """
+
+    def __init__(self, source, tags, texts):
+        self.source = source
+        self.tags = tags
+        self.texts = texts
+
+    def find(self, *names):
+        """
+        Return all tags with one of the given names, in document order.
+        """
+        return [tag for tag in self.tags if tag.name in names]
+
+
+class _Scanner(HTMLParser):
+    def __init__(self, source):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.line_starts = [0] + [m.end() for m in re.finditer('\n', source)]
+        self.tags = []
+        self.texts = []
+        self.stack = []
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, name, attrs):
+        start = self._offset()
+        tag = Tag(name, attrs, start, start + len(self.get_starttag_text()),
+                  tuple(t.name for t in self.stack))
+        self.tags.append(tag)
+        if name not in VOID_ELEMENTS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, name, attrs):
+        start = self._offset()
+        self.tags.append(Tag(name, attrs, start, start + len(self.get_starttag_text()),
+                             tuple(t.name for t in self.stack)))
+
+    def handle_endtag(self, name):
+        start = self._offset()
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].name == name:
+                tag = self.stack[index]
+                tag.close_start = start
+                tag.close_end = self.source.index('>', start) + 1
+                del self.stack[index:]
+                break
+
+    def handle_data(self, data):
+        self.texts.append((data, tuple(self.stack)))
+
+
+def parse_html(source):
+    """
+    Parse an HTML document into a Document with tag offsets.
+    """
+    scanner = _Scanner(source)
+    scanner.feed(source)
+    scanner.close()
+    return Document(source, scanner.tags, scanner.texts)
+
+
+def render_start_tag(name, attrs, indent=None):
+    """
+    Render a start tag from a dict (or list of pairs) of attributes;
+    attributes with a value of None are written bare.
+
+    With indent set, each attribute goes on its own line and the closing
+    '>' lines up with indent, the way index.html writes its <img> tags.
+    """
+    items = attrs.items() if isinstance(attrs, dict) else attrs
+    parts = [name]
+    for key, value in items:
+        if value is None:
+            parts.append(key)
+        else:
+            parts.append(f'{key}="{html.escape(str(value), quote=True)}"')
+    if indent is None:
+        return '<' + ' '.join(parts) + '>'
+    return '<' + f'\n{indent}  '.join(parts) + f'\n{indent}>'
+
+
+def apply_edits(source, edits):
+    """
+    Apply (start, end, replacement) edits to source. Edits must not
+    overlap; they are applied back to front so offsets stay valid.
+    """
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        source = source[:start] + replacement + source[end:]
+    return source
+
+
+def line_indent(source, offset):
+    """
+    Return the whitespace that starts the line containing offset.
+    """
+    line_start = source.rfind('\n', 0, offset) + 1
+    match = re.match(r'[ \t]*', source[line_start:offset])
+    return match.group(0)
+
+
+def is_local_url(url):
+    """
+    True for URLs that point at files of this site rather than other
+    origins, data URIs or in-page anchors.
+    """
+    if not url or url.startswith(('#', 'data:', 'mailto:', 'tel:', 'javascript:')):
+        return False
+    parts = urlsplit(url)
+    return not parts.scheme and not parts.netloc
+
+
+def local_path(url, site_root):
+    """
+    Map a local URL to a filesystem path under site_root, dropping any
+    query string or fragment.
+    """
+    path = unquote(urlsplit(url).path)
+    return os.path.normpath(os.path.join(site_root, path.lstrip('/')))
+
+
+def site_url(path, site_root):
+    """
+    Inverse of local_path(): the './'-relative URL for a file under
+    site_root, in the style index.html uses.
+    """
+    return './' + os.path.relpath(path, site_root).replace(os.sep, '/')
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Put a lightweight facade in front of the third-party iframes in index.html.
+
+An eager third-party <iframe> loads a whole foreign document (HTML,
+scripts, styles, connections to more origins) during page load, whether
+or not the visitor ever scrolls to it. This step gives every such iframe a
+srcdoc with a static placeholder: the browser renders the srcdoc instead
+of fetching src, in the same box and with the same CSS, so nothing moves
+when the real document is mounted later.
+
+The real embed is mounted by a small inline script that removes srcdoc
+(which makes the browser load src):
+
+    visible      after the page has loaded, once the iframe comes within
+                 a margin (default 200px) of the viewport
+    interaction  only when the visitor clicks the placeholder
+
+The placeholder is a link to the embed URL, so clicking it loads the embed
+in place even without JavaScript.
+
+Each iframe can override the defaults in index.html with
+data-facade="visible|interaction|off", data-facade-margin="400px" and
+data-facade-label="..."; iframes marked off are left alone. Iframes that
+already have a srcdoc are skipped, so re-running the step is a no-op.
+
+Usage:
+    python iframe_facades.py [index.html] [-o OUTPUT] [--mode visible|interaction] [--margin 200px]
+"""
+
+import argparse
+import html
+import sys
+
+from build_cache import write_if_changed
+from html_assets import apply_edits, is_local_url, line_indent, parse_html, render_start_tag
+
+FACADE_MODES = ('visible', 'interaction')
+DEFAULT_MODE = 'visible'
+DEFAULT_MARGIN = '200px'
+
+# id of the inline <script> that mounts the embeds
+FACADE_SCRIPT_ID = 'iframe-facades'
+
+# Placeholder document; matches the page's body font and gray palette
+FACADE_DOCUMENT = (
+    '<!DOCTYPE html><style>'
+    'html,body{{height:100%;margin:0}}'
+    'body{{display:flex;align-items:center;justify-content:center;'
+    'font:13px "Helvetica Neue",Helvetica,Arial,sans-serif}}'
+    'a{{padding:8px 16px;border:1px solid #DDDDDD;border-radius:4px;color:#555555;text-decoration:none}}'
+    'a:hover,a:focus{{border-color:#36BCAB;color:#36BCAB}}'
+    '</style>'
+    '<a href="{url}">{label}</a>'
+)
+
+FACADE_SCRIPT = """
+(function () {
+  function mount(frame) {
+    frame.removeAttribute('srcdoc');
+  }
+
+  function start() {
+    document.querySelectorAll('iframe[data-facade="visible"][srcdoc]').forEach(function (frame) {
+      if (!('IntersectionObserver' in window)) {
+        mount(frame);
+        return;
+      }
+      var observer = new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) { return entry.isIntersecting; })) {
+          observer.disconnect();
+          mount(frame);
+        }
+      }, { rootMargin: frame.getAttribute('data-facade-margin') || '%s' });
+      observer.observe(frame);
+    });
+  }
+
+  // Keep third-party documents out of the initial load
+  if (document.readyState === 'complete') {
+    start();
+  } else {
+    window.addEventListener('load', start);
+  }
+})();
+"""
+
+
+def facade_document(url, label):
+    """
+    Return the srcdoc placeholder for an embed.
+    """
+    return FACADE_DOCUMENT.format(url=html.escape(url, quote=True), label=html.escape(label))
+
+
+def script_markup(indent, margin):
+    """
+    Return the mount <script>, indented to sit at indent.
+    """
+    body = FACADE_SCRIPT.strip('\n') % margin
+    lines = [f"{indent}  {line}" if line else '' for line in body.split('\n')]
+    return f'<script id="{FACADE_SCRIPT_ID}">\n' + '\n'.join(lines) + f'\n{indent}</script>'
+
+
+def add_facades(source, mode=DEFAULT_MODE, margin=DEFAULT_MARGIN):
+    """
+    Add srcdoc facades to every third-party iframe and the mount script.
+
+    Args:
+        source: HTML text
+        mode: Default mount mode for iframes without data-facade
+        margin: Default IntersectionObserver margin for 'visible' mode
+
+    Returns:
+        (rewritten HTML, number of iframes given a facade)
+    """
+    document = parse_html(source)
+    edits = []
+    count = 0
+
+    for tag in document.find('iframe'):
+        src = tag.attrs.get('src')
+        if not src or is_local_url(src) or 'srcdoc' in tag.attrs:
+            continue
+        attrs = dict(tag.attrs)
+        attrs.setdefault('data-facade', mode)
+        if attrs['data-facade'] == 'off':
+            continue
+        if attrs['data-facade'] not in FACADE_MODES:
+            print(f"⚠ {src}: unknown data-facade=\"{attrs['data-facade']}\", using {mode}", file=sys.stderr)
+            attrs['data-facade'] = mode
+        label = attrs.get('data-facade-label') or f"Load {attrs.get('title') or 'embedded content'}"
+        attrs['srcdoc'] = facade_document(src, label)
+        edits.append((tag.start, tag.end, render_start_tag('iframe', attrs)))
+        count += 1
+        print(f"✓ {src}: facade added (mounts on {attrs['data-facade']})")
+
+    scripts = [tag for tag in document.find('script') if tag.attrs.get('id') == FACADE_SCRIPT_ID]
+    embeds = count or any('srcdoc' in tag.attrs and 'data-facade' in tag.attrs for tag in document.find('iframe'))
+    if scripts:
+        script = scripts[0]
+        edits.append((script.start, script.outer_end, script_markup(line_indent(source, script.start), margin)))
+    elif embeds:
+        body = document.find('body')
+        if not body or body[0].close_start is None:
+            raise ValueError("The page has no </body> to add the mount script before")
+        close = body[0].close_start
+        indent = line_indent(source, close) + '  '
+        edits.append((close, close, f"{indent}{script_markup(indent, margin)}\n"))
+
+    return apply_edits(source, edits), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load third-party iframes through a lightweight facade")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('-o', '--output', help="write the rewritten HTML here (default: in place)")
+    parser.add_argument('--mode', choices=FACADE_MODES, default=DEFAULT_MODE,
+                        help=f"when to mount embeds without data-facade (default {DEFAULT_MODE})")
+    parser.add_argument('--margin', default=DEFAULT_MARGIN,
+                        help=f"distance from the viewport that mounts a 'visible' embed (default {DEFAULT_MARGIN})")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    try:
+        rewritten, count = add_facades(source, args.mode, args.margin)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+
+    output = args.output or args.input
+    if write_if_changed(output, rewritten.encode('utf-8')):
+        print(f"✓ Added facades to {count} iframe(s) in {output}")
+    else:
+        print(f"✓ {output} is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Inline placeholders for the images in index.html.
+
+For every local <img> (including the fallback <img> of a <picture>) this
+computes the image's dominant color and a tiny blurred preview, and sets
+them as the element's inline background together with explicit width and
+height. The browser reserves the layout box and paints the preview right
+away, then the real image draws over it once it has loaded; no extra
+requests are made because the preview is a data: URI.
+
+Images with transparent pixels only get width/height, since a background
+would show through them after loading.
+
+Run it after responsive_images.py, whose variants it reads. Re-running
+replaces the previous placeholder, so the step is idempotent.
+
+Usage:
+    python image_placeholders.py [index.html] [-o OUTPUT] [--size 24]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+from collections import Counter
+
+from PIL import Image, ImageFilter
+
+from build_cache import write_if_changed
+from html_assets import apply_edits, is_local_url, line_indent, local_path, parse_html, render_start_tag
+from optimize_image import IMAGE_EXTENSIONS, display_size, downscale, load_oriented
+from quantize import median_cut
+
+# Longest side of the preview in pixels (16-32 keeps the URI under ~1 KB)
+DEFAULT_PREVIEW_SIZE = 24
+
+# Preview JPEG quality; it is blurred and upscaled, so artifacts don't show
+PREVIEW_QUALITY = 50
+
+# Side of the thumbnail the dominant color is computed from, and the
+# number of median-cut clusters it is picked from
+COLOR_SAMPLE_SIZE = 64
+COLOR_CLUSTERS = 8
+
+
+def dominant_color(img):
+    """
+    Return the (r, g, b) color of the largest median-cut cluster of an
+    RGB thumbnail.
+    """
+    palette, indices = median_cut(img.tobytes(), img.width, img.height, COLOR_CLUSTERS)
+    index, _ = Counter(indices).most_common(1)[0]
+    return palette[index]
+
+
+def image_placeholder(path, preview_size=DEFAULT_PREVIEW_SIZE):
+    """
+    Compute the placeholder for one image.
+
+    Args:
+        path: Image file
+        preview_size: Longest side of the blurred preview in pixels
+
+    Returns:
+        Dict with the display 'width' and 'height', the 'color' as #rrggbb,
+        the 'preview' as a data: URI and 'transparent' (True if any pixel
+        is not opaque; color and preview are None then)
+    """
+    with Image.open(path) as source:
+        width, height = display_size(source)
+        scale = min(1, COLOR_SAMPLE_SIZE / max(width, height))
+        sample_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        img, box = load_oriented(source, sample_size)
+        sample = downscale(img, sample_size, box)
+
+    placeholder = {'width': width, 'height': height, 'color': None, 'preview': None, 'transparent': False}
+    if sample.mode in ('RGBA', 'LA', 'PA') or (sample.mode == 'P' and 'transparency' in sample.info):
+        alpha = sample.convert('RGBA').getchannel('A')
+        if alpha.getextrema()[0] < 255:
+            placeholder['transparent'] = True
+            return placeholder
+
+    sample = sample.convert('RGB')
+    placeholder['color'] = '#{:02x}{:02x}{:02x}'.format(*dominant_color(sample))
+
+    scale = preview_size / max(sample.size)
+    preview = sample.resize((max(1, round(sample.width * scale)), max(1, round(sample.height * scale))),
+                            Image.Resampling.BOX)
+    preview = preview.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    preview.save(buffer, 'JPEG', quality=PREVIEW_QUALITY, optimize=True)
+    placeholder['preview'] = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    return placeholder
+
+
+def split_declarations(style):
+    """
+    Split an inline style into its declarations, ignoring semicolons
+    inside url(...) and quoted strings (as in data: URIs).
+    """
+    declarations = []
+    current = []
+    depth = 0
+    quote = None
+    for char in style or '':
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(depth - 1, 0)
+        elif char == ';' and depth == 0:
+            declarations.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    declarations.append(''.join(current).strip())
+    return [declaration for declaration in declarations if declaration]
+
+
+def merge_style(style, background):
+    """
+    Replace any background declarations in an inline style with a new one.
+    """
+    declarations = [
+        declaration for declaration in split_declarations(style)
+        if not declaration.lower().startswith('background')
+    ]
+    if background:
+        declarations.append(background)
+    return '; '.join(declarations)
+
+
+def add_placeholders(source, site_root, preview_size=DEFAULT_PREVIEW_SIZE):
+    """
+    Set placeholder backgrounds and intrinsic sizes on every local <img>.
+
+    Args:
+        source: HTML text
+        site_root: Directory the page's relative URLs resolve against
+        preview_size: Longest side of the blurred preview in pixels
+
+    Returns:
+        (rewritten HTML, number of images updated)
+    """
+    document = parse_html(source)
+    edits = []
+
+    for tag in document.find('img'):
+        src = tag.attrs.get('src')
+        if not is_local_url(src):
+            continue
+        path = local_path(src, site_root)
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if not os.path.exists(path):
+            print(f"⚠ {src} not found, no placeholder added", file=sys.stderr)
+            continue
+
+        placeholder = image_placeholder(path, preview_size)
+        attrs = dict(tag.attrs)
+        attrs.setdefault('width', placeholder['width'])
+        attrs.setdefault('height', placeholder['height'])
+        if placeholder['transparent']:
+            print(f"✓ {src}: {placeholder['width']}x{placeholder['height']} (transparent, size only)")
+        else:
+            background = (f"background: {placeholder['color']} url({placeholder['preview']}) "
+                          f"center / cover no-repeat")
+            attrs['style'] = merge_style(attrs.get('style'), background)
+            print(f"✓ {src}: {placeholder['width']}x{placeholder['height']}, {placeholder['color']}, "
+                  f"{len(placeholder['preview'])} byte preview")
+
+        # Keep the tag's one-attribute-per-line layout when it has one
+        indent = line_indent(source, tag.start) if '\n' in source[tag.start:tag.end] else None
+        edits.append((tag.start, tag.end, render_start_tag('img', attrs, indent)))
+
+    return apply_edits(source, edits), len(edits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add inline placeholders to the images in a page")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('-o', '--output', help="write the rewritten HTML here (default: in place)")
+    parser.add_argument('--size', type=int, default=DEFAULT_PREVIEW_SIZE,
+                        help=f"longest side of the preview in pixels (default {DEFAULT_PREVIEW_SIZE})")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    site_root = os.path.dirname(args.input) or '.'
+    rewritten, count = add_placeholders(source, site_root, args.size)
+
+    output = args.output or args.input
+    if write_if_changed(output, rewritten.encode('utf-8')):
+        print(f"✓ Added placeholders to {count} image(s) in {output}")
+    else:
+        print(f"✓ {output} is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Minify index.html and write precompressed copies.
+
+Markup: comments are dropped (conditional comments are kept), whitespace
+runs collapse to one space and whitespace next to block-level tags is
+removed, as is whitespace between the tags in <head>; <pre> and
+<textarea> content is left alone. Whitespace next to inline and replaced
+elements (<picture>, <iframe>, <script>, ...) is kept, since it can render
+as a space between them and the surrounding text.
+
+Inline CSS: comments and insignificant whitespace are removed, and rules
+whose selectors cannot match anything in the page are dropped. A selector
+is kept unless it names a tag, class or id that appears neither in the
+markup nor as a word inside a string in the page's scripts (so classes
+added from JavaScript survive).
+
+Inline JS: comments and whitespace are removed with a tokenizer that
+respects strings, template literals and regular expressions; line breaks
+that automatic semicolon insertion could depend on are kept. JSON-LD is
+re-serialized compactly.
+
+The minified page is written with .gz and .br siblings at maximum
+compression, for hosts and CDNs that serve precompressed files (brotli
+output needs the optional 'brotli' package).
+
+Usage:
+    python minify_html.py [index.html] [-o build/index.html] [--no-precompress]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from html.parser import HTMLParser
+
+from build_cache import write_if_changed
+from html_assets import VOID_ELEMENTS, parse_html, render_start_tag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Elements whose surrounding whitespace never renders
+BLOCK_ELEMENTS = {
+    'html', 'head', 'body', 'title', 'meta', 'base',
+    'address', 'article', 'aside', 'blockquote', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hgroup', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'section', 'summary', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+
+# Elements whose text content is kept byte-for-byte
+PREFORMATTED_ELEMENTS = {'pre', 'textarea'}
+
+JSON_SCRIPT_TYPES = {'application/ld+json', 'application/json'}
+
+
+# ---------------------------------------------------------------- CSS
+
+_CSS_TOKEN = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)''', re.S)
+
+
+def strip_css_comments(css):
+    """
+    Remove /* comments */ from CSS, leaving strings untouched.
+    """
+    return _CSS_TOKEN.sub(lambda m: m.group(1) or '', css)
+
+
+def find_block_end(css, start):
+    """
+    Return the index of the '}' that closes the block opened at css[start].
+    """
+    depth = 0
+    quote = None
+    i = start
+    while i < len(css):
+        char = css[i]
+        i += 1
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i - 1
+    raise ValueError("Unbalanced braces in CSS")
+
+
+def _minify_selector(selector):
+    selector = re.sub(r'\s+', ' ', selector.strip())
+    return re.sub(r'\s*([>+~,])\s*', r'\1', selector)
+
+
+def _minify_declarations(block):
+    declarations = []
+    for declaration in re.split(r';(?![^(]*\))', block):
+        if ':' not in declaration:
+            continue
+        name, value = declaration.split(':', 1)
+        value = re.sub(r'\s+', ' ', value.strip())
+        if '"' not in value and "'" not in value:
+            value = re.sub(r'\s*,\s*', ',', value)
+        value = re.sub(r'\s*!important', '!important', value)
+        declarations.append(f"{name.strip()}:{value}")
+    return ';'.join(declarations)
+
+
+def _minify_prelude(prelude):
+    prelude = re.sub(r'\s+', ' ', prelude.strip())
+    return re.sub(r'\s*([:,])\s*', r'\1', prelude)
+
+
+def selector_may_match(selector, used):
+    """
+    True unless the selector requires a tag, class or id that is not in
+    the used set of names (see page_names()).
+    """
+    # Pseudo-classes/elements and attribute selectors don't add names the
+    # element must carry; drop them (and their arguments) first
+    simplified = re.sub(r'\[[^\]]*\]', '', selector)
+    simplified = re.sub(r'::?[\w-]+(\([^)]*\))?', '', simplified)
+
+    for name in re.findall(r'[.#]([\w-]+)', simplified):
+        if name not in used:
+            return False
+    for name in re.findall(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)', simplified):
+        if name.lower() not in used:
+            return False
+    return True
+
+
+def minify_css(css, used=None):
+    """
+    Minify a stylesheet.
+
+    Args:
+        css: CSS text
+        used: Optional set of tag names, classes and ids used by the page;
+            selectors needing anything else are dropped
+
+    Returns:
+        Minified CSS
+    """
+    css = strip_css_comments(css)
+    out = []
+    i = 0
+    while i < len(css):
+        brace = css.find('{', i)
+        semicolon = css.find(';', i)
+        if brace < 0:
+            tail = css[i:].strip()
+            if tail:
+                out.append(_minify_prelude(tail))
+            break
+
+        # Statement at-rules such as @import end at ';' before any block
+        if 0 <= semicolon < brace and css[i:semicolon].strip().startswith('@'):
+            out.append(_minify_prelude(css[i:semicolon]) + ';')
+            i = semicolon + 1
+            continue
+
+        prelude = css[i:brace].strip()
+        end = find_block_end(css, brace)
+        body = css[brace + 1:end]
+        i = end + 1
+
+        if prelude.startswith('@'):
+            name = prelude.split(None, 1)[0].lower()
+            if name in ('@media', '@supports', '@document', '@layer'):
+                inner = minify_css(body, used)
+                if inner:
+                    out.append(f"{_minify_prelude(prelude)}{{{inner}}}")
+            elif '{' in body:
+                # @keyframes and friends: nested blocks, nothing to prune
+                out.append(f"{_minify_prelude(prelude)}{{{minify_css(body)}}}")
+            else:
+                out.append(f"{_minify_prelude(prelude)}{{{_minify_declarations(body)}}}")
+            continue
+
+        selectors = [s for s in re.split(r',(?![^(]*\))', prelude) if s.strip()]
+        if used is not None:
+            selectors = [s for s in selectors if selector_may_match(s, used)]
+        declarations = _minify_declarations(body)
+        if selectors and declarations:
+            out.append(f"{','.join(_minify_selector(s) for s in selectors)}{{{declarations}}}")
+
+    return ''.join(out)
+
+
+# ----------------------------------------------------------------- JS
+
+_JS_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<word>[\w$]+)
+  | (?P<punct>.)
+''', re.S | re.X)
+
+_REGEX_LITERAL = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\])*\]|[^/\\\n\[])+/[a-z]*')
+
+# After these, a '/' starts a regular expression rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^') | {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+
+# A line break between these is never needed for automatic semicolon insertion
+_NO_ASI_BEFORE = set(')]},;.?:=*/%&|^<>')
+_NO_ASI_AFTER = set('{([,;=:?&|+-*/%<>!~^')
+
+
+def minify_js(js):
+    """
+    Minify JavaScript conservatively: drop comments and whitespace, keep
+    line breaks where automatic semicolon insertion might need them.
+    """
+    tokens = []
+    i = 0
+    while i < len(js):
+        previous = next((t for t in reversed(tokens) if t[0] != 'space'), None)
+        if js[i] == '/' and js[i + 1:i + 2] not in ('/', '*') and (
+                previous is None or previous[1] in _REGEX_PRECEDERS):
+            match = _REGEX_LITERAL.match(js, i)
+            if match:
+                tokens.append(('regex', match.group(0)))
+                i = match.end()
+                continue
+        match = _JS_TOKEN.match(js, i)
+        kind = match.lastgroup
+        if kind == 'comment':
+            # A comment separates tokens like whitespace does
+            kind = 'space'
+            text = '\n' if '\n' in match.group(0) or match.group(0).startswith('//') else ' '
+        else:
+            text = match.group(0)
+        if kind == 'space' and tokens and tokens[-1][0] == 'space':
+            tokens[-1] = ('space', tokens[-1][1] + text)
+        else:
+            tokens.append((kind, text))
+        i = match.end()
+
+    out = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind != 'space':
+            out.append(text)
+            continue
+        if not out or index + 1 >= len(tokens):
+            continue
+        before, after = out[-1][-1], tokens[index + 1][1][0]
+        if (before.isalnum() or before in '_$') and (after.isalnum() or after in '_$'):
+            out.append('\n' if '\n' in text else ' ')
+        elif before + after in ('++', '--', '+-', '-+', '//'):
+            out.append(' ')
+        elif '\n' in text and before not in _NO_ASI_AFTER and after not in _NO_ASI_BEFORE:
+            out.append('\n')
+    return ''.join(out)
+
+
+# --------------------------------------------------------------- HTML
+
+def page_names(source):
+    """
+    Return every tag name, class and id used in a page, plus every word
+    inside a string literal in its inline scripts (classes and ids that
+    scripts may add or query).
+    """
+    document = parse_html(source)
+    used = set()
+    for tag in document.tags:
+        used.add(tag.name)
+        used.update((tag.attrs.get('class') or '').split())
+        if tag.attrs.get('id'):
+            used.add(tag.attrs['id'])
+        if tag.name == 'script':
+            for literal in re.findall(r'''"[^"\n]*"|'[^'\n]*'|`[^`]*`''', tag.inner(source)):
+                used.update(re.findall(r'[\w-]+', literal))
+    return used
+
+
+class _Minifier(HTMLParser):
+    def __init__(self, used):
+        super().__init__(convert_charrefs=False)
+        self.used = used
+        self.tokens = []  # (kind, text, tag name)
+        self.stack = []
+        self.script_type = None
+        self.cdata = []
+
+    def _preformatted(self):
+        return any(name in PREFORMATTED_ELEMENTS for name in self.stack)
+
+    def handle_decl(self, decl):
+        self.tokens.append(('decl', f"<!{decl}>", None))
+
+    def handle_starttag(self, name, attrs):
+        if name == 'script':
+            self.script_type = (dict(attrs).get('type') or 'text/javascript').lower()
+        self.tokens.append(('tag', render_start_tag(name, attrs), name))
+        if name not in VOID_ELEMENTS:
+            self.stack.append(name)
+
+    def handle_startendtag(self, name, attrs):
+        self.tokens.append(('tag', render_start_tag(name, attrs), name))
+
+    def handle_endtag(self, name):
+        if name in ('style', 'script') and self.stack and self.stack[-1] == name:
+            self._flush_cdata(name, ''.join(self.cdata))
+            self.cdata = []
+        if name in self.stack:
+            del self.stack[len(self.stack) - 1 - self.stack[::-1].index(name):]
+        self.tokens.append(('tag', f"</{name}>", name))
+
+    def handle_comment(self, data):
+        if data.startswith('[if') or data.startswith('<![endif'):
+            self.tokens.append(('raw', f"<!--{data}-->", None))
+
+    def handle_entityref(self, name):
+        self.handle_data(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_data(f"&#{name};")
+
+    def _flush_cdata(self, name, data):
+        if name == 'style':
+            data = minify_css(data, self.used)
+        elif self.script_type in JSON_SCRIPT_TYPES:
+            try:
+                data = json.dumps(json.loads(data), separators=(',', ':'), ensure_ascii=False)
+            except ValueError:
+                data = data.strip()
+        elif self.script_type in ('text/javascript', 'module', 'application/javascript'):
+            data = minify_js(data)
+        self.tokens.append(('raw', data, None))
+
+    def handle_data(self, data):
+        parent = self.stack[-1] if self.stack else None
+        if parent in ('style', 'script'):
+            self.cdata.append(data)
+        elif self._preformatted():
+            self.tokens.append(('raw', data, None))
+        elif 'head' in self.stack and data.isspace():
+            # <head> content never renders, so whitespace between its tags can go
+            return
+        elif self.tokens and self.tokens[-1][0] == 'text':
+            self.tokens[-1] = ('text', self.tokens[-1][1] + data, None)
+        else:
+            self.tokens.append(('text', data, None))
+
+    def result(self):
+        out = []
+        for index, (kind, text, name) in enumerate(self.tokens):
+            if kind != 'text':
+                out.append(text)
+                continue
+            text = re.sub(r'\s+', ' ', text)
+            before = self.tokens[index - 1] if index else None
+            after = self.tokens[index + 1] if index + 1 < len(self.tokens) else None
+            if before is None or before[0] == 'decl' or before[2] in BLOCK_ELEMENTS:
+                text = text.lstrip()
+            if after is None or after[2] in BLOCK_ELEMENTS:
+                text = text.rstrip()
+            out.append(text)
+        return ''.join(out)
+
+
+def minify_html(source):
+    """
+    Minify a page's markup together with its inline CSS and JS.
+    """
+    minifier = _Minifier(page_names(source))
+    minifier.feed(source)
+    minifier.close()
+    return minifier.result()
+
+
+def precompress(path, data=None):
+    """
+    Write path.gz (and path.br when brotli is installed) next to a file,
+    at maximum compression.
+
+    Returns:
+        Dict of written path -> size
+    """
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    written = {}
+    # mtime=0 keeps the .gz byte-identical across builds
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    write_if_changed(path + '.gz', gz)
+    written[path + '.gz'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+        write_if_changed(path + '.br', br)
+        written[path + '.br'] = len(br)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify an HTML page and precompress it")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('-o', '--output', default='build/index.html',
+                        help="minified output (default build/index.html)")
+    parser.add_argument('--no-precompress', action='store_true', help="skip the .gz/.br copies")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        source = f.read()
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        print("⚠ Minifying in place; the readable source will be overwritten", file=sys.stderr)
+
+    minified = minify_html(source).encode('utf-8')
+    write_if_changed(args.output, minified)
+    print(f"✓ {args.input}: {len(source.encode('utf-8'))} -> {len(minified)} bytes ({args.output})")
+
+    if not args.no_precompress:
+        for path, size in precompress(args.output, minified).items():
+            print(f"✓ {path}: {size} bytes")
+        if brotli is None:
+            print("⚠ brotli is not installed (pip install brotli), skipped .br output", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,412 @@
 #!/usr/bin/env python3
-"""Optimize profile image to reduce file size"""
+"""Optimize profile image to reduce file size
 
-from PIL import Image
+Usage:
+    python optimize_image.py [--output-dir build/images]
+        Optimize images/profile.jpg into build/images/profile.jpg (skipped
+        when already done); the original is never overwritten
+    python optimize_image.py --batch images/ 'photos/**/*.jpg' --output-dir build/images
+        Optimize every JPEG/PNG under the given directories or globs in
+        parallel, writing to a mirrored output tree and leaving the
+        originals untouched; outputs that are up to date are skipped
+    python optimize_image.py --variants images/profile.jpg --output-dir images/responsive
+        Write a width ladder of AVIF (when supported), WebP and JPEG/PNG
+        variants for responsive <picture>/srcset markup
+    python optimize_image.py --budget profile
+        Search for the highest JPEG quality (shrinking the image if needed)
+        that fits the per-class byte budget from docs/IMAGES.md without
+        dropping below a perceptual-similarity floor; fails if it can't
+
+JPEG output is progressive, has the EXIF orientation applied to the pixels,
+is converted from any embedded ICC profile to sRGB and carries no EXIF/XMP
+or ICC metadata, with 4:2:0 chroma subsampling. --no-progressive,
+--keep-metadata, --no-srgb and --subsampling change these. --report-savings
+re-encodes each image with every option flipped to report how many bytes
+the option saved; it costs three or four extra encodes per image, so it is
+off by default.
+
+--profile prints a JSON tree of the time spent opening, decoding,
+converting, resampling, encoding and writing each image (--cprofile FILE
+also saves cProfile stats). Profile --batch with --jobs 1 to see the
+stages; otherwise the tree only shows the wait for the worker processes.
+"""
+
+from PIL import ExifTags, Image, ImageOps
+import PIL
+import argparse
+import contextlib
+import glob
+import io
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import profiling
+from build_cache import BuildCache, cache_key, write_if_changed
+from optimize_png import OPTIMIZER_VERSION, recompress_png
+from profiling import span
+
+try:
+    from PIL import ImageCms
+except ImportError:
+    ImageCms = None  # Pillow built without LittleCMS: ICC profiles are kept
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Responsive widths: 1x/2x of the 580px content column plus mobile sizes
+DEFAULT_WIDTHS = (400, 580, 800, 1160)
+
+# Per-class file size limits from docs/IMAGES.md
+IMAGE_BUDGETS = {
+    'profile': 200 * 1024,
+    'og': 300 * 1024,
+    'content': 500 * 1024,
+    'screenshot': 500 * 1024,
+    'icon': 50 * 1024,
+}
+
+# Quality range searched when fitting a budget
+MIN_QUALITY = 30
+MAX_QUALITY = 95
+
+# Mean SSIM (luma, 8x8 blocks) below which a candidate counts as visibly
+# degraded; the search shrinks the image instead of going below it
+DEFAULT_MIN_SIMILARITY = 0.95
+
+# Each shrink step when quality alone can't meet a budget, and the
+# narrowest width the search will go down to
+RESIZE_STEP = 0.85
+MIN_FIT_WIDTH = 200
+
+# Web defaults for JPEG output (see optimize_image)
+JPEG_OPTIONS = {
+    'progressive': True,
+    'strip_metadata': True,
+    'srgb': True,
+    'subsampling': '4:2:0',
+}
+SUBSAMPLING_MODES = ('4:4:4', '4:2:2', '4:2:0')
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Large sources are first reduced cheaply (JPEG DCT scaling, integer box
+# reduction) to no less than this multiple of the target size, then
+# finished with a Lanczos resample, the same trade-off Image.thumbnail makes
+REDUCING_GAP = 2.0
+
+# Modern formats tried before the JPEG/PNG fallback, best compression first
+VARIANT_FORMATS = (
+    ('AVIF', '.avif', 'image/avif'),
+    ('WEBP', '.webp', 'image/webp'),
+)
+
+
+def display_size(img):
+    """
+    Return the (width, height) of img as displayed, i.e. after its EXIF
+    orientation is applied.
+    """
+    orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        return img.height, img.width
+    return img.size
+
+
+def load_oriented(img, size=None):
+    """
+    Load a freshly opened image with its EXIF orientation applied to the
+    pixels (and removed from its metadata).
+
+    Args:
+        img: Image straight from Image.open(), not loaded yet
+        size: Display size it will be shrunk to, if any, so large JPEGs can
+            be decoded at reduced scale (see draft_for())
+
+    Returns:
+        (image, box to pass to downscale())
+    """
+    box = None
+    if size is not None:
+        orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        stored_size = size[::-1] if orientation in TRANSPOSED_ORIENTATIONS else size
+        box = draft_for(img, stored_size)
+        if orientation != 1:
+            # The draft box is sub-pixel off the full image; after a
+            # rotation or flip just resample the whole image
+            box = None
+    return ImageOps.exif_transpose(img), box
+
+
+def convert_to_srgb(img):
+    """
+    Convert img from its embedded ICC profile to sRGB.
+
+    Returns:
+        (image, True) after a conversion, or (img, False) when there is no
+        profile, LittleCMS is unavailable or the profile can't be used; the
+        caller must then keep the profile so colors stay correct
+    """
+    icc_profile = img.info.get('icc_profile')
+    if not icc_profile or ImageCms is None or img.mode not in ('RGB', 'L', 'CMYK'):
+        return img, False
+    try:
+        source = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        converted = ImageCms.profileToProfile(img, source, ImageCms.createProfile('sRGB'), outputMode='RGB')
+    except ImageCms.PyCMSError as e:
+        print(f"⚠ Keeping the ICC profile, conversion to sRGB failed: {e}", file=sys.stderr)
+        return img, False
+    converted.info = {key: value for key, value in img.info.items() if key != 'icc_profile'}
+    return converted, True
+
+
+def jpeg_save_args(img, options, converted):
+    """
+    Return the JPEG encoder arguments for options (see JPEG_OPTIONS),
+    including the metadata of img that is kept.
+
+    An ICC profile is only dropped once the pixels were converted to sRGB;
+    otherwise dropping it would change the colors.
+    """
+    save_args = {'progressive': options['progressive'], 'subsampling': options['subsampling']}
+    if not options['strip_metadata']:
+        save_args.update({key: img.info[key] for key in ('exif', 'xmp') if img.info.get(key)})
+    if img.info.get('icc_profile') and not converted:
+        save_args['icc_profile'] = img.info['icc_profile']
+    return save_args
+
+
+def report_jpeg_savings(img, quality, options, save_args, dropped_icc=0):
+    """
+    Print how many bytes each JPEG option saves compared with its
+    alternative, all else being equal.
+    """
+    final = len(_encode(img, False, quality, save_args))
+    kept_metadata = {key: img.info[key] for key in ('exif', 'xmp') if img.info.get(key)}
+    other_subsampling = '4:4:4' if options['subsampling'] != '4:4:4' else '4:2:0'
+
+    trials = [
+        ('progressive' if options['progressive'] else 'baseline',
+         dict(save_args, progressive=not options['progressive'])),
+        (f"{options['subsampling']} subsampling", dict(save_args, subsampling=other_subsampling)),
+    ]
+    if kept_metadata:
+        if options['strip_metadata']:
+            trials.append(('EXIF/XMP stripped', dict(save_args, **kept_metadata)))
+        else:
+            stripped = {key: value for key, value in save_args.items() if key not in kept_metadata}
+            trials.append(('EXIF/XMP kept', stripped))
+
+    print("Bytes saved by each option:")
+    for label, alternative in trials:
+        print(f"  {label}: {len(_encode(img, False, quality, alternative)) - final:+d}")
+    if dropped_icc:
+        print(f"  sRGB conversion: {dropped_icc:+d} (ICC profile dropped)")
+
+
+def draft_for(img, size):
+    """
+    Ask the JPEG decoder to decode at 1/2, 1/4 or 1/8 scale when the image
+    is going to be shrunk to size anyway, so a large photo is never
+    decoded at full resolution. Must be called before the pixels are
+    loaded; does nothing for other formats.
+
+    Returns:
+        The source box to pass to resize() for the reduced image, or None
+    """
+    if img.format != 'JPEG':
+        return None
+    gap_size = (int(size[0] * REDUCING_GAP), int(size[1] * REDUCING_GAP))
+    result = img.draft(None, gap_size)
+    return result[1] if result else None
+
+
+def downscale(img, size, box=None):
+    """
+    Resize img to size: integer box reduction first while the image is at
+    least REDUCING_GAP times the target, then Lanczos on the small image.
+    """
+    return img.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=REDUCING_GAP)
+
+
+def _luma_samples(img, size):
+    """
+    Return (width, height, pixels) of img as 8-bit luma, scaled so its
+    longer side is at most size.
+    """
+    img = img.convert('L')
+    if max(img.size) > size:
+        img.thumbnail((size, size), Image.Resampling.BOX)
+    return img.width, img.height, img.tobytes()
+
+
+def similarity(reference, candidate, size=256):
+    """
+    Mean structural similarity (SSIM) of two images' luma over 8x8 blocks.
+
+    Both images are compared at a reduced size (longer side = size), which
+    is plenty to catch blocking and banding and keeps a score cheap enough
+    to compute for every search step.
+
+    Returns:
+        Score in [-1, 1]; 1.0 means identical
+    """
+    width, height, a = _luma_samples(reference, size)
+    _, _, b = _luma_samples(candidate.resize(reference.size), size)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    scores = []
+    for y0 in range(0, height - 7, 8):
+        for x0 in range(0, width - 7, 8):
+            sum_a = sum_b = sum_aa = sum_bb = sum_ab = 0
+            for y in range(y0, y0 + 8):
+                row = y * width
+                for i in range(row + x0, row + x0 + 8):
+                    pa, pb = a[i], b[i]
+                    sum_a += pa
+                    sum_b += pb
+                    sum_aa += pa * pa
+                    sum_bb += pb * pb
+                    sum_ab += pa * pb
+            mean_a, mean_b = sum_a / 64, sum_b / 64
+            var_a = sum_aa / 64 - mean_a * mean_a
+            var_b = sum_bb / 64 - mean_b * mean_b
+            cov = sum_ab / 64 - mean_a * mean_b
+            scores.append(
+                ((2 * mean_a * mean_b + c1) * (2 * cov + c2))
+                / ((mean_a * mean_a + mean_b * mean_b + c1) * (var_a + var_b + c2))
+            )
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def _encode(img, is_png, quality, save_args=None):
+    buffer = io.BytesIO()
+    if is_png:
+        img.save(buffer, 'PNG', optimize=True)
+    else:
+        img.save(buffer, 'JPEG', quality=quality, optimize=True, **(save_args or {}))
+    return buffer.getvalue()
+
+
+def fit_to_budget(img, budget, is_png=False, min_similarity=DEFAULT_MIN_SIMILARITY, allow_resize=True,
+                  save_args=None):
+    """
+    Encode img as large (in quality) as fits in budget bytes.
+
+    Binary-searches JPEG quality between MIN_QUALITY and MAX_QUALITY for the
+    highest setting under the budget. If even that scores below
+    min_similarity against the uncompressed image, lowering quality further
+    would only make it worse, so the image is shrunk by RESIZE_STEP and the
+    search repeated. PNG output is lossless, so only shrinking applies.
+
+    Args:
+        img: RGB (or, for PNG, any mode) image to encode
+        budget: Maximum output size in bytes
+        is_png: Encode as PNG instead of JPEG
+        min_similarity: SSIM floor (see similarity())
+        allow_resize: Whether the image may be shrunk to meet the budget
+        save_args: Extra JPEG encoder arguments (see jpeg_save_args())
+
+    Returns:
+        (data, quality, image that was encoded, similarity), or None if the
+        budget can't be met within the quality/similarity/width limits
+    """
+    while True:
+        best = None
+        if is_png:
+            with span('encode'):
+                data = _encode(img, True, None)
+            if len(data) <= budget:
+                return data, None, img, 1.0
+        else:
+            low, high = MIN_QUALITY, MAX_QUALITY
+            while low <= high:
+                quality = (low + high) // 2
+                with span('encode'):
+                    data = _encode(img, False, quality, save_args)
+                if len(data) <= budget:
+                    best = (data, quality)
+                    low = quality + 1
+                else:
+                    high = quality - 1
+
+            if best is not None:
+                data, quality = best
+                with span('similarity'):
+                    score = similarity(img, Image.open(io.BytesIO(data)))
+                print(f"  {img.width}x{img.height}: quality {quality} -> {len(data)} bytes, similarity {score:.3f}")
+                if score >= min_similarity:
+                    return data, quality, img, score
+            else:
+                print(f"  {img.width}x{img.height}: over budget even at quality {MIN_QUALITY}")
+
+        new_width = int(img.width * RESIZE_STEP)
+        if not allow_resize or new_width < MIN_FIT_WIDTH:
+            return None
+        with span('resample'):
+            img = downscale(img, (new_width, max(1, round(img.height * new_width / img.width))))
+
+
+def _cache_params(max_width, quality, options, budget, min_similarity, allow_resize):
+    """
+    Return the settings that determine optimize_image() output, for the
+    build cache key.
+    """
+    params = {'max_width': max_width, 'quality': quality, 'pillow': PIL.__version__, 'jpeg': options}
+    if budget is not None:
+        params.update(budget=budget, min_similarity=min_similarity, allow_resize=allow_resize)
+    return params
 
-def optimize_image(input_path, output_path, max_width=800, quality=85):
+
+def optimize_image(input_path, output_path, max_width=800, quality=85, cache=None,
+                   budget=None, min_similarity=DEFAULT_MIN_SIMILARITY, allow_resize=True,
+                   jpeg_options=None, report_savings=False):
     """
     Optimize an image by resizing and compressing
 
+    The output format follows the output file extension: PNG outputs are
+    recompressed losslessly, anything else is written as JPEG.
+
     Args:
         input_path: Path to input image
         output_path: Path to save optimized image
         max_width: Maximum width in pixels (default 800)
-        quality: JPEG quality 1-100 (default 85)
+        quality: JPEG quality 1-100 (default 85); ignored with a budget
+        cache: Optional BuildCache; the work is skipped when the output is
+            already up to date for these exact input bytes and settings
+        budget: Optional maximum output size in bytes; quality (and, with
+            allow_resize, dimensions) are searched to fit it, and the image
+            fails to optimize if it can't be met (see fit_to_budget())
+        min_similarity: Similarity floor for the budget search
+        allow_resize: Whether the budget search may shrink the image
+        jpeg_options: Overrides for JPEG_OPTIONS (progressive,
+            strip_metadata, srgb, subsampling)
+        report_savings: Print the bytes each JPEG option saved, at the cost
+            of extra encodes (see report_jpeg_savings())
     """
+    options = dict(JPEG_OPTIONS, **(jpeg_options or {}))
+    if options['subsampling'] not in SUBSAMPLING_MODES:
+        raise ValueError(f"Unknown subsampling {options['subsampling']!r}, "
+                         f"expected one of {', '.join(SUBSAMPLING_MODES)}")
+    params = _cache_params(max_width, quality, options, budget, min_similarity, allow_resize)
+    key = None
+
     try:
-        # Open the image
-        img = Image.open(input_path)
+        if cache is not None:
+            with span('cache'):
+                key = cache_key(params, [input_path])
+                fresh = cache.is_fresh(output_path, key)
+            if fresh:
+                print(f"{output_path} is up to date, skipping")
+                return True
+
+        with span('open'):
+            # Open the image
+            img = Image.open(input_path)
 
-        # Get current dimensions
-        width, height = img.size
+            # Get current dimensions (as displayed, after EXIF orientation)
+            width, height = display_size(img)
         print(f"Original size: {width}x{height}")
 
         # Calculate new dimensions maintaining aspect ratio
@@ -28,20 +415,65 @@ def optimize_image(input_path, output_path, max_width=800, quality=85):
             new_width = max_width
             new_height = int(height * ratio)
 
-            # Resize image with high-quality resampling
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Decode large JPEGs at reduced scale, then resize with
+            # high-quality resampling
+            with span('decode'):
+                img, box = load_oriented(img, (new_width, new_height))
+            with span('resample'):
+                img = downscale(img, (new_width, new_height), box)
             print(f"Resized to: {new_width}x{new_height}")
         else:
+            with span('decode'):
+                img, _ = load_oriented(img)
             print(f"Image width ({width}px) is already <= {max_width}px, skipping resize")
 
-        # Convert to RGB if necessary (removes alpha channel)
-        if img.mode in ('RGBA', 'P'):
-            img = img.convert('RGB')
+        # Save with optimization; identical bytes are not rewritten
+        is_png = output_path.lower().endswith('.png')
+        save_args = None
+        dropped_icc = 0
+        if not is_png:
+            converted = False
+            with span('convert'):
+                if options['srgb']:
+                    icc_size = len(img.info.get('icc_profile') or b'')
+                    img, converted = convert_to_srgb(img)
+                    dropped_icc = icc_size if converted else 0
+                if img.mode not in ('RGB', 'L'):
+                    # Convert to RGB if necessary (removes alpha channel)
+                    img = img.convert('RGB')
+            save_args = jpeg_save_args(img, options, converted)
 
-        # Save with optimization
-        img.save(output_path, 'JPEG', quality=quality, optimize=True)
-        print(f"Saved optimized image to: {output_path}")
-        print(f"Quality setting: {quality}")
+        if budget is not None:
+            print(f"Fitting into {budget} bytes...")
+            fit_width = img.width
+            with span('fit to budget'):
+                fitted = fit_to_budget(img, budget, is_png, min_similarity, allow_resize, save_args)
+            if fitted is None:
+                print(f"✗ Cannot fit {input_path} into {budget} bytes "
+                      f"above similarity {min_similarity}", file=sys.stderr)
+                return False
+            data, quality, img, _ = fitted
+            if img.width != fit_width:
+                print(f"Resized to: {img.width}x{img.height} to meet the budget")
+        else:
+            with span('encode'):
+                data = _encode(img, is_png, quality, save_args)
+
+        with span('write'):
+            write_if_changed(output_path, data)
+        print(f"Saved optimized image to: {output_path} ({len(data)} bytes)")
+        if not is_png:
+            print(f"Quality setting: {quality}")
+        if not is_png and report_savings:
+            with span('report savings'):
+                report_jpeg_savings(img, quality, options, save_args, dropped_icc)
+
+        if cache is not None:
+            # When optimizing in place, the new file is what the next run
+            # sees as its input, so key the entry on the output bytes
+            if output_path == input_path:
+                key = cache_key(params, [output_path])
+            cache.record(output_path, key)
 
         return True
 
@@ -49,9 +481,350 @@ def optimize_image(input_path, output_path, max_width=800, quality=85):
         print(f"Error optimizing image: {e}", file=sys.stderr)
         return False
 
-if __name__ == "__main__":
-    input_file = "images/profile.jpg"
-    output_file = "images/profile.jpg"
 
-    success = optimize_image(input_file, output_file, max_width=800, quality=85)
-    sys.exit(0 if success else 1)
+def supported_variant_formats():
+    """
+    Return the entries of VARIANT_FORMATS this Pillow build can write.
+    """
+    Image.init()
+    return [entry for entry in VARIANT_FORMATS if entry[0] in Image.SAVE]
+
+
+def variant_widths(source_width, widths=DEFAULT_WIDTHS):
+    """
+    Return the ladder widths that do not upscale, plus the source width
+    itself when it is smaller than the largest rung.
+    """
+    ladder = sorted({w for w in widths if w < source_width})
+    if source_width <= max(widths):
+        ladder.append(source_width)
+    return ladder
+
+
+def generate_variants(input_path, output_dir, widths=DEFAULT_WIDTHS, quality=85, cache=None):
+    """
+    Encode an image at several widths in every supported modern format
+    plus a JPEG (or PNG, for PNG sources) fallback.
+
+    Variants are named <stem>-<width>.<ext> inside output_dir. PNG
+    fallbacks go through optimize_png.recompress_png(), except at the
+    source's own width, where the source file is copied as it is.
+
+    Args:
+        input_path: Path to the source image
+        output_dir: Directory for the variants
+        widths: Width ladder in pixels; widths above the source are dropped
+        quality: Encoder quality 1-100 for the lossy formats (default 85)
+        cache: Optional BuildCache; up-to-date variants are not re-encoded
+
+    Returns:
+        Dict with the source 'width' and 'height', a 'sources' list, one
+        entry per format (modern formats first, fallback last), each with
+        'format', 'mime' and 'files' as (path, width, height) tuples, and
+        'default', the fallback-format file a browser without srcset
+        support should load: the middle rung of the ladder, so it gets
+        the 1x content-column width rather than the 2x retina variant
+    """
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    is_png = input_path.lower().endswith('.png')
+    fallback = ('PNG', '.png', 'image/png') if is_png else ('JPEG', '.jpg', 'image/jpeg')
+    formats = supported_variant_formats() + [fallback]
+
+    with Image.open(input_path) as source:
+        source_width, source_height = display_size(source)
+        ladder = variant_widths(source_width, widths)
+        params = {'quality': quality, 'pillow': PIL.__version__, 'jpeg': JPEG_OPTIONS, 'png': OPTIMIZER_VERSION}
+        img = None
+        box = None
+
+        sources = []
+        for format_name, extension, mime in formats:
+            files = []
+            for width in ladder:
+                height = max(1, round(source_height * width / source_width))
+                path = os.path.join(output_dir, f"{stem}-{width}{extension}")
+                files.append((path, width, height))
+
+                key = cache_key(dict(params, format=format_name, width=width), [input_path])
+                if cache is not None and cache.is_fresh(path, key):
+                    continue
+
+                if format_name == 'PNG' and width >= source_width:
+                    # Re-encoding the full-size PNG can only lose to the
+                    # source, which optimize_png.py already recompressed
+                    with span('write'):
+                        with open(input_path, 'rb') as f:
+                            data = f.read()
+                        write_if_changed(path, data)
+                        if cache is not None:
+                            cache.record(path, key)
+                    print(f"Copied {format_name} source as variant: {path} ({len(data)} bytes)")
+                    continue
+
+                if img is None:
+                    with span('decode'):
+                        img, box = load_oriented(source, (ladder[-1], round(source_height * ladder[-1] / source_width)))
+                    with span('convert'):
+                        # None of the formats carry the ICC profile, so convert to sRGB
+                        img, _ = convert_to_srgb(img)
+                        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') and is_png else 'RGB')
+                with span('resample'):
+                    resized = img if width == source_width else downscale(img, (width, height), box)
+
+                buffer = io.BytesIO()
+                with span(f'encode {format_name}'):
+                    if format_name == 'PNG':
+                        # Pillow's encoding is only the input for the
+                        # lossless layout, filter and zlib search
+                        resized.save(buffer, 'PNG', compress_level=1)
+                        buffer = io.BytesIO(recompress_png(buffer.getvalue(), fast=True)[0])
+                    elif format_name == 'JPEG':
+                        resized.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True,
+                                                    progressive=JPEG_OPTIONS['progressive'],
+                                                    subsampling=JPEG_OPTIONS['subsampling'])
+                    else:
+                        resized.save(buffer, format_name, quality=quality)
+                with span('write'):
+                    write_if_changed(path, buffer.getvalue())
+                    if cache is not None:
+                        cache.record(path, key)
+                print(f"Saved {format_name} variant: {path} ({len(buffer.getvalue())} bytes)")
+
+            sources.append({'format': format_name, 'mime': mime, 'files': files})
+
+    default = sources[-1]['files'][(len(ladder) - 1) // 2]
+    return {'width': source_width, 'height': source_height, 'sources': sources, 'default': default}
+
+
+def _glob_base(pattern):
+    """
+    Return the directory part of a glob pattern before its first wildcard.
+    """
+    parts = []
+    for part in pattern.replace(os.sep, '/').split('/')[:-1]:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+
+def collect_images(sources):
+    """
+    Expand directories and glob patterns into image files.
+
+    Args:
+        sources: Directories (searched recursively), glob patterns
+            (``**`` supported) or plain file paths
+
+    Returns:
+        Sorted list of (input path, path relative to its source root)
+    """
+    found = {}
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for name in files:
+                    path = os.path.join(root, name)
+                    found[path] = os.path.relpath(path, source)
+        else:
+            base = _glob_base(source)
+            for path in glob.glob(source, recursive=True):
+                if os.path.isfile(path):
+                    found[path] = os.path.relpath(path, base)
+
+    return sorted(
+        (path, relative) for path, relative in found.items()
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def optimize_options(jpeg_options=None, report_savings=False, budget=None,
+                     min_similarity=DEFAULT_MIN_SIMILARITY, allow_resize=True):
+    """
+    Collect the optimize_image() keyword arguments shared by every image of
+    a run; the budget search settings are only passed with a budget.
+    """
+    options = {'jpeg_options': jpeg_options, 'report_savings': report_savings}
+    if budget is not None:
+        options.update(budget=budget, min_similarity=min_similarity, allow_resize=allow_resize)
+    return options
+
+
+def _optimize_worker(input_path, output_path, max_width, quality, options):
+    """
+    Run optimize_image in a worker process, capturing its log output so
+    results from parallel workers are printed one file at a time.
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        success = optimize_image(input_path, output_path, max_width, quality, **options)
+    return success, log.getvalue()
+
+
+def optimize_batch(sources, output_dir, max_width=800, quality=85, jobs=None, force=False,
+                   budget=None, min_similarity=DEFAULT_MIN_SIMILARITY, allow_resize=True,
+                   jpeg_options=None, report_savings=False):
+    """
+    Optimize many images in parallel into an output tree.
+
+    Originals are never modified: each file is written to output_dir under
+    its path relative to the directory (or glob base) it was found in.
+    Files whose output is up to date according to the build cache are
+    skipped without starting a worker.
+
+    Args:
+        sources: Directories, glob patterns or files (see collect_images)
+        output_dir: Root of the output tree
+        max_width: Maximum width in pixels (default 800)
+        quality: JPEG quality 1-100 (default 85)
+        jobs: Worker processes (default: one per CPU); 1 optimizes in
+            this process
+        force: Ignore the build cache and re-optimize every file
+        budget: Optional per-file byte budget (see optimize_image)
+        min_similarity: Similarity floor for the budget search
+        allow_resize: Whether the budget search may shrink images
+        jpeg_options: Overrides for JPEG_OPTIONS
+        report_savings: Print the bytes each JPEG option saved per image
+
+    Returns:
+        (optimized, skipped, failed) counts; images that miss the budget
+        count as failed
+    """
+    options = optimize_options(jpeg_options, report_savings, budget, min_similarity, allow_resize)
+    params = _cache_params(max_width, quality, dict(JPEG_OPTIONS, **(jpeg_options or {})),
+                           budget, min_similarity, allow_resize)
+    images = collect_images(sources)
+    optimized = skipped = failed = 0
+
+    with BuildCache(enabled=not force) as cache:
+        pending = {}
+        for input_path, relative in images:
+            output_path = os.path.join(output_dir, relative)
+            key = cache_key(params, [input_path])
+            if cache.is_fresh(output_path, key):
+                print(f"✓ {output_path} is up to date, skipping")
+                skipped += 1
+            else:
+                pending[output_path] = (input_path, key)
+
+        if not pending:
+            return optimized, skipped, failed
+
+        # With one job, optimize in this process so --profile sees every stage
+        with ProcessPoolExecutor(max_workers=jobs) if jobs != 1 else contextlib.nullcontext() as pool:
+            if pool is None:
+                outcomes = (
+                    (output_path, _optimize_worker(input_path, output_path, max_width, quality, options))
+                    for output_path, (input_path, _) in pending.items()
+                )
+            else:
+                futures = {
+                    output_path: pool.submit(_optimize_worker, input_path, output_path, max_width, quality,
+                                              options)
+                    for output_path, (input_path, _) in pending.items()
+                }
+                outcomes = ((output_path, future.result()) for output_path, future in futures.items())
+            for output_path, (success, log) in outcomes:
+                input_path, key = pending[output_path]
+                print(f"\n{input_path} -> {output_path}")
+                print(log, end='')
+                if success:
+                    cache.record(output_path, key)
+                    optimized += 1
+                else:
+                    failed += 1
+
+    return optimized, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resize and recompress site images")
+    parser.add_argument('--batch', nargs='+', metavar='SOURCE',
+                        help="directories or glob patterns to optimize into --output-dir")
+    parser.add_argument('--variants', nargs='+', metavar='IMAGE',
+                        help="images to encode as responsive variants into --output-dir")
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)),
+                        help="comma-separated width ladder for --variants "
+                             f"(default {','.join(map(str, DEFAULT_WIDTHS))})")
+    parser.add_argument('--output-dir', default=None,
+                        help="output directory for the default run and --batch (default build/images) "
+                             "or --variants (default images/responsive)")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes for --batch (default: one per CPU)")
+    parser.add_argument('--max-width', type=int, default=800,
+                        help="maximum width in pixels (default 800)")
+    parser.add_argument('--quality', type=int, default=85,
+                        help="JPEG quality 1-100 (default 85)")
+    parser.add_argument('--budget', choices=sorted(IMAGE_BUDGETS),
+                        help="fit each image into this class's byte budget from docs/IMAGES.md "
+                             + ', '.join(f"({name}: {size // 1024} KB)" for name, size in IMAGE_BUDGETS.items()))
+    parser.add_argument('--budget-bytes', type=int, default=None,
+                        help="explicit byte budget (overrides --budget)")
+    parser.add_argument('--min-similarity', type=float, default=DEFAULT_MIN_SIMILARITY,
+                        help=f"SSIM floor for the budget search (default {DEFAULT_MIN_SIMILARITY})")
+    parser.add_argument('--no-resize', action='store_true',
+                        help="never shrink images to meet a budget, only lower quality")
+    parser.add_argument('--no-progressive', action='store_true',
+                        help="write baseline instead of progressive JPEGs")
+    parser.add_argument('--keep-metadata', action='store_true',
+                        help="keep EXIF/XMP metadata in JPEG output")
+    parser.add_argument('--no-srgb', action='store_true',
+                        help="keep embedded ICC profiles instead of converting to sRGB")
+    parser.add_argument('--subsampling', choices=SUBSAMPLING_MODES, default=JPEG_OPTIONS['subsampling'],
+                        help=f"JPEG chroma subsampling (default {JPEG_OPTIONS['subsampling']})")
+    parser.add_argument('--report-savings', action='store_true',
+                        help="re-encode with each JPEG option flipped and report the bytes it saved")
+    parser.add_argument('--force', action='store_true',
+                        help="ignore the build cache and re-optimize everything")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    return profiling.run(lambda: optimize(args), args.profile, args.cprofile, name='optimize_image')
+
+
+def optimize(args):
+    """
+    Run the mode selected on the command line; returns the exit status.
+    """
+
+    jpeg_options = {
+        'progressive': not args.no_progressive,
+        'strip_metadata': not args.keep_metadata,
+        'srgb': not args.no_srgb,
+        'subsampling': args.subsampling,
+    }
+
+    budget = args.budget_bytes or IMAGE_BUDGETS.get(args.budget)
+    options = optimize_options(jpeg_options, args.report_savings, budget, args.min_similarity,
+                               not args.no_resize)
+
+    if args.variants:
+        widths = [int(w) for w in args.widths.split(',') if w.strip()]
+        with BuildCache(enabled=not args.force) as cache:
+            for input_file in args.variants:
+                print(f"\nGenerating variants for {input_file}...")
+                generate_variants(input_file, args.output_dir or 'images/responsive',
+                                  widths, args.quality, cache=cache)
+        return 0
+
+    if not args.batch:
+        input_file = "images/profile.jpg"
+        output_file = os.path.join(args.output_dir or 'build/images', os.path.basename(input_file))
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            print(f"✗ Refusing to overwrite {input_file}; pick another --output-dir", file=sys.stderr)
+            return 1
+
+        with BuildCache(enabled=not args.force) as cache:
+            success = optimize_image(input_file, output_file, args.max_width, args.quality, cache=cache,
+                                     **options)
+        return 0 if success else 1
+
+    optimized, skipped, failed = optimize_batch(
+        args.batch, args.output_dir or 'build/images', args.max_width, args.quality, args.jobs, args.force,
+        **options
+    )
+    print(f"\nOptimized: {optimized}, up to date: {skipped}, failed: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
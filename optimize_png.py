@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Losslessly recompress existing PNG files.
+
+Each PNG is decoded with png_encoder.read_png() and re-encoded in every
+layout that represents exactly the same pixels:
+
+- indexed color (1/2/4/8-bit palette plus tRNS alpha) when the image has
+  at most 256 distinct colors,
+- grayscale (at the smallest bit depth that holds every value), with an
+  alpha channel only if some pixel is not opaque,
+- RGB, or RGBA only if some pixel is not opaque,
+- 16-bit images stay 16-bit unless every sample fits in 8 bits.
+
+Every layout is tried with each scanline filter strategy and with the
+zlib strategies Z_DEFAULT_STRATEGY, Z_FILTERED and Z_RLE at levels 9, 8
+and 6, with the trials spread over a process pool. The smallest result is decoded again and
+compared pixel-for-pixel with the original before it replaces the file.
+
+Only the chunks needed to display the image are kept (IHDR, PLTE, tRNS,
+IDAT, IEND); text, timestamps, physical size and color-space chunks such
+as sRGB, gAMA and iCCP are dropped, so images are assumed to be sRGB.
+
+Usage:
+    python optimize_png.py [PATH ...] [--jobs N] [--fast] [--force]
+        Recompress the given PNG files, or every PNG under the given
+        directories (default: images/), in place. Files are only
+        rewritten when the result is smaller; files already recompressed
+        are skipped via the build cache.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import png_encoder
+from build_cache import BuildCache, cache_key, write_if_changed
+from png_encoder import (
+    COLOR_TYPE_CHANNELS,
+    COLOR_TYPE_GRAY,
+    COLOR_TYPE_GRAY_ALPHA,
+    COLOR_TYPE_PALETTE,
+    COLOR_TYPE_RGB,
+    COLOR_TYPE_RGBA,
+    MAX_PALETTE_COLORS,
+    iter_index_rows,
+    iter_scanlines,
+    palette_bit_depth,
+    read_png,
+    write_filtered_png,
+    write_png,
+)
+
+# Bump when a change can alter the output for the same input file
+OPTIMIZER_VERSION = 2
+
+# Filter strategies tried for every layout; 'brute' is by far the slowest
+FILTER_TRIALS = ('none', 'sub', 'up', 'average', 'paeth', 'minsum', 'brute')
+
+ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'rle': zlib.Z_RLE,
+}
+
+# zlib levels tried with each strategy; the lower levels use shorter match
+# searches, which now and then happen to give a smaller stream
+ZLIB_LEVELS = (9, 8, 6)
+
+
+def _unpack_samples(row, count, bit_depth):
+    """
+    Return the first count sub-byte samples of a packed scanline.
+    """
+    per_byte = 8 // bit_depth
+    mask = (1 << bit_depth) - 1
+    return [
+        (row[i // per_byte] >> (8 - bit_depth * (i % per_byte + 1))) & mask
+        for i in range(count)
+    ]
+
+
+def _color_key(transparency, bit_depth):
+    """
+    Return the tRNS color key of a grayscale or RGB image as one byte per
+    sample (16-bit keys reduced to 8 bits), or None when no pixel can
+    match it because the key does not fit the reduced sample depth.
+    """
+    high, low = transparency[0::2], transparency[1::2]
+    if bit_depth == 16:
+        return high if high == low else None
+    return low if not any(high) else None
+
+
+def to_rgba8(png):
+    """
+    Expand a decoded PNG (see read_png()) to packed 8-bit RGBA.
+
+    Returns:
+        RGBA bytes, or None for 16-bit images whose samples do not all fit
+        in 8 bits (those can only be re-encoded in their own layout)
+    """
+    width, height = png['width'], png['height']
+    color_type, bit_depth = png['color_type'], png['bit_depth']
+    transparency = png['transparency']
+    raw = b''.join(png['rows'])
+
+    key = None
+    if transparency is not None and color_type in (COLOR_TYPE_GRAY, COLOR_TYPE_RGB):
+        key = _color_key(transparency, bit_depth)
+
+    if bit_depth == 16:
+        high, low = raw[0::2], raw[1::2]
+        if high != low:
+            return None
+        raw = high
+        bit_depth = 8
+
+    pixel_count = width * height
+    rgba = bytearray(pixel_count * 4)
+
+    if color_type == COLOR_TYPE_PALETTE or bit_depth < 8:
+        samples = []
+        for row in png['rows']:
+            if bit_depth == 8:
+                samples.extend(row)
+            else:
+                samples.extend(_unpack_samples(row, width, bit_depth))
+        if color_type == COLOR_TYPE_PALETTE:
+            alphas = list(transparency or b'')
+            alphas += [255] * (len(png['palette']) - len(alphas))
+            lookup = [bytes(color) + bytes([alpha]) for color, alpha in zip(png['palette'], alphas)]
+            return b''.join(lookup[index] for index in samples)
+
+        # Low bit depth grayscale: scale to the full 0-255 range
+        scale = 255 // ((1 << bit_depth) - 1)
+        gray_key = key[0] if key is not None else None
+        gray = bytes(value * scale for value in samples)
+        rgba[0::4] = rgba[1::4] = rgba[2::4] = gray
+        rgba[3::4] = bytes(0 if value == gray_key else 255 for value in samples)
+        return bytes(rgba)
+
+    channels = COLOR_TYPE_CHANNELS[color_type]
+    if color_type in (COLOR_TYPE_GRAY, COLOR_TYPE_GRAY_ALPHA):
+        rgba[0::4] = rgba[1::4] = rgba[2::4] = raw[0::channels]
+    else:
+        for c in range(3):
+            rgba[c::4] = raw[c::channels]
+
+    if color_type in (COLOR_TYPE_GRAY_ALPHA, COLOR_TYPE_RGBA):
+        rgba[3::4] = raw[channels - 1::channels]
+    elif key is not None:
+        it = iter(raw)
+        pixels = zip(it, it, it) if color_type == COLOR_TYPE_RGB else ((value,) for value in it)
+        rgba[3::4] = bytes(0 if bytes(pixel) == key else 255 for pixel in pixels)
+    else:
+        rgba[3::4] = b'\xff' * pixel_count
+    return bytes(rgba)
+
+
+def _gray_bit_depth(values):
+    """
+    Return the smallest grayscale bit depth that represents every 8-bit
+    value in the set exactly.
+    """
+    for bit_depth in (1, 2, 4):
+        scale = 255 // ((1 << bit_depth) - 1)
+        if all(value % scale == 0 for value in values):
+            return bit_depth
+    return 8
+
+
+def candidate_layouts(png):
+    """
+    Return every lossless re-encoding layout of a decoded PNG.
+
+    Each layout is a dict with the write_filtered_png() header arguments
+    ('color_type', 'bit_depth', 'palette', 'transparency'), the packed
+    'rows' and a short 'name'.
+    """
+    width, height = png['width'], png['height']
+    rgba = to_rgba8(png)
+    if rgba is None:
+        return [{
+            'name': f"original {png['bit_depth']}-bit",
+            'color_type': png['color_type'],
+            'bit_depth': png['bit_depth'],
+            'palette': png['palette'],
+            'transparency': png['transparency'],
+            'rows': png['rows'],
+        }]
+
+    stride = width * 4
+    alpha = rgba[3::4]
+    opaque = alpha == b'\xff' * len(alpha)
+    red = rgba[0::4]
+    gray = red == rgba[1::4] == rgba[2::4]
+    layouts = []
+
+    # Indexed color: transparent entries first so tRNS can stop early
+    colors = set()
+    for start in range(0, len(rgba), 4096 * 4):
+        it = iter(rgba[start:start + 4096 * 4])
+        colors.update(zip(it, it, it, it))
+        if len(colors) > MAX_PALETTE_COLORS:
+            break
+    if len(colors) <= MAX_PALETTE_COLORS:
+        entries = sorted(colors, key=lambda color: (color[3] == 255, color))
+        lookup = {color: index for index, color in enumerate(entries)}
+        it = iter(rgba)
+        indices = bytes(map(lookup.__getitem__, zip(it, it, it, it)))
+        bit_depth = palette_bit_depth(len(entries))
+        alphas = bytes(color[3] for color in entries if color[3] != 255)
+        layouts.append({
+            'name': f"{bit_depth}-bit palette",
+            'color_type': COLOR_TYPE_PALETTE,
+            'bit_depth': bit_depth,
+            'palette': [color[:3] for color in entries],
+            'transparency': alphas or None,
+            'rows': [bytes(row) for row in iter_index_rows(width, height, indices, bit_depth)],
+        })
+
+    if gray and opaque:
+        bit_depth = _gray_bit_depth(set(red))
+        scale = 255 // ((1 << bit_depth) - 1)
+        values = red if bit_depth == 8 else bytes(value // scale for value in red)
+        layouts.append({
+            'name': f"{bit_depth}-bit gray",
+            'color_type': COLOR_TYPE_GRAY,
+            'bit_depth': bit_depth,
+            'palette': None,
+            'transparency': None,
+            'rows': [bytes(row) for row in iter_index_rows(width, height, values, bit_depth)],
+        })
+    elif gray:
+        gray_alpha = bytearray(len(red) * 2)
+        gray_alpha[0::2] = red
+        gray_alpha[1::2] = alpha
+        layouts.append({
+            'name': 'gray + alpha',
+            'color_type': COLOR_TYPE_GRAY_ALPHA,
+            'bit_depth': 8,
+            'palette': None,
+            'transparency': None,
+            'rows': [bytes(gray_alpha[y * width * 2:(y + 1) * width * 2]) for y in range(height)],
+        })
+    elif opaque:
+        rgb = bytearray(len(red) * 3)
+        for c in range(3):
+            rgb[c::3] = rgba[c::4]
+        layouts.append({
+            'name': 'RGB',
+            'color_type': COLOR_TYPE_RGB,
+            'bit_depth': 8,
+            'palette': None,
+            'transparency': None,
+            'rows': [bytes(rgb[y * width * 3:(y + 1) * width * 3]) for y in range(height)],
+        })
+    else:
+        layouts.append({
+            'name': 'RGBA',
+            'color_type': COLOR_TYPE_RGBA,
+            'bit_depth': 8,
+            'palette': None,
+            'transparency': None,
+            'rows': [rgba[y * stride:(y + 1) * stride] for y in range(height)],
+        })
+
+    return layouts
+
+
+def run_trial(width, height, layout, filter_strategy):
+    """
+    Encode one layout with one filter strategy under every zlib strategy
+    and level; runs in a worker process. The 'brute' filter picks each
+    row's filter by compressing it, so it is only tried at level 9.
+
+    Returns:
+        (PNG bytes, description) of the smallest encoding
+    """
+    header = (layout['color_type'], layout['bit_depth'], layout['palette'], layout['transparency'])
+    channels = COLOR_TYPE_CHANNELS[layout['color_type']]
+    lines = None
+    if filter_strategy != 'brute':
+        # The filters don't depend on the compressor, so filter only once
+        lines = list(iter_scanlines(width, layout['rows'], filter_strategy, 9,
+                                    layout['bit_depth'], channels))
+
+    best = None
+    for level in ZLIB_LEVELS if lines is not None else ZLIB_LEVELS[:1]:
+        for zlib_name, zlib_strategy in ZLIB_STRATEGIES.items():
+            output = io.BytesIO()
+            if lines is None:
+                color_type, bit_depth, palette, transparency = header
+                write_png(output, width, height, layout['rows'], level, filter_strategy,
+                          palette=palette, bit_depth=bit_depth, color_type=color_type,
+                          transparency=transparency, compression_strategy=zlib_strategy)
+            else:
+                write_filtered_png(output, width, height, lines, *header, compression_level=level,
+                                   compression_strategy=zlib_strategy)
+            data = output.getvalue()
+            if best is None or len(data) < len(best[0]):
+                best = (data, f"{layout['name']}, {filter_strategy} filter, {zlib_name} zlib level {level}")
+    return best
+
+
+def recompress_png(data, jobs=None, fast=False):
+    """
+    Find the smallest lossless re-encoding of a PNG file.
+
+    Args:
+        data: The PNG file as bytes
+        jobs: Worker processes for the trials (default: one per CPU)
+        fast: Skip the slow 'brute' filter trials
+
+    Returns:
+        (PNG bytes, description of the winning trial)
+    """
+    png = read_png(data)
+    width, height = png['width'], png['height']
+    layouts = candidate_layouts(png)
+    filters = [f for f in FILTER_TRIALS if not (fast and f == 'brute')]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(run_trial, width, height, layout, filter_strategy)
+            for layout in layouts for filter_strategy in filters
+        ]
+        results = [future.result() for future in futures]
+    best, description = min(results, key=lambda result: len(result[0]))
+
+    # Never trust a re-encoding that doesn't decode to the same pixels
+    decoded = read_png(best)
+    original_pixels = to_rgba8(png)
+    if original_pixels is None:
+        identical = decoded['rows'] == png['rows']
+    else:
+        identical = to_rgba8(decoded) == original_pixels
+    if not identical:
+        raise ValueError("Re-encoded PNG does not match the original pixels")
+    return best, description
+
+
+def optimize_png(path, jobs=None, fast=False, cache=None):
+    """
+    Recompress one PNG in place if that makes it smaller.
+
+    Args:
+        path: PNG file to optimize
+        jobs: Worker processes for the trials (default: one per CPU)
+        fast: Skip the slow 'brute' filter trials
+        cache: Optional BuildCache; files this optimizer already produced
+            (or could not shrink) with the same settings are skipped
+
+    Returns:
+        (size before, size after), or None if the file was up to date
+    """
+    params = {'optimizer': OPTIMIZER_VERSION, 'fast': fast}
+    sources = [path, __file__, png_encoder.__file__]
+    if cache is not None and cache.is_fresh(path, cache_key(params, sources)):
+        return None
+
+    with open(path, 'rb') as f:
+        original = f.read()
+    best, description = recompress_png(original, jobs, fast)
+    if len(best) < len(original):
+        write_if_changed(path, best)
+        print(f"  {description}")
+
+    if cache is not None:
+        # Keyed on the bytes now on disk, which are the next run's input
+        cache.record(path, cache_key(params, sources))
+    return len(original), min(len(best), len(original))
+
+
+def collect_pngs(paths):
+    """
+    Expand files and directories (searched recursively) into PNG paths.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, name) for name in files if name.lower().endswith('.png'))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Losslessly recompress PNG files in place")
+    parser.add_argument('paths', nargs='*', default=['images'],
+                        help="PNG files or directories to search (default images/)")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes for the trials (default: one per CPU)")
+    parser.add_argument('--fast', action='store_true',
+                        help="skip the slow brute-force filter trials")
+    parser.add_argument('--force', action='store_true',
+                        help="ignore the build cache and retry every file")
+    args = parser.parse_args()
+
+    total_before = total_after = 0
+    failed = 0
+    with BuildCache(enabled=not args.force) as cache:
+        for path in collect_pngs(args.paths):
+            start = time.perf_counter()
+            try:
+                result = optimize_png(path, args.jobs, args.fast, cache)
+            except (OSError, ValueError, zlib.error) as e:
+                print(f"✗ {path}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            if result is None:
+                print(f"✓ {path} is up to date, skipping")
+                continue
+            before, after = result
+            total_before += before
+            total_after += after
+            print(f"✓ {path}: {before} -> {after} bytes "
+                  f"(-{(before - after) / before:.1%}) in {time.perf_counter() - start:.1f}s")
+
+    if total_before:
+        print(f"\nTotal: {total_before} -> {total_after} bytes, saved {total_before - total_after}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,781 @@
+#!/usr/bin/env python3
+"""
+Dependency-free PNG writer shared by the icon generators.
+
+Pixels can be passed either as a sequence of (r, g, b) tuples or as packed
+RGB bytes (anything supporting the buffer protocol: bytes, bytearray,
+memoryview, array.array('B'), ...). Scanlines are assembled in a single
+preallocated buffer so encoding time grows linearly with the pixel count.
+
+Each scanline can use any of the five PNG filter types, either fixed or
+chosen per row by a heuristic (see FILTER_STRATEGIES). Filters are applied
+to whole scanlines with NumPy when it is installed and byte by byte
+otherwise; both give the same output.
+
+write_png() streams rows from any iterable straight to a file object, so
+large images never need to be held in memory; create_png() is the
+in-memory convenience wrapper used for icons. create_png() switches to
+indexed color (PLTE + 1/2/4/8-bit indices) whenever the image has at most
+256 distinct colors, and can optionally quantize images that have more.
+
+read_png() decodes any non-interlaced PNG back into raw scanlines, so
+existing files can be re-encoded (see optimize_png.py).
+"""
+
+import io
+import struct
+import zlib
+from itertools import chain
+
+from profiling import span
+from quantize import QUANTIZERS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # filters fall back to per-byte Python loops
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Bump whenever a change alters the bytes create_png()/create_ico() produce
+# for the same input; the build cache keys generated icons on it
+ENCODER_VERSION = 1
+
+# Bytes per pixel for 8-bit RGB (color type 2)
+RGB_CHANNELS = 3
+
+# IHDR color types
+COLOR_TYPE_GRAY = 0
+COLOR_TYPE_RGB = 2
+COLOR_TYPE_PALETTE = 3
+COLOR_TYPE_GRAY_ALPHA = 4
+COLOR_TYPE_RGBA = 6
+
+# Samples per pixel and allowed bit depths for each color type
+COLOR_TYPE_CHANNELS = {
+    COLOR_TYPE_GRAY: 1,
+    COLOR_TYPE_RGB: 3,
+    COLOR_TYPE_PALETTE: 1,
+    COLOR_TYPE_GRAY_ALPHA: 2,
+    COLOR_TYPE_RGBA: 4,
+}
+COLOR_TYPE_BIT_DEPTHS = {
+    COLOR_TYPE_GRAY: (1, 2, 4, 8, 16),
+    COLOR_TYPE_RGB: (8, 16),
+    COLOR_TYPE_PALETTE: (1, 2, 4, 8),
+    COLOR_TYPE_GRAY_ALPHA: (8, 16),
+    COLOR_TYPE_RGBA: (8, 16),
+}
+
+# Largest palette a PLTE chunk can hold
+MAX_PALETTE_COLORS = 256
+
+# Compressed bytes per IDAT chunk when streaming
+DEFAULT_IDAT_CHUNK_SIZE = 64 * 1024
+
+# PNG scanline filter types
+FILTER_NONE = 0
+FILTER_SUB = 1
+FILTER_UP = 2
+FILTER_AVERAGE = 3
+FILTER_PAETH = 4
+
+# Fixed strategies map to a single filter type; 'minsum' picks the filter
+# with the smallest sum of absolute (signed) residuals, 'brute' picks the
+# filter that actually grows the zlib stream the least.
+FILTER_STRATEGIES = {
+    'none': FILTER_NONE,
+    'sub': FILTER_SUB,
+    'up': FILTER_UP,
+    'average': FILTER_AVERAGE,
+    'paeth': FILTER_PAETH,
+    'minsum': None,
+    'brute': None,
+}
+
+# Maps a residual byte to the magnitude of its signed value, so the
+# minsum cost of a row is sum(row.translate(_ABS_RESIDUAL)).
+_ABS_RESIDUAL = bytes(v if v < 128 else 256 - v for v in range(256))
+
+ALL_FILTERS = (FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH)
+
+# With indexed='auto', images up to this many pixels are also encoded as
+# RGB, since a PLTE chunk (up to 768 bytes) can outweigh what one-byte
+# indices save on a tiny image. Above it the palette always wins by far.
+AUTO_RGB_TRIAL_MAX_PIXELS = 64 * 64
+
+
+def make_chunk(chunk_type, data):
+    """
+    Build a PNG chunk: length, type, data and CRC of type + data.
+    """
+    crc = zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', crc)
+
+
+def pack_pixels(width, height, pixels):
+    """
+    Return the image as a flat memoryview of packed RGB bytes.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        pixels: Sequence of (r, g, b) tuples, or packed RGB bytes in any
+            object that supports the buffer protocol
+    """
+    expected = width * height * RGB_CHANNELS
+
+    try:
+        packed = memoryview(pixels).cast('B')
+    except TypeError:
+        # Sequence of tuples: flatten in one pass at C speed
+        packed = memoryview(bytes(chain.from_iterable(pixels)))
+
+    if len(packed) != expected:
+        raise ValueError(
+            f"Expected {expected} bytes of RGB data for {width}x{height}, got {len(packed)}"
+        )
+    return packed
+
+
+def find_palette(packed, max_colors=MAX_PALETTE_COLORS):
+    """
+    Return the sorted list of distinct (r, g, b) colors in packed RGB
+    data, or None as soon as more than max_colors are found.
+    """
+    colors = set()
+    # Check the limit every 4096 pixels so large photos bail out early
+    block = 4096 * RGB_CHANNELS
+    for start in range(0, len(packed), block):
+        it = iter(packed[start:start + block])
+        colors.update(zip(it, it, it))
+        if len(colors) > max_colors:
+            return None
+    return sorted(colors)
+
+
+def palette_bit_depth(color_count):
+    """
+    Return the smallest PNG bit depth (1, 2, 4 or 8) that can index
+    color_count palette entries.
+    """
+    for bit_depth in (1, 2, 4, 8):
+        if color_count <= 1 << bit_depth:
+            return bit_depth
+    raise ValueError(f"A PNG palette holds at most {MAX_PALETTE_COLORS} colors, got {color_count}")
+
+
+def index_pixels(packed, palette):
+    """
+    Map packed RGB data to one palette index byte per pixel.
+    """
+    lookup = {color: index for index, color in enumerate(palette)}
+    it = iter(packed)
+    return bytes(map(lookup.__getitem__, zip(it, it, it)))
+
+
+def iter_index_rows(width, height, indices, bit_depth):
+    """
+    Split per-pixel palette indices into scanlines packed at bit_depth
+    bits per pixel (most significant bits first, as PNG requires).
+    """
+    indices = memoryview(indices).cast('B')
+    per_byte = 8 // bit_depth
+    for y in range(height):
+        row = indices[y * width:(y + 1) * width]
+        if bit_depth == 8:
+            yield row
+            continue
+        packed = bytearray((width + per_byte - 1) // per_byte)
+        for x, index in enumerate(row):
+            packed[x // per_byte] |= index << (8 - bit_depth * (x % per_byte + 1))
+        yield packed
+
+
+def _paeth_residuals(row, prev, bpp):
+    """
+    Apply the Paeth filter to one scanline.
+    """
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        b = prev[i]
+        if i >= bpp:
+            a = row[i - bpp]
+            c = prev[i - bpp]
+        else:
+            a = c = 0
+        pa = abs(b - c)
+        pb = abs(a - c)
+        pc = abs(a + b - c - c)
+        if pa <= pb and pa <= pc:
+            predictor = a
+        elif pb <= pc:
+            predictor = b
+        else:
+            predictor = c
+        out[i] = (row[i] - predictor) & 0xff
+    return bytes(out)
+
+
+def _numpy_filters(filter_types, row, prev, bpp):
+    """
+    Apply several PNG filters to one scanline with NumPy, computing the
+    shared neighbor arrays once.
+
+    Yields:
+        (filter type, filtered bytes, minsum cost) per filter type
+    """
+    x = np.frombuffer(row, np.uint8).astype(np.int16)
+    b = np.frombuffer(prev, np.uint8).astype(np.int16)
+    a = np.zeros_like(x)
+    a[bpp:] = x[:-bpp]
+    c = np.zeros_like(x)
+    c[bpp:] = b[:-bpp]
+
+    for filter_type in filter_types:
+        if filter_type == FILTER_NONE:
+            residual = x
+        elif filter_type == FILTER_SUB:
+            residual = x - a
+        elif filter_type == FILTER_UP:
+            residual = x - b
+        elif filter_type == FILTER_AVERAGE:
+            residual = x - ((a + b) >> 1)
+        elif filter_type == FILTER_PAETH:
+            pa = np.abs(b - c)
+            pb = np.abs(a - c)
+            pc = np.abs(a + b - c - c)
+            predictor = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+            residual = x - predictor
+        else:
+            raise ValueError(f"Unknown PNG filter type: {filter_type}")
+        filtered = (residual & 0xff).astype(np.uint8)
+        cost = int(np.abs(filtered.view(np.int8).astype(np.int16)).sum())
+        yield filter_type, filtered.tobytes(), cost
+
+
+def _python_filters(filter_types, row, prev, bpp):
+    """
+    Pure-Python counterpart of _numpy_filters().
+    """
+    for filter_type in filter_types:
+        candidate = filter_scanline(filter_type, row, prev, bpp)
+        yield filter_type, candidate, sum(candidate.translate(_ABS_RESIDUAL))
+
+
+def filter_scanline(filter_type, row, prev, bpp=RGB_CHANNELS):
+    """
+    Apply a PNG filter to one scanline.
+
+    Args:
+        filter_type: One of FILTER_NONE/SUB/UP/AVERAGE/PAETH
+        row: Raw bytes of the current scanline (without filter byte)
+        prev: Raw bytes of the previous scanline (all zeros for the first row)
+        bpp: Bytes per complete pixel
+
+    Returns:
+        The filtered scanline as bytes (without filter byte)
+    """
+    row = bytes(row)
+    if filter_type == FILTER_NONE:
+        return row
+    if np is not None:
+        return next(_numpy_filters((filter_type,), row, prev, bpp))[1]
+    if filter_type == FILTER_UP:
+        return bytes((x - u) & 0xff for x, u in zip(row, prev))
+    left = bytes(bpp) + row[:-bpp]
+    if filter_type == FILTER_SUB:
+        return bytes((x - l) & 0xff for x, l in zip(row, left))
+    if filter_type == FILTER_AVERAGE:
+        return bytes((x - ((l + u) >> 1)) & 0xff for x, l, u in zip(row, left, prev))
+    if filter_type == FILTER_PAETH:
+        return _paeth_residuals(row, prev, bpp)
+    raise ValueError(f"Unknown PNG filter type: {filter_type}")
+
+
+def _resolve_filter_strategy(filter_strategy):
+    if isinstance(filter_strategy, int):
+        if not FILTER_NONE <= filter_strategy <= FILTER_PAETH:
+            raise ValueError(f"Unknown PNG filter type: {filter_strategy}")
+        return filter_strategy
+    if filter_strategy not in FILTER_STRATEGIES:
+        raise ValueError(
+            f"Unknown filter strategy {filter_strategy!r}, "
+            f"expected one of {', '.join(FILTER_STRATEGIES)}"
+        )
+    return FILTER_STRATEGIES[filter_strategy]
+
+
+def _pack_row(row, stride):
+    """
+    Return one scanline as packed bytes.
+    """
+    try:
+        packed = memoryview(row).cast('B')
+    except TypeError:
+        packed = memoryview(bytes(chain.from_iterable(row)))
+
+    if len(packed) != stride:
+        raise ValueError(f"Expected {stride} bytes per scanline, got {len(packed)}")
+    return packed
+
+
+def iter_rows(width, height, pixels):
+    """
+    Split whole-image pixel data into packed scanlines.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        pixels: Pixel data as accepted by pack_pixels()
+    """
+    packed = pack_pixels(width, height, pixels)
+    stride = width * RGB_CHANNELS
+    for y in range(height):
+        yield packed[y * stride:(y + 1) * stride]
+
+
+def iter_scanlines(width, rows, filter_strategy='none', compression_level=9,
+                   bit_depth=8, channels=RGB_CHANNELS, compression_strategy=zlib.Z_DEFAULT_STRATEGY):
+    """
+    Filter scanlines one at a time, yielding each prefixed with its filter
+    byte. Only the previous raw scanline is kept in memory.
+
+    Args:
+        width: Image width in pixels
+        rows: Iterable of scanlines, each as packed bytes or (for RGB) a
+            sequence of (r, g, b) tuples
+        filter_strategy: 'none', 'sub', 'up', 'average', 'paeth' (or the
+            matching filter type 0-4) to use one filter for every row,
+            'minsum' for the minimum sum of absolute differences heuristic,
+            or 'brute' to trial-compress every filter per row
+        compression_level: zlib level used by the 'brute' trials; should
+            match the level the payload is finally compressed with
+        bit_depth: Bits per channel sample (1, 2, 4, 8 or 16)
+        channels: Samples per pixel (3 for RGB, 1 for palette indices,
+            see COLOR_TYPE_CHANNELS)
+        compression_strategy: zlib strategy used by the 'brute' trials,
+            likewise matching the final compressor
+    """
+    stride = (width * channels * bit_depth + 7) // 8
+    # Filters operate on whole bytes; sub-byte pixels use a distance of 1
+    bpp = max(1, channels * bit_depth // 8)
+    fixed_filter = _resolve_filter_strategy(filter_strategy)
+
+    # Mirrors the final compressor so 'brute' can measure real output growth
+    trial = None
+    if filter_strategy == 'brute':
+        trial = zlib.compressobj(compression_level, zlib.DEFLATED, zlib.MAX_WBITS,
+                                 zlib.DEF_MEM_LEVEL, compression_strategy)
+    prev = bytes(stride)
+
+    for row in rows:
+        with span('scanline'):
+            row = _pack_row(row, stride)
+
+        if fixed_filter == FILTER_NONE:
+            yield b'\x00' + row
+            continue
+
+        with span('filter'):
+            if fixed_filter is not None:
+                best_type = fixed_filter
+                best = filter_scanline(fixed_filter, row, prev, bpp)
+            else:
+                best_type, best, best_cost = None, None, None
+                candidates = _numpy_filters if np is not None else _python_filters
+                for filter_type, candidate, cost in candidates(ALL_FILTERS, row, prev, bpp):
+                    if trial is not None:
+                        # Real stream growth, with the minsum cost breaking ties
+                        probe = trial.copy()
+                        line = bytes([filter_type]) + candidate
+                        cost = (len(probe.compress(line)) + len(probe.flush(zlib.Z_SYNC_FLUSH)), cost)
+                    if best_cost is None or cost < best_cost:
+                        best_type, best, best_cost = filter_type, candidate, cost
+
+            line = bytes([best_type]) + best
+            if trial is not None:
+                trial.compress(line)
+            prev = bytes(row)
+        yield line
+
+
+def build_scanlines(width, height, pixels, filter_strategy='none', compression_level=9):
+    """
+    Build the whole uncompressed IDAT payload in memory.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        pixels: Pixel data as accepted by pack_pixels()
+        filter_strategy: Scanline filter selection, see iter_scanlines()
+        compression_level: zlib level used by the 'brute' trials
+    """
+    stride = width * RGB_CHANNELS
+    raw_data = bytearray((stride + 1) * height)
+    raw_view = memoryview(raw_data)
+
+    lines = iter_scanlines(width, iter_rows(width, height, pixels), filter_strategy, compression_level)
+    for y, line in enumerate(lines):
+        raw_view[y * (stride + 1):(y + 1) * (stride + 1)] = line
+
+    return raw_data
+
+
+def write_filtered_png(fileobj, width, height, lines, color_type=COLOR_TYPE_RGB, bit_depth=8,
+                       palette=None, transparency=None, compression_level=9,
+                       compression_strategy=zlib.Z_DEFAULT_STRATEGY,
+                       chunk_size=DEFAULT_IDAT_CHUNK_SIZE):
+    """
+    Stream a PNG whose scanlines are already filtered (each prefixed with
+    its filter byte, as yielded by iter_scanlines()).
+
+    Only the critical chunks plus tRNS are written; write_png() is the
+    usual entry point.
+
+    Args:
+        fileobj: Writable binary file-like object
+        width: Image width in pixels
+        height: Image height in pixels
+        lines: Iterable of exactly height filtered scanlines
+        color_type: IHDR color type (see COLOR_TYPE_CHANNELS)
+        bit_depth: Bits per sample, valid for color_type
+        palette: List of (r, g, b) tuples; required for COLOR_TYPE_PALETTE
+        transparency: Raw tRNS chunk payload, or None
+        compression_level: zlib compression level 0-9 (default 9)
+        compression_strategy: zlib strategy (Z_DEFAULT_STRATEGY, Z_FILTERED,
+            Z_RLE, ...)
+        chunk_size: Maximum payload size of each IDAT chunk in bytes
+
+    Returns:
+        Number of bytes written
+    """
+    if bit_depth not in COLOR_TYPE_BIT_DEPTHS.get(color_type, ()):
+        raise ValueError(f"Invalid bit depth {bit_depth} for PNG color type {color_type}")
+    if (palette is not None) != (color_type == COLOR_TYPE_PALETTE):
+        raise ValueError("A palette must be given exactly for indexed-color images")
+    if palette is not None and len(palette) > 1 << bit_depth:
+        raise ValueError(f"{len(palette)} palette colors do not fit in {bit_depth}-bit indices")
+
+    # IHDR: width, height, bit_depth, color_type, compression=0, filter=0, interlace=0
+    ihdr_data = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
+
+    written = fileobj.write(PNG_SIGNATURE)
+    written += fileobj.write(make_chunk(b'IHDR', ihdr_data))
+    if palette is not None:
+        written += fileobj.write(make_chunk(b'PLTE', bytes(chain.from_iterable(palette))))
+    if transparency is not None:
+        written += fileobj.write(make_chunk(b'tRNS', bytes(transparency)))
+
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, zlib.MAX_WBITS,
+                                  zlib.DEF_MEM_LEVEL, compression_strategy)
+    pending = bytearray()
+    row_count = 0
+
+    for line in lines:
+        row_count += 1
+        with span('zlib.compress'):
+            pending += compressor.compress(line)
+        while len(pending) >= chunk_size:
+            written += fileobj.write(make_chunk(b'IDAT', bytes(pending[:chunk_size])))
+            del pending[:chunk_size]
+
+    if row_count != height:
+        raise ValueError(f"Expected {height} scanlines, got {row_count}")
+
+    with span('zlib.compress'):
+        pending += compressor.flush()
+    while pending:
+        written += fileobj.write(make_chunk(b'IDAT', bytes(pending[:chunk_size])))
+        del pending[:chunk_size]
+
+    written += fileobj.write(make_chunk(b'IEND', b''))
+    return written
+
+
+def write_png(fileobj, width, height, rows, compression_level=9,
+              filter_strategy='minsum', chunk_size=DEFAULT_IDAT_CHUNK_SIZE,
+              palette=None, bit_depth=8, color_type=None, transparency=None,
+              compression_strategy=zlib.Z_DEFAULT_STRATEGY):
+    """
+    Stream a PNG to a file-like object.
+
+    Rows are pulled from the iterable one at a time, filtered, fed to a
+    zlib compressor and written out as IDAT chunks of chunk_size bytes as
+    soon as enough compressed data is available. Peak memory is roughly one
+    scanline plus the zlib window, regardless of the image size.
+
+    Args:
+        fileobj: Writable binary file-like object
+        width: Image width in pixels
+        height: Image height in pixels
+        rows: Iterable (e.g. a generator) of exactly height scanlines, each
+            as packed RGB bytes or a sequence of (r, g, b) tuples; with a
+            palette, each row holds indices packed at bit_depth bits
+        compression_level: zlib compression level 0-9 (default 9)
+        filter_strategy: Scanline filter selection, see iter_scanlines()
+            (default 'minsum')
+        chunk_size: Maximum payload size of each IDAT chunk in bytes
+        palette: List of (r, g, b) tuples to write an indexed-color image
+            (color type 3), or None for 8-bit RGB (color type 2)
+        bit_depth: Bits per sample; 1, 2, 4 or 8 for palette indices
+        color_type: Explicit IHDR color type for packed rows of other
+            layouts (gray, gray + alpha, RGBA, 16-bit); by default RGB, or
+            indexed when a palette is given
+        transparency: Raw tRNS chunk payload, or None
+        compression_strategy: zlib strategy (default Z_DEFAULT_STRATEGY)
+
+    Returns:
+        Number of bytes written
+    """
+    if color_type is None:
+        color_type = COLOR_TYPE_RGB if palette is None else COLOR_TYPE_PALETTE
+        if palette is None and bit_depth != 8:
+            raise ValueError("RGB images must use a bit depth of 8")
+
+    lines = iter_scanlines(width, rows, filter_strategy, compression_level, bit_depth,
+                           COLOR_TYPE_CHANNELS[color_type], compression_strategy)
+    return write_filtered_png(fileobj, width, height, lines, color_type, bit_depth, palette,
+                              transparency, compression_level, compression_strategy, chunk_size)
+
+
+def unfilter_scanline(filter_type, line, prev, bpp):
+    """
+    Reverse a PNG filter: the inverse of filter_scanline().
+
+    Args:
+        filter_type: Filter byte of the scanline
+        line: Filtered bytes of the scanline (without filter byte)
+        prev: Reconstructed previous scanline (all zeros for the first row)
+        bpp: Bytes per complete pixel (at least 1)
+
+    Returns:
+        The raw scanline as bytes
+    """
+    if filter_type == FILTER_NONE:
+        return bytes(line)
+    if filter_type == FILTER_UP:
+        return bytes((x + u) & 0xff for x, u in zip(line, prev))
+
+    row = bytearray(line)
+    if filter_type == FILTER_SUB:
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + row[i - bpp]) & 0xff
+    elif filter_type == FILTER_AVERAGE:
+        for i in range(len(row)):
+            left = row[i - bpp] if i >= bpp else 0
+            row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xff
+    elif filter_type == FILTER_PAETH:
+        for i in range(len(row)):
+            b = prev[i]
+            if i >= bpp:
+                a = row[i - bpp]
+                c = prev[i - bpp]
+            else:
+                a = c = 0
+            pa = abs(b - c)
+            pb = abs(a - c)
+            pc = abs(a + b - c - c)
+            if pa <= pb and pa <= pc:
+                predictor = a
+            elif pb <= pc:
+                predictor = b
+            else:
+                predictor = c
+            row[i] = (row[i] + predictor) & 0xff
+    else:
+        raise ValueError(f"Unknown PNG filter type: {filter_type}")
+    return bytes(row)
+
+
+def read_png(data):
+    """
+    Decode a PNG file into its header fields and raw (unfiltered) scanlines.
+
+    Chunk CRCs are verified. Interlaced (Adam7) images are not supported.
+
+    Args:
+        data: The PNG file as bytes
+
+    Returns:
+        Dict with 'width', 'height', 'bit_depth', 'color_type', 'palette'
+        (list of (r, g, b) or None), 'transparency' (raw tRNS payload or
+        None), 'rows' (list of raw scanlines as bytes, packed as in the
+        file) and 'ancillary' (list of (chunk type, data) for every other
+        chunk)
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    header = None
+    palette = None
+    transparency = None
+    ancillary = []
+    compressed = bytearray()
+
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            raise ValueError("Truncated PNG chunk")
+        length, chunk_type = struct.unpack('>I4s', data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack('>I', data[offset + 8 + length:offset + 12 + length])
+        if zlib.crc32(chunk_data, zlib.crc32(chunk_type)) & 0xffffffff != crc:
+            raise ValueError(f"CRC mismatch in {chunk_type.decode('latin-1')} chunk")
+        offset += 12 + length
+
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk_data)
+        elif chunk_type == b'PLTE':
+            it = iter(chunk_data)
+            palette = list(zip(it, it, it))
+        elif chunk_type == b'tRNS':
+            transparency = bytes(chunk_data)
+        elif chunk_type == b'IDAT':
+            compressed += chunk_data
+        elif chunk_type == b'IEND':
+            break
+        else:
+            ancillary.append((chunk_type, bytes(chunk_data)))
+
+    if header is None:
+        raise ValueError("PNG has no IHDR chunk")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth not in COLOR_TYPE_BIT_DEPTHS.get(color_type, ()):
+        raise ValueError(f"Invalid bit depth {bit_depth} for PNG color type {color_type}")
+    if interlace:
+        raise ValueError("Interlaced PNGs are not supported")
+    if color_type == COLOR_TYPE_PALETTE and palette is None:
+        raise ValueError("Indexed-color PNG has no PLTE chunk")
+
+    channels = COLOR_TYPE_CHANNELS[color_type]
+    stride = (width * channels * bit_depth + 7) // 8
+    bpp = max(1, channels * bit_depth // 8)
+    raw = zlib.decompress(bytes(compressed))
+    if len(raw) < (stride + 1) * height:
+        raise ValueError("PNG image data is truncated")
+
+    rows = []
+    prev = bytes(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        prev = unfilter_scanline(raw[start], raw[start + 1:start + 1 + stride], prev, bpp)
+        rows.append(prev)
+
+    return {
+        'width': width,
+        'height': height,
+        'bit_depth': bit_depth,
+        'color_type': color_type,
+        'palette': palette if color_type == COLOR_TYPE_PALETTE else None,
+        'transparency': transparency,
+        'rows': rows,
+        'ancillary': ancillary,
+    }
+
+
+def create_png(width, height, pixels, compression_level=9, filter_strategy='minsum',
+               indexed='auto', quantize=None, max_colors=MAX_PALETTE_COLORS):
+    """
+    Create a PNG file from pixel data.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        pixels: Sequence of (r, g, b) tuples for each pixel, or packed RGB
+            bytes (bytes, bytearray, memoryview, array.array('B'), ...)
+        compression_level: zlib compression level 0-9 (default 9)
+        filter_strategy: Scanline filter selection, see iter_scanlines()
+            (default 'minsum')
+        indexed: 'auto' to write a palette image whenever the pixels use
+            at most max_colors colors (keeping RGB instead if that is
+            smaller, for images of up to AUTO_RGB_TRIAL_MAX_PIXELS), True
+            to require a palette image, False to always write 24-bit RGB
+        quantize: None, or a key of quantize.QUANTIZERS ('median-cut',
+            'ordered') to reduce images with too many colors to a palette
+        max_colors: Largest palette to use (at most 256)
+
+    Returns:
+        The encoded PNG file as bytes
+    """
+    if indexed not in ('auto', True, False):
+        raise ValueError(f"indexed must be 'auto', True or False, got {indexed!r}")
+    if quantize is not None and quantize not in QUANTIZERS:
+        raise ValueError(f"Unknown quantizer {quantize!r}, expected one of {', '.join(QUANTIZERS)}")
+    max_colors = min(max_colors, MAX_PALETTE_COLORS)
+
+    with span('pack'):
+        packed = pack_pixels(width, height, pixels)
+
+    palette = None
+    if indexed:
+        with span('palette'):
+            palette = find_palette(packed, max_colors)
+            if palette is not None:
+                indices = index_pixels(packed, palette)
+        if palette is None and quantize is not None:
+            with span('quantize'):
+                palette, indices = QUANTIZERS[quantize](packed, width, height, max_colors)
+        elif palette is None and indexed is True:
+            raise ValueError(
+                f"Image has more than {max_colors} colors; pass quantize= to reduce it"
+            )
+
+    rgb_png = None
+    rgb_trial = indexed == 'auto' and quantize is None and width * height <= AUTO_RGB_TRIAL_MAX_PIXELS
+    if palette is None or rgb_trial:
+        output = io.BytesIO()
+        with span('write rgb'):
+            write_png(output, width, height, iter_rows(width, height, packed),
+                      compression_level, filter_strategy)
+        rgb_png = output.getvalue()
+    if palette is None:
+        return rgb_png
+
+    output = io.BytesIO()
+    bit_depth = palette_bit_depth(len(palette))
+    with span('write indexed'):
+        write_png(output, width, height, iter_index_rows(width, height, indices, bit_depth),
+                  compression_level, filter_strategy, palette=palette, bit_depth=bit_depth)
+    indexed_png = output.getvalue()
+
+    # For tiny images the PLTE chunk can outweigh the savings; 'auto' keeps
+    # whichever lossless encoding is smaller
+    if rgb_png is not None and len(rgb_png) <= len(indexed_png):
+        return rgb_png
+    return indexed_png
+
+
+def create_ico(images):
+    """
+    Pack PNG-compressed images into a multi-resolution .ico container.
+
+    Every entry is stored as an embedded PNG stream (supported by all
+    browsers and by Windows Vista and later) instead of an uncompressed
+    BMP, which keeps favicon.ico a fraction of its BMP size.
+
+    Args:
+        images: Sequence of PNG files as bytes (e.g. from create_png), one
+            per resolution, each at most 256x256
+
+    Returns:
+        The .ico file as bytes
+    """
+    header = struct.pack('<HHH', 0, 1, len(images))  # reserved, type 1 = icon, count
+    directory = []
+    offset = len(header) + 16 * len(images)
+
+    for png in images:
+        if not png.startswith(PNG_SIGNATURE):
+            raise ValueError("ICO entries must be PNG files")
+        width, height, bit_depth, color_type = struct.unpack('>IIBB', png[16:26])
+        if width > 256 or height > 256:
+            raise ValueError(f"ICO entries can be at most 256x256, got {width}x{height}")
+        bits_per_pixel = bit_depth * COLOR_TYPE_CHANNELS[color_type]
+
+        # Width/height of 256 are stored as 0; color count 0 = no BMP palette
+        directory.append(struct.pack('<BBBBHHII', width % 256, height % 256, 0, 0,
+                                     1, bits_per_pixel, len(png), offset))
+        offset += len(png)
+
+    return b''.join([header] + directory + list(images))
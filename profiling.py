@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Lightweight timing spans for the asset scripts.
+
+Code marks its stages with
+
+    with span('encode'):
+        ...
+
+Spans nest, and repeated spans with the same name under the same parent
+are merged (total seconds and a call count), so a span around every
+scanline still gives one node per stage. While profiling is disabled,
+span() returns a shared no-op context manager, so an instrumented loop
+costs one function call per iteration.
+
+Scripts enable profiling with the switches from add_arguments():
+
+    --profile [FILE]   write the timing tree as JSON to FILE (default stderr)
+    --cprofile FILE    also run under cProfile and save the stats to FILE,
+                       for python -m pstats FILE or a viewer like snakeviz
+
+Only the current process is timed; work done in worker processes shows up
+as time spent waiting for them.
+"""
+
+import cProfile
+import json
+import sys
+import time
+
+_enabled = False
+_stack = []
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    One node of the timing tree.
+
+    Attributes:
+        name: Stage name
+        seconds: Total wall time over all calls
+        calls: Number of times the span was entered
+        children: Dict of name -> child Span, in first-entered order
+    """
+
+    __slots__ = ('name', 'seconds', 'calls', 'children', '_started')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.children = {}
+        self._started = None
+
+    def __enter__(self):
+        _stack.append(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds += time.perf_counter() - self._started
+        self.calls += 1
+        _stack.pop()
+        return False
+
+    def as_dict(self):
+        """
+        Return the span and its children as JSON-serializable dicts; a
+        'self_seconds' entry gives the time not covered by any child.
+        """
+        node = {'name': self.name, 'seconds': round(self.seconds, 6), 'calls': self.calls}
+        if self.children:
+            covered = sum(child.seconds for child in self.children.values())
+            node['self_seconds'] = round(max(0.0, self.seconds - covered), 6)
+            node['children'] = [child.as_dict() for child in self.children.values()]
+        return node
+
+
+def span(name):
+    """
+    Return a context manager timing the stage name under the current span.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    parent = _stack[-1]
+    child = parent.children.get(name)
+    if child is None:
+        child = parent.children[name] = Span(name)
+    return child
+
+
+def enable(name='run'):
+    """
+    Start recording spans under a new root span, which is returned.
+    """
+    global _enabled
+    root = Span(name)
+    _stack[:] = [root]
+    _enabled = True
+    return root
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    _stack.clear()
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_arguments(parser):
+    """
+    Add --profile and --cprofile to an argparse parser.
+    """
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help="write a JSON tree of stage timings to FILE (default stderr)")
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help="also run under cProfile and save the stats to FILE")
+
+
+def run(func, profile=None, cprofile=None, name='run'):
+    """
+    Call func, recording spans when profile is set and running under
+    cProfile when cprofile is set.
+
+    Args:
+        func: Function of no arguments (the script's work)
+        profile: File for the JSON timing tree, '-' for stderr, or None
+        cprofile: File for the cProfile stats, or None
+        name: Name of the root span
+
+    Returns:
+        Whatever func returns
+    """
+    if profile is None and cprofile is None:
+        return func()
+
+    root = enable(name) if profile is not None else None
+    profiler = cProfile.Profile() if cprofile else None
+    started = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(func)
+        return func()
+    finally:
+        elapsed = time.perf_counter() - started
+        disable()
+        if profiler is not None:
+            profiler.dump_stats(cprofile)
+            print(f"✓ cProfile stats written to {cprofile}", file=sys.stderr)
+        if root is not None:
+            root.seconds = elapsed
+            root.calls = 1
+            tree = json.dumps(root.as_dict(), indent=2)
+            if profile == '-':
+                print(tree, file=sys.stderr)
+            else:
+                with open(profile, 'w') as f:
+                    f.write(tree + '\n')
+                print(f"✓ Timing tree written to {profile}", file=sys.stderr)
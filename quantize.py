@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Color quantizers for indexed (palette) PNG output.
+
+Both quantizers take packed RGB bytes and return a (palette, indices) pair:
+palette is a list of at most max_colors (r, g, b) tuples and indices holds
+one palette index per pixel, row by row.
+"""
+
+# 4x4 Bayer threshold matrix, values 0-15
+BAYER_4X4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+
+
+def _iter_rgb(packed):
+    it = iter(packed)
+    return zip(it, it, it)
+
+
+def median_cut(packed, width, height, max_colors=256):
+    """
+    Quantize with the median-cut algorithm.
+
+    The set of distinct colors (weighted by pixel count) is split
+    recursively at the weighted median of its widest channel until there
+    are max_colors boxes; each box becomes the average color of its members.
+
+    Args:
+        packed: Packed RGB bytes, width * height * 3 long
+        width: Image width in pixels
+        height: Image height in pixels
+        max_colors: Maximum palette size (1-256)
+    """
+    counts = {}
+    for color in _iter_rgb(packed):
+        counts[color] = counts.get(color, 0) + 1
+
+    def make_box(colors):
+        # (widest channel range, that channel, member colors)
+        spread, channel = 0, 0
+        if len(colors) > 1:
+            for c in range(3):
+                values = [color[c] for color in colors]
+                if max(values) - min(values) > spread:
+                    spread, channel = max(values) - min(values), c
+        return spread, channel, colors
+
+    boxes = [make_box(list(counts))]
+    while len(boxes) < max_colors:
+        # Split the box with the widest channel range
+        best_index = max(range(len(boxes)), key=lambda index: boxes[index][0])
+        spread, channel, colors = boxes[best_index]
+        if spread == 0:
+            break
+
+        colors = sorted(colors, key=lambda color: color[channel])
+        half = sum(counts[color] for color in colors) / 2
+        running = 0
+        split = 1
+        for split, color in enumerate(colors[:-1], 1):
+            running += counts[color]
+            if running >= half:
+                break
+        boxes[best_index:best_index + 1] = [make_box(colors[:split]), make_box(colors[split:])]
+
+    palette = []
+    lookup = {}
+    for index, (_, _, box) in enumerate(boxes):
+        total = sum(counts[color] for color in box)
+        palette.append(tuple(
+            (sum(color[c] * counts[color] for color in box) + total // 2) // total
+            for c in range(3)
+        ))
+        for color in box:
+            lookup[color] = index
+
+    indices = bytes(map(lookup.__getitem__, _iter_rgb(packed)))
+    return palette, indices
+
+
+def ordered_dither(packed, width, height, max_colors=256):
+    """
+    Quantize to a uniform RGB cube with 4x4 ordered (Bayer) dithering.
+
+    The cube uses as many levels per channel as fit in max_colors (6x7x6 =
+    252 colors for the default of 256). Dithering trades banding for a fine,
+    stable pattern, which suits smooth gradients.
+
+    Args:
+        packed: Packed RGB bytes, width * height * 3 long
+        width: Image width in pixels
+        height: Image height in pixels
+        max_colors: Maximum palette size (8-256)
+    """
+    levels = [2, 2, 2]
+    while True:
+        grown = False
+        for channel in (1, 0, 2):  # the eye is most sensitive to green
+            trial = list(levels)
+            trial[channel] += 1
+            if trial[0] * trial[1] * trial[2] <= max_colors:
+                levels = trial
+                grown = True
+        if not grown:
+            break
+
+    steps = [255 / (n - 1) for n in levels]
+    palette = [
+        (round(r * steps[0]), round(g * steps[1]), round(b * steps[2]))
+        for r in range(levels[0]) for g in range(levels[1]) for b in range(levels[2])
+    ]
+
+    # Offset each channel by the Bayer threshold, then round to the nearest level
+    indices = bytearray(width * height)
+    for y in range(height):
+        bayer_row = BAYER_4X4[y % 4]
+        row_start = y * width
+        for x in range(width):
+            i = (row_start + x) * 3
+            threshold = (bayer_row[x % 4] + 0.5) / 16 - 0.5
+            q = [
+                min(max(int(packed[i + c] / steps[c] + 0.5 + threshold), 0), levels[c] - 1)
+                for c in range(3)
+            ]
+            indices[row_start + x] = (q[0] * levels[1] + q[1]) * levels[2] + q[2]
+
+    return palette, bytes(indices)
+
+
+QUANTIZERS = {
+    'median-cut': median_cut,
+    'ordered': ordered_dither,
+}
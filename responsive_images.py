@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Serve responsive images from index.html.
+
+Every local <img> on the page is encoded as a width ladder of AVIF (when
+Pillow supports it), WebP and JPEG/PNG variants by optimize_image, and the
+tag is rewritten into a <picture> with one <source> per modern format plus
+a fallback <img> carrying srcset, sizes and explicit width/height, so the
+browser downloads only the size it needs and reserves the layout box
+before the image arrives.
+
+Images already inside a <picture> are left alone, so re-running the script
+is a no-op apart from refreshing stale variants.
+
+Usage:
+    python responsive_images.py [index.html] [-o OUTPUT] [--output-dir images/responsive]
+                                [--widths 400,580,800,1160] [--sizes SIZES] [--force]
+"""
+
+import argparse
+import os
+import sys
+
+from build_cache import BuildCache, write_if_changed
+from html_assets import apply_edits, is_local_url, line_indent, local_path, parse_html, render_start_tag, site_url
+from optimize_image import DEFAULT_WIDTHS, IMAGE_EXTENSIONS, generate_variants
+
+# Images fill the 580px content column and the full viewport on phones
+DEFAULT_SIZES = '(max-width: 600px) 100vw, 580px'
+
+# Attributes of the original <img> that stay on the fallback <img>
+REPLACED_ATTRIBUTES = ('src', 'srcset', 'sizes', 'width', 'height')
+
+
+def _srcset(files, site_root):
+    return ', '.join(f"{site_url(path, site_root)} {width}w" for path, width, _ in files)
+
+
+def picture_markup(img_attrs, variants, sizes, site_root, indent):
+    """
+    Build the <picture> element that replaces one <img>.
+
+    Args:
+        img_attrs: Attributes of the original <img>
+        variants: Result of optimize_image.generate_variants()
+        sizes: Value of the sizes attribute
+        site_root: Directory index.html is served from
+        indent: Indentation of the original <img> line
+    """
+    *modern, fallback = variants['sources']
+    default_path, default_width, default_height = variants['default']
+
+    lines = ['<picture>']
+    for source in modern:
+        lines.append(indent + '  ' + render_start_tag('source', [
+            ('type', source['mime']),
+            ('srcset', _srcset(source['files'], site_root)),
+            ('sizes', sizes),
+        ], indent + '  '))
+
+    attrs = [('src', site_url(default_path, site_root))]
+    attrs += [(key, value) for key, value in img_attrs.items() if key not in REPLACED_ATTRIBUTES]
+    attrs += [
+        ('srcset', _srcset(fallback['files'], site_root)),
+        ('sizes', sizes),
+        ('width', default_width),
+        ('height', default_height),
+    ]
+    lines.append(indent + '  ' + render_start_tag('img', attrs, indent + '  '))
+    lines.append(indent + '</picture>')
+    return '\n'.join(lines)
+
+
+def rewrite_images(source, site_root, output_dir, widths=DEFAULT_WIDTHS, sizes=DEFAULT_SIZES,
+                   quality=85, cache=None):
+    """
+    Generate variants for every local <img> and rewrite it as a <picture>.
+
+    Args:
+        source: HTML text
+        site_root: Directory the page's relative URLs resolve against
+        output_dir: Directory for the generated variants
+        widths: Width ladder passed to generate_variants()
+        sizes: Value of the sizes attribute
+        quality: Encoder quality for the lossy formats
+        cache: Optional BuildCache
+
+    Returns:
+        (rewritten HTML, number of images rewritten)
+    """
+    document = parse_html(source)
+    edits = []
+
+    for tag in document.find('img'):
+        src = tag.attrs.get('src')
+        if 'picture' in tag.ancestors or not is_local_url(src):
+            continue
+        path = local_path(src, site_root)
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if not os.path.exists(path):
+            print(f"⚠ {src} not found, leaving the <img> as is", file=sys.stderr)
+            continue
+
+        print(f"Generating variants for {src}...")
+        variants = generate_variants(path, output_dir, widths, quality, cache=cache)
+        indent = line_indent(source, tag.start)
+        edits.append((tag.start, tag.end, picture_markup(tag.attrs, variants, sizes, site_root, indent)))
+
+    return apply_edits(source, edits), len(edits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite <img> tags as responsive <picture> elements")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('-o', '--output', help="write the rewritten HTML here (default: in place)")
+    parser.add_argument('--output-dir', default='images/responsive',
+                        help="directory for the generated variants (default images/responsive)")
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)),
+                        help=f"comma-separated width ladder (default {','.join(map(str, DEFAULT_WIDTHS))})")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"sizes attribute (default '{DEFAULT_SIZES}')")
+    parser.add_argument('--quality', type=int, default=85, help="WebP/AVIF/JPEG quality 1-100 (default 85)")
+    parser.add_argument('--force', action='store_true', help="re-encode variants even if up to date")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    site_root = os.path.dirname(args.input) or '.'
+    output_dir = os.path.join(site_root, args.output_dir)
+    widths = [int(w) for w in args.widths.split(',') if w.strip()]
+
+    with BuildCache(enabled=not args.force) as cache:
+        rewritten, count = rewrite_images(source, site_root, output_dir, widths, args.sizes,
+                                          args.quality, cache)
+
+    output = args.output or args.input
+    if write_if_changed(output, rewritten.encode('utf-8')):
+        print(f"✓ Rewrote {count} image(s) in {output}")
+    else:
+        print(f"✓ {output} is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+Self-host a subsetted copy of the heading font instead of Google Fonts.
+
+index.html loads Oswald through fonts.googleapis.com, which costs two
+extra origins (CSS, then the font files) before the headings can paint.
+build.py runs this as a stage of the build (skip it with
+--no-font-subset); it:
+
+1. Works out, from the page's inline CSS, which elements are rendered in
+   the font and with which weights (custom properties, specificity,
+   inheritance and text-transform are taken into account).
+2. Subsets the vendored font to exactly the characters those elements
+   show, one WOFF2 file per weight in fonts/ (a variable font is
+   instanced at each weight first).
+3. Replaces the Google Fonts <link>s in <head> of the deployed page with
+   a preload and an inline @font-face (font-display: swap, unicode-range).
+
+The subsets go to FONT_SUBSET_DIR (git-ignored) and are skipped by the
+build cache while the page text and the font are unchanged; the source
+page is never modified. Run on its own, the script only writes the
+subsets, plus a rewritten copy of the page with -o.
+
+Requires fontTools (pip install fonttools brotli); without brotli the
+files are written as WOFF instead of WOFF2. The font itself is not
+fetched: download Oswald (SIL Open Font License) from
+https://fonts.google.com/specimen/Oswald and put the variable TTF at
+fonts/Oswald-VariableFont_wght.ttf, or pass static files with --font.
+
+Usage:
+    python subset_fonts.py [index.html] [-o OUTPUT] [--font PATH ...] [--family Oswald] [--text EXTRA]
+                           [--force]
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+from urllib.parse import urlsplit
+
+from build_cache import CACHE_PATH, BuildCache, cache_key, write_if_changed
+from html_assets import apply_edits, line_indent, parse_html, render_start_tag, site_url
+from minify_html import find_block_end, strip_css_comments
+
+try:
+    from fontTools import subset as font_subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+except ImportError:
+    font_subset = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_FONTS = ('fonts/Oswald-VariableFont_wght.ttf',)
+DEFAULT_FAMILY = 'Oswald'
+FONT_SUBSET_DIR = 'fonts/subset'
+
+# Bump when the subsetting options change, to invalidate cached subsets
+SUBSET_VERSION = 1
+
+# Third-party origins the self-hosted font replaces
+GOOGLE_FONTS_HOSTS = ('fonts.googleapis.com', 'fonts.gstatic.com')
+
+# id of the inline <style> holding the generated @font-face rules
+FONT_FACES_ID = 'font-faces'
+
+# Properties that decide which glyphs of which face are needed; all inherit
+FONT_PROPERTIES = ('font-family', 'font-weight', 'text-transform')
+
+# Browser defaults that matter for those properties
+USER_AGENT_STYLES = {
+    **{name: {'font-weight': '700'} for name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'b', 'strong', 'th')},
+    # Form controls don't inherit the page font unless told to
+    **{name: {'font-family': 'system-ui'} for name in ('button', 'input', 'select', 'textarea')},
+}
+
+# Elements whose text is never rendered
+UNRENDERED_ELEMENTS = {'head', 'script', 'style', 'noscript', 'template'}
+
+_VAR = re.compile(r'var\(\s*(--[\w-]+)\s*(?:,\s*([^()]*))?\)')
+_COMPOUND = re.compile(r'([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[^\]]*\]|::?[\w-]+(?:\([^)]*\))?)*)')
+
+
+def style_rules(css):
+    """
+    Yield (selector, declarations) for every style rule of a stylesheet,
+    in order, including those inside @media and @supports blocks.
+    """
+    css = strip_css_comments(css)
+    i = 0
+    while True:
+        brace = css.find('{', i)
+        if brace < 0:
+            return
+        prelude = css[i:brace].strip()
+        # Skip statement at-rules such as @import that precede the block
+        while prelude.startswith('@') and ';' in prelude:
+            prelude = prelude.split(';', 1)[1].strip()
+        end = find_block_end(css, brace)
+        body = css[brace + 1:end]
+        i = end + 1
+
+        if prelude.startswith('@'):
+            if prelude.split(None, 1)[0].lower() in ('@media', '@supports', '@layer'):
+                yield from style_rules(body)
+            continue
+
+        declarations = {}
+        for declaration in re.split(r';(?![^(]*\))', body):
+            if ':' in declaration:
+                name, value = declaration.split(':', 1)
+                declarations[name.strip().lower()] = re.sub(r'\s*!important$', '', value.strip())
+        for selector in re.split(r',(?![^(]*\))', prelude):
+            if selector.strip():
+                yield re.sub(r'\s+', ' ', selector.strip()), declarations
+
+
+def resolve_vars(value, properties):
+    """
+    Substitute var(--name[, fallback]) references from a dict of custom
+    properties.
+    """
+    for _ in range(10):
+        resolved = _VAR.sub(lambda m: properties.get(m.group(1), m.group(2) or ''), value)
+        if resolved == value:
+            break
+        value = resolved
+    return value
+
+
+def _compounds(selector):
+    """
+    Split a selector into [(combinator, compound)], rightmost last; the
+    combinator is the one to the left of the compound.
+    """
+    parts = re.split(r'\s*([>+~])\s*|\s+', selector.strip())
+    compounds = []
+    combinator = None
+    for index, part in enumerate(parts):
+        if part is None or part == '':
+            continue
+        if index % 2 == 1:
+            combinator = part
+            continue
+        compounds.append((combinator or ' ', part))
+        combinator = None
+    return compounds
+
+
+def specificity(selector):
+    """
+    Return the (ids, classes, types) specificity of a selector.
+    """
+    simplified = re.sub(r'::[\w-]+', '', selector)
+    ids = len(re.findall(r'#[\w-]+', simplified))
+    classes = len(re.findall(r'\.[\w-]+|\[[^\]]*\]|:[\w-]+', simplified))
+    types = len(re.findall(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)', simplified))
+    return ids, classes, types
+
+
+def _compound_matches(compound, tag):
+    match = _COMPOUND.fullmatch(compound)
+    if not match:
+        return False
+    name, rest = match.groups()
+    if name and name != '*' and name.lower() != tag.name:
+        return False
+    for simple in re.findall(r'[.#][\w-]+|\[[^\]]*\]', rest):
+        if simple[0] == '.' and simple[1:] not in (tag.attrs.get('class') or '').split():
+            return False
+        if simple[0] == '#' and tag.attrs.get('id') != simple[1:]:
+            return False
+        if simple[0] == '[' and re.split(r'[~|^$*]?=', simple[1:-1])[0].strip() not in tag.attrs:
+            return False
+    # Pseudo-classes (:hover, :first-child, ...) are assumed to match, so
+    # every state the element can be in is covered
+    return True
+
+
+def selector_matches(selector, chain):
+    """
+    True if a selector matches the last element of chain (the element's
+    ancestors, outermost first, followed by the element itself).
+    Siblings aren't tracked, so sibling combinators are assumed to match.
+    """
+    if '::' in selector:
+        return False
+    compounds = _compounds(selector)
+    if not compounds or not _compound_matches(compounds[-1][1], chain[-1]):
+        return False
+
+    def match_from(index, position):
+        # compounds[index] matched chain[position]; match the rest leftwards
+        if index == 0:
+            return True
+        combinator = compounds[index][0]
+        compound = compounds[index - 1][1]
+        if combinator in '+~':
+            # Siblings share the element's ancestors; assume one matches
+            return match_from(index - 1, position)
+        candidates = [position - 1] if combinator == '>' else range(position - 1, -1, -1)
+        for candidate in candidates:
+            if candidate >= 0 and _compound_matches(compound, chain[candidate]):
+                if match_from(index - 1, candidate):
+                    return True
+        return False
+
+    return match_from(len(compounds) - 1, len(chain) - 1)
+
+
+def parse_weight(value, inherited):
+    """
+    Turn a font-weight value into a number; bolder/lighter are relative
+    to the inherited weight.
+    """
+    value = value.strip().lower()
+    if value == 'normal':
+        return 400
+    if value == 'bold':
+        return 700
+    if value == 'bolder':
+        return 400 if inherited < 350 else 700 if inherited < 550 else 900
+    if value == 'lighter':
+        return 100 if inherited < 550 else 400 if inherited < 750 else 700
+    try:
+        return int(float(value))
+    except ValueError:
+        return inherited
+
+
+def primary_family(value):
+    """
+    Return the first family name of a font-family list, unquoted.
+    """
+    first = value.split(',')[0].strip()
+    return first.strip('"\'')
+
+
+def transformed(text, transform):
+    """
+    Apply a text-transform to text the way the browser would render it.
+    """
+    if transform == 'uppercase':
+        return text.upper()
+    if transform == 'lowercase':
+        return text.lower()
+    if transform == 'capitalize':
+        # Only word-initial letters are uppercased, but where a word starts
+        # depends on the text around this node (inline elements can split a
+        # word), so keep the text as written plus an uppercase copy of every
+        # letter that follows a non-letter; a superfluous glyph is cheaper
+        # than a missing one
+        return text + ''.join(re.findall(r'(?<![^\W\d_])[^\W\d_]', text)).upper()
+    return text
+
+
+def font_usage(source, family):
+    """
+    Find the characters the page renders in a font family, per weight.
+
+    Args:
+        source: HTML text
+        family: Font family name, e.g. 'Oswald'
+
+    Returns:
+        Dict of weight -> set of characters
+    """
+    document = parse_html(source)
+    rules = []
+    for tag in document.find('style'):
+        rules.extend(style_rules(tag.inner(source)))
+
+    properties = {}
+    for selector, declarations in rules:
+        if selector in (':root', 'html'):
+            properties.update((name, value) for name, value in declarations.items() if name.startswith('--'))
+
+    ranked = sorted(
+        ((specificity(selector), order, selector, declarations)
+         for order, (selector, declarations) in enumerate(rules)
+         if any(name in declarations for name in FONT_PROPERTIES)),
+        key=lambda rule: (rule[0], rule[1]),
+    )
+
+    computed = {}
+
+    def style_of(chain):
+        tag = chain[-1]
+        if id(tag) in computed:
+            return computed[id(tag)]
+        parent = style_of(chain[:-1]) if len(chain) > 1 else {
+            'font-family': '', 'font-weight': 400, 'text-transform': 'none'}
+        style = dict(parent)
+        declared = dict(USER_AGENT_STYLES.get(tag.name, {}))
+        for _, _, selector, declarations in ranked:
+            if selector_matches(selector, chain):
+                declared.update((name, declarations[name]) for name in FONT_PROPERTIES if name in declarations)
+        for name, value in declared.items():
+            value = resolve_vars(value, properties).strip()
+            if value in ('inherit', 'unset', ''):
+                continue
+            if name == 'font-weight':
+                style[name] = parse_weight(value, parent['font-weight'])
+            elif name == 'font-family':
+                style[name] = primary_family(value)
+            else:
+                style[name] = value.lower()
+        computed[id(tag)] = style
+        return style
+
+    usage = {}
+    for text, ancestors in document.texts:
+        if not ancestors or UNRENDERED_ELEMENTS.intersection(tag.name for tag in ancestors):
+            continue
+        text = re.sub(r'\s+', ' ', text)
+        if not text.strip():
+            continue
+        style = style_of(list(ancestors))
+        if style['font-family'].lower() == family.lower():
+            usage.setdefault(style['font-weight'], set()).update(transformed(text, style['text-transform']))
+    return usage
+
+
+def unicode_range(codepoints):
+    """
+    Format codepoints as a CSS unicode-range, merging consecutive runs.
+    """
+    ranges = []
+    for codepoint in sorted(codepoints):
+        if ranges and codepoint == ranges[-1][1] + 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return ', '.join(f"U+{start:X}" if start == end else f"U+{start:X}-{end:X}" for start, end in ranges)
+
+
+def _font_weight(font):
+    if 'fvar' in font:
+        for axis in font['fvar'].axes:
+            if axis.axisTag == 'wght':
+                return axis.minValue, axis.maxValue
+    weight = font['OS/2'].usWeightClass
+    return weight, weight
+
+
+def missing_requirements(font_paths, family=DEFAULT_FAMILY):
+    """
+    Explain why the font can't be subset here.
+
+    Returns:
+        Message naming what is missing, or None if nothing is
+    """
+    if font_subset is None:
+        return "fontTools is not installed (pip install fonttools brotli)"
+    for path in font_paths:
+        if not os.path.exists(path):
+            return (f"{path} not found; download {family} from https://fonts.google.com/ "
+                    f"and vendor it there")
+    return None
+
+
+def subset_font(font_paths, weight, text, output_dir, family, cache=None):
+    """
+    Write one weight of the font, subset to the given characters.
+
+    Args:
+        font_paths: Vendored font files (a variable font or static weights)
+        weight: Weight to produce
+        text: Characters to keep
+        output_dir: Directory for the output file
+        family: Family name, used for the file name
+        cache: Optional BuildCache; an up-to-date subset is not rebuilt
+
+    Returns:
+        (output path, format name for @font-face src, codepoints kept)
+    """
+    flavor = 'woff2' if brotli is not None else 'woff'
+    output = os.path.join(output_dir, f"{family.lower().replace(' ', '-')}-{weight}.{flavor}")
+    key = cache_key({'version': SUBSET_VERSION, 'weight': weight, 'text': text, 'flavor': flavor}, font_paths)
+    if cache is not None and cache.is_fresh(output, key):
+        return output, flavor, set(TTFont(output).getBestCmap())
+
+    # Pick the variable font covering the weight, else the closest static file
+    candidates = []
+    for path in font_paths:
+        font = TTFont(path)
+        low, high = _font_weight(font)
+        distance = 0 if low <= weight <= high else min(abs(weight - low), abs(weight - high))
+        candidates.append((distance, path, font))
+    _, path, font = min(candidates, key=lambda candidate: candidate[:2])
+
+    if 'fvar' in font:
+        low, high = _font_weight(font)
+        font = instancer.instantiateVariableFont(font, {'wght': min(max(weight, low), high)})
+
+    options = font_subset.Options()
+    options.flavor = flavor
+    options.desubroutinize = True
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+
+    codepoints = set(font.getBestCmap())
+    buffer = io.BytesIO()
+    font.flavor = options.flavor
+    font.save(buffer)
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_if_changed(output, buffer.getvalue())
+    if cache is not None:
+        cache.record(output, key)
+    return output, flavor, codepoints
+
+
+def subset_faces(source, font_paths, family, output_dir, extra_text='', cache=None):
+    """
+    Subset the font to what a page renders in it, one file per weight.
+
+    Args:
+        source: HTML text
+        font_paths: Vendored font files
+        family: Font family name
+        output_dir: Directory for the subsetted files
+        extra_text: Characters to keep in every weight (e.g. text set by
+            scripts)
+        cache: Optional BuildCache
+
+    Returns:
+        List of (weight, path, format, codepoints), empty if nothing on
+        the page uses the family
+    """
+    faces = []
+    for weight, chars in sorted(font_usage(source, family).items()):
+        text = ''.join(sorted(chars | set(extra_text) | {' '}))
+        path, fmt, codepoints = subset_font(font_paths, weight, text, output_dir, family, cache)
+        faces.append((weight, path, fmt, codepoints))
+    return faces
+
+
+def font_face_css(family, faces, site_root, indent):
+    """
+    Render the @font-face rules for the generated files.
+
+    Args:
+        family: Font family name
+        faces: List of (weight, path, format, codepoints)
+        site_root: Directory index.html is served from
+        indent: Indentation of the <style> element
+    """
+    inner = indent + '  '
+    lines = []
+    for weight, path, fmt, codepoints in faces:
+        lines += [
+            f"{inner}@font-face {{",
+            f"{inner}  font-family: \"{family}\";",
+            f"{inner}  font-style: normal;",
+            f"{inner}  font-weight: {weight};",
+            f"{inner}  font-display: swap;",
+            f"{inner}  src: url({site_url(path, site_root)}) format(\"{fmt}\");",
+            f"{inner}  unicode-range: {unicode_range(codepoints)};",
+            f"{inner}}}",
+        ]
+    return '\n'.join(lines)
+
+
+def _is_google_fonts(tag):
+    return tag.name == 'link' and urlsplit(tag.attrs.get('href') or '').hostname in GOOGLE_FONTS_HOSTS
+
+
+def _line_span(source, start, end):
+    """
+    Widen [start, end) to whole lines when nothing else shares them, so
+    removed tags don't leave blank lines behind.
+    """
+    line_start = source.rfind('\n', 0, start) + 1
+    line_end = source.find('\n', end)
+    line_end = len(source) if line_end < 0 else line_end + 1
+    if source[line_start:start].strip() or source[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def rewrite_head(source, family, faces, site_root):
+    """
+    Replace the Google Fonts links (or a previous run's output) with
+    preloads and an inline @font-face block.
+
+    Returns:
+        Rewritten HTML, or None if the page has neither to replace
+    """
+    document = parse_html(source)
+    fmt_types = {'woff2': 'font/woff2', 'woff': 'font/woff'}
+    old = [tag for tag in document.find('link') if _is_google_fonts(tag)]
+    old += [tag for tag in document.find('style') if tag.attrs.get('id') == FONT_FACES_ID]
+    old += [tag for tag in document.find('link')
+            if tag.attrs.get('rel') == 'preload' and tag.attrs.get('as') == 'font'
+            and os.path.basename(tag.attrs.get('href', '')).startswith(family.lower().replace(' ', '-') + '-')]
+    if not old:
+        return None
+    old.sort(key=lambda tag: tag.start)
+
+    indent = line_indent(source, old[0].start)
+    lines = [render_start_tag('link', [
+        ('rel', 'preload'),
+        ('href', site_url(path, site_root)),
+        ('as', 'font'),
+        ('type', fmt_types[fmt]),
+        ('crossorigin', None),
+    ]) for _, path, fmt, _ in faces]
+    lines.append(f'<style id="{FONT_FACES_ID}">\n{font_face_css(family, faces, site_root, indent)}\n{indent}</style>')
+    replacement = ''.join(f"{indent}{line}\n" for line in lines)
+
+    edits = []
+    for index, tag in enumerate(old):
+        start, end = _line_span(source, tag.start, tag.outer_end)
+        edits.append((start, end, replacement if index == 0 else ''))
+    return apply_edits(source, edits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-host a subsetted copy of the heading font")
+    parser.add_argument('input', nargs='?', default='index.html', help="HTML file (default index.html)")
+    parser.add_argument('-o', '--output',
+                        help="write the rewritten HTML here (default: only write the font files)")
+    parser.add_argument('--font', action='append',
+                        help=f"vendored font file; repeat for static weights (default {DEFAULT_FONTS[0]})")
+    parser.add_argument('--family', default=DEFAULT_FAMILY, help=f"font family to self-host (default {DEFAULT_FAMILY})")
+    parser.add_argument('--output-dir', default=FONT_SUBSET_DIR,
+                        help=f"directory for the subsetted files (default {FONT_SUBSET_DIR})")
+    parser.add_argument('--text', default='', help="extra characters to keep (e.g. text set by scripts)")
+    parser.add_argument('--force', action='store_true', help="rebuild the subsets even if up to date")
+    args = parser.parse_args()
+
+    fonts = args.font or list(DEFAULT_FONTS)
+    problem = missing_requirements(fonts, args.family)
+    if problem:
+        print(f"✗ {problem}", file=sys.stderr)
+        return 1
+    if args.output and os.path.abspath(args.output) == os.path.abspath(args.input):
+        print(f"✗ Refusing to overwrite {args.input}; build.py applies the rewrite to the deployed copy",
+              file=sys.stderr)
+        return 1
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        source = f.read()
+    site_root = os.path.dirname(args.input) or '.'
+
+    with BuildCache(os.path.join(site_root, CACHE_PATH), enabled=not args.force) as cache:
+        faces = subset_faces(source, fonts, args.family, os.path.join(site_root, args.output_dir), args.text, cache)
+    if not faces:
+        print(f"⚠ Nothing on the page is rendered in {args.family}; no font files written")
+        return 0
+    for weight, path, _, codepoints in faces:
+        print(f"✓ {args.family} {weight}: {len(codepoints)} glyphs, {os.path.getsize(path):,} bytes ({path})")
+    if brotli is None:
+        print("⚠ brotli is not installed (pip install brotli), wrote WOFF instead of WOFF2", file=sys.stderr)
+
+    rewritten = rewrite_head(source, args.family, faces, site_root)
+    if rewritten is None:
+        print(f"⚠ No Google Fonts links or {FONT_FACES_ID} block found in {args.input}; "
+              f"the font files were written but the page would not change", file=sys.stderr)
+        return 1
+    if not args.output:
+        return 0
+    if write_if_changed(args.output, rewritten.encode('utf-8')):
+        print(f"✓ Replaced Google Fonts with {len(faces)} self-hosted face(s) in {args.output}")
+    else:
+        print(f"✓ {args.output} is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
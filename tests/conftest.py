@@ -0,0 +1,8 @@
+"""
+The scripts live at the repository root; make them importable as modules.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
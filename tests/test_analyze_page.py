@@ -0,0 +1,30 @@
+from analyze_page import analyze
+
+PAGE = '''<!DOCTYPE html>
+<html><head>
+<meta property="og:image" content="https://example.com/images/photo.png">
+<link rel="icon" href="/images/photo.png">
+</head><body>
+<img src="./images/photo.png" alt="">
+<img src="https://example.com/images/photo.png" alt="">
+<img src="https://www.example.com/images/photo.png" alt="">
+<img src="https://cdn.example.net/images/photo.png" alt="">
+</body></html>
+'''
+
+
+def test_one_file_is_one_request_and_og_is_not_a_visitor_fetch(tmp_path):
+    (tmp_path / 'CNAME').write_text('example.com\n')
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'images' / 'photo.png').write_bytes(b'\x89PNG' + bytes(1000))
+    page = tmp_path / 'index.html'
+    page.write_text(PAGE)
+
+    report = analyze(str(page), budgets={})
+    # www.example.com is the same site; cdn.example.net is a request of its own
+    assert report['requests'] == 3
+    assert report['by_type']['image']['count'] == 1
+    assert report['by_type']['image']['bytes'] == 1004
+    assert report['external_requests'] == 1
+    assert report['violations'] == []
+    assert [entry['url'] for entry in report['link_previews']] == ['https://example.com/images/photo.png']
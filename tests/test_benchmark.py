@@ -0,0 +1,35 @@
+import json
+
+import benchmark
+from benchmark import compare
+
+
+def result(seconds, relative=None, peak=1000, output=100):
+    entry = {'seconds': seconds, 'peak_bytes': peak, 'output_bytes': output}
+    if relative is not None:
+        entry['relative'] = relative
+    return entry
+
+
+def test_compare_scales_relative_times_to_this_machine():
+    baseline = {'case': result(0.05, relative=10)}
+    # Calibration of 10 ms: the baseline means 100 ms here, so 200 ms regressed
+    assert [name for name, _ in compare({'case': result(0.2)}, baseline, calibration=0.01)] == ['case']
+    # On a machine twice as slow the same 200 ms is on par
+    assert compare({'case': result(0.2)}, baseline, calibration=0.02) == []
+    assert compare({'case': result(0.2)}, baseline, calibration=0.01, times=False) == []
+
+
+def test_timings_are_skipped_when_the_environment_differs():
+    environment = {'python': '3.12.1', 'machine': 'x86_64', 'pillow': '12.3.0', 'rasterizer': 'numpy'}
+    assert benchmark.timing_environment_differences(environment, dict(environment, calibration_seconds=1)) == []
+    assert benchmark.timing_environment_differences(environment, dict(environment, machine='arm64')) == ['machine']
+
+
+def test_check_exits_nonzero_on_a_regression(tmp_path):
+    path = tmp_path / 'baseline.json'
+    # Output sizes are compared whatever the machine, so this always regresses
+    path.write_text(json.dumps({'environment': {}, 'results': {'create_favicon/16': result(60, output=1)}}))
+    args = ['--quick', '--filter', 'create_favicon/16', '--repeat', '1', '--baseline', str(path)]
+    assert benchmark.main(args) == 0
+    assert benchmark.main(args + ['--check']) == 1
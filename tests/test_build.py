@@ -0,0 +1,83 @@
+import json
+import os
+import re
+
+import pytest
+
+import build
+from optimize_png import to_rgba8
+from png_encoder import read_png
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def dist(tmp_path_factory):
+    """
+    Build the repository's site, as the deploy workflow does.
+    """
+    output = tmp_path_factory.mktemp('site') / 'dist'
+    manifest = build.build(REPO_ROOT, str(output), asset_manifest=str(output.parent / 'asset-manifest.json'))
+    assert manifest is not None, "the site has references to missing files"
+    return output
+
+
+def test_build_has_no_dangling_references():
+    _, missing = build.collect_assets(REPO_ROOT, 'index.html')
+    origins = build.site_origins(REPO_ROOT)
+    assert [url for url, _ in missing
+            if not build.is_pending(build.resolve(url, REPO_ROOT, origins), REPO_ROOT)] == []
+
+
+def test_missing_files_fail_unless_pending_or_allowed(tmp_path):
+    site = tmp_path / 'site'
+    (site / 'images').mkdir(parents=True)
+    (site / 'index.html').write_text('<img src="./images/profile.jpg" alt=""><img src="./images/gone.png" alt="">')
+    options = dict(asset_manifest=None, responsive=False, placeholders=False)
+    assert build.build(str(site), str(tmp_path / 'dist'), **options) is None
+    assert build.build(str(site), str(tmp_path / 'dist'), allow_missing=True, **options) is not None
+    (site / 'index.html').write_text('<img src="./images/profile.jpg" alt="">')
+    assert build.build(str(site), str(tmp_path / 'dist'), **options) is not None
+
+
+def test_build_writes_page_and_assets(dist):
+    names = {os.path.relpath(os.path.join(root, name), dist)
+             for root, _, files in os.walk(dist) for name in files}
+    assert 'index.html' in names
+    assert 'CNAME' in names
+    assert any(name.startswith(('images/flight-stats.', 'images/responsive/flight-stats-')) for name in names)
+
+
+def test_build_serves_responsive_images(dist):
+    with open(dist / 'index.html', encoding='utf-8') as f:
+        page = f.read()
+    assert '<picture>' in page
+    assert 'images/flight-stats.png' not in page
+    fallback = re.search(r'<img src="\./(images/responsive/flight-stats-580\.[0-9a-f]+\.png)"', page)
+    assert fallback, "the fallback <img> should load the middle rung of the ladder"
+    assert (dist / fallback.group(1)).is_file()
+
+
+def test_build_adds_image_placeholders(dist):
+    with open(dist / 'index.html', encoding='utf-8') as f:
+        page = f.read()
+    img = re.search(r'<img src="\./images/responsive/flight-stats-[^>]*>', page)
+    assert img
+    tag = img.group(0)
+    assert 'width="580"' in tag and 'height="216"' in tag
+    assert re.search(r'style="background: ?#[0-9a-f]{6} url\(data:image/jpeg;base64,[A-Za-z0-9+/=]+\)', tag)
+
+
+def test_build_ships_recompressed_pngs(dist):
+    with open(dist.parent / 'asset-manifest.json', encoding='utf-8') as f:
+        mapping = json.load(f)
+    icons = {source: shipped for source, shipped in mapping.items()
+             if source.endswith('.png') and not source.startswith(build.RESPONSIVE_DIR)}
+    assert icons
+    for source, shipped in icons.items():
+        with open(os.path.join(REPO_ROOT, source), 'rb') as f:
+            original = read_png(f.read())
+        with open(dist / shipped, 'rb') as f:
+            recompressed = read_png(f.read())
+        assert (dist / shipped).stat().st_size <= os.path.getsize(os.path.join(REPO_ROOT, source))
+        assert to_rgba8(recompressed) == to_rgba8(original)
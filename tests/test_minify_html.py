@@ -0,0 +1,22 @@
+import pytest
+
+from minify_html import minify_html
+
+
+@pytest.mark.parametrize('markup', [
+    '<p>Before <picture><img src="a.png" alt=""></picture> after</p>',
+    '<p>Watch <iframe src="https://example.com/embed"></iframe> here</p>',
+    '<p>Hello <script>f()</script> world</p>',
+    '<p>Styled <style>p{color:red}</style> text</p>',
+    '<p><img src="a.png" alt=""> <img src="b.png" alt=""></p>',
+])
+def test_whitespace_next_to_inline_elements_is_kept(markup):
+    assert minify_html(markup) == markup
+
+
+def test_whitespace_next_to_blocks_and_in_head_is_removed():
+    source = ('<html>\n  <head>\n    <title>T</title>\n    <link rel="icon" href="a.png">\n'
+              '    <script src="a.js"></script>\n  </head>\n  <body>\n    <div>\n      <p> Text </p>\n'
+              '    </div>\n  </body>\n</html>\n')
+    assert minify_html(source) == ('<html><head><title>T</title><link rel="icon" href="a.png">'
+                                   '<script src="a.js"></script></head><body><div><p>Text</p></div></body></html>')
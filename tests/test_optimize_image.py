@@ -0,0 +1,38 @@
+import io
+
+from PIL import Image
+
+from optimize_image import DEFAULT_MIN_SIMILARITY, generate_variants, optimize_image, optimize_options
+
+
+def test_jpeg_savings_report_is_opt_in(tmp_path, capsys):
+    source = tmp_path / 'photo.png'
+    Image.radial_gradient('L').convert('RGB').save(source)
+
+    assert optimize_image(str(source), str(tmp_path / 'default.jpg'))
+    assert 'Bytes saved' not in capsys.readouterr().out
+
+    assert optimize_image(str(source), str(tmp_path / 'report.jpg'), report_savings=True)
+    assert 'Bytes saved by each option' in capsys.readouterr().out
+
+
+def test_budget_settings_are_only_passed_with_a_budget():
+    assert optimize_options(min_similarity=0.5, allow_resize=False) == {'jpeg_options': None, 'report_savings': False}
+    assert optimize_options(budget=1000, allow_resize=False) == {
+        'jpeg_options': None, 'report_savings': False, 'budget': 1000,
+        'min_similarity': DEFAULT_MIN_SIMILARITY, 'allow_resize': False}
+
+
+def test_png_fallback_copies_the_source_and_recompresses_smaller_rungs(tmp_path):
+    source = tmp_path / 'chart.png'
+    Image.linear_gradient('L').resize((320, 120)).convert('RGB').save(source)
+
+    variants = generate_variants(str(source), str(tmp_path / 'out'), widths=(160, 640))
+    (small, _, _), (full, width, _) = variants['sources'][-1]['files']
+    assert width == 320
+    assert open(full, 'rb').read() == source.read_bytes()
+
+    with Image.open(source) as img:
+        pillow = io.BytesIO()
+        img.resize((160, 60), Image.LANCZOS).save(pillow, 'PNG', optimize=True)
+    assert len(open(small, 'rb').read()) <= len(pillow.getvalue())
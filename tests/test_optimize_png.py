@@ -0,0 +1,58 @@
+import io
+import random
+import struct
+
+import pytest
+from PIL import Image
+
+from optimize_png import recompress_png, to_rgba8
+from png_encoder import COLOR_TYPE_GRAY, COLOR_TYPE_RGB, read_png, write_png
+
+
+def sixteen_bit_png(color_type, key):
+    """
+    A 16-bit image whose samples all fit in 8 bits, with a tRNS key that
+    matches some of its pixels.
+    """
+    rnd = random.Random(color_type)
+    width, height = 16, 8
+    channels = 3 if color_type == COLOR_TYPE_RGB else 1
+    rows = []
+    for y in range(height):
+        pixels = [key if (x + y) % 3 == 0 else tuple(rnd.randrange(256) for _ in range(channels))
+                  for x in range(width)]
+        rows.append(b''.join(struct.pack('>H', value * 257) for pixel in pixels for value in pixel))
+    transparency = b''.join(struct.pack('>H', value * 257) for value in key)
+    out = io.BytesIO()
+    write_png(out, width, height, rows, bit_depth=16, color_type=color_type, transparency=transparency)
+    return out.getvalue()
+
+
+def pillow_rgba(data):
+    """
+    Decode a PNG to 8-bit RGBA with Pillow. Its convert('RGBA') clips
+    16-bit grayscale instead of scaling it, so that mode is expanded here
+    from the decoded samples and the tRNS value Pillow reports.
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.mode != 'I;16':
+        return img.convert('RGBA').tobytes()
+    key = img.info.get('transparency')
+    samples = struct.unpack(f'<{img.width * img.height}H', img.tobytes())
+    return b''.join(bytes([value // 257] * 3 + [0 if value == key else 255]) for value in samples)
+
+
+@pytest.mark.parametrize('color_type, key', [(COLOR_TYPE_GRAY, (77,)), (COLOR_TYPE_RGB, (10, 200, 30))])
+def test_sixteen_bit_color_key_matches_pillow(color_type, key):
+    data = sixteen_bit_png(color_type, key)
+    rgba = to_rgba8(read_png(data))
+    assert rgba == pillow_rgba(data)
+    assert 0 in rgba[3::4]
+
+
+@pytest.mark.parametrize('color_type, key', [(COLOR_TYPE_GRAY, (77,)), (COLOR_TYPE_RGB, (10, 200, 30))])
+def test_sixteen_bit_color_key_survives_recompression(color_type, key):
+    data = sixteen_bit_png(color_type, key)
+    best, _ = recompress_png(data, jobs=1, fast=True)
+    assert read_png(best)['bit_depth'] == 8
+    assert Image.open(io.BytesIO(best)).convert('RGBA').tobytes() == pillow_rgba(data)
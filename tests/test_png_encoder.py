@@ -0,0 +1,53 @@
+import io
+import random
+import struct
+
+import pytest
+
+import png_encoder
+from png_encoder import ALL_FILTERS, create_png, read_png
+
+
+@pytest.mark.skipif(png_encoder.np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize('bpp', [1, 2, 3, 4, 6, 8])
+def test_numpy_filters_match_python(monkeypatch, bpp):
+    rnd = random.Random(bpp)
+    for _ in range(50):
+        length = bpp * rnd.randrange(1, 40)
+        row, prev = rnd.randbytes(length), rnd.randbytes(length)
+        vectorized = list(png_encoder._numpy_filters(ALL_FILTERS, row, prev, bpp))
+        with monkeypatch.context() as patch:
+            patch.setattr(png_encoder, 'np', None)
+            reference = list(png_encoder._python_filters(ALL_FILTERS, row, prev, bpp))
+        assert vectorized == reference
+
+
+@pytest.mark.parametrize('strategy', list(png_encoder.FILTER_STRATEGIES))
+def test_create_png_round_trips(strategy):
+    rnd = random.Random(7)
+    width, height = 37, 23
+    pixels = rnd.randbytes(width * height * 3)
+    png = read_png(create_png(width, height, pixels, filter_strategy=strategy, indexed=False))
+    assert b''.join(png['rows']) == pixels
+
+
+def test_auto_skips_rgb_trial_for_large_images(monkeypatch):
+    calls = []
+    write_png = png_encoder.write_png
+    monkeypatch.setattr(png_encoder, 'write_png', lambda *args, **kwargs: calls.append(kwargs) or
+                        write_png(*args, **kwargs))
+    size = 128
+    pixels = bytes([10, 20, 30]) * (size * size // 2) + bytes([200, 100, 0]) * (size * size // 2)
+    data = create_png(size, size, pixels)
+    assert len(calls) == 1
+    assert data[25] == png_encoder.COLOR_TYPE_PALETTE
+
+
+def test_ico_directory_records_bits_per_pixel():
+    entries = []
+    for color_type, rows in ((png_encoder.COLOR_TYPE_RGBA, [bytes(8)]), (png_encoder.COLOR_TYPE_GRAY, [bytes(2)])):
+        output = io.BytesIO()
+        png_encoder.write_png(output, 2, 1, rows, color_type=color_type)
+        entries.append(output.getvalue())
+    ico = png_encoder.create_ico(entries)
+    assert [struct.unpack('<H', ico[6 + 16 * index + 6:6 + 16 * index + 8])[0] for index in range(2)] == [32, 8]
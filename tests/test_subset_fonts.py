@@ -0,0 +1,71 @@
+from subset_fonts import font_usage, missing_requirements, rewrite_head, transformed
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <link rel="preconnect" href="https://fonts.googleapis.com">
+  <link href="https://fonts.googleapis.com/css2?family=Oswald:wght@400;700&display=swap" rel="stylesheet">
+  <style>
+    :root { --heading: 'Oswald', sans-serif; }
+    body { font-family: Georgia, serif; }
+    h1, h2 { font-family: var(--heading); }
+    .hero h2 { font-weight: 400; text-transform: uppercase; }
+    h2.quiet { font-family: Georgia, serif; }
+    #lead { font-family: var(--heading); font-weight: 300; }
+    .tag { font-family: "Oswald"; text-transform: capitalize; }
+    @media (max-width: 480px) { .hero h2 { font-weight: 500; } }
+  </style>
+</head>
+<body>
+  <h1>Ab</h1>
+  <section class="hero"><h2>cd</h2></section>
+  <h2 class="quiet">zz</h2>
+  <p id="lead">ef <em>g</em></p>
+  <p>qq</p>
+  <span class="tag">hi jk</span>
+  <script>var oswald = 'xx';</script>
+</body>
+</html>
+"""
+
+
+def test_font_usage_follows_the_cascade():
+    usage = font_usage(PAGE, 'Oswald')
+    # h1 is bold by default; .hero h2 outranks h1, h2 and the later @media
+    # rule wins the tie; #lead and its <em> child are 300
+    assert usage[700] == set('Ab')
+    assert usage[500] == set('CD')
+    assert usage[300] == set('ef g')
+    # Overridden by a more specific selector, or never in the family
+    assert not set('zqx') & set().union(*usage.values())
+
+
+def test_font_usage_applies_text_transform():
+    usage = font_usage(PAGE, 'Oswald')
+    assert usage[500] == set('CD')
+    assert usage[400] == set('hi jkHJ')
+
+
+def test_capitalize_keeps_both_cases_of_word_initial_letters():
+    assert set(transformed('hello world-wide', 'capitalize')) == set('hello world-wide') | set('HWW')
+    assert transformed('Mixed', 'lowercase') == 'mixed'
+    assert transformed('Mixed', 'none') == 'Mixed'
+
+
+def test_rewrite_head_replaces_google_fonts(tmp_path):
+    faces = [(700, str(tmp_path / 'fonts' / 'subset' / 'oswald-700.woff2'), 'woff2', {0x41, 0x42, 0x44})]
+    rewritten = rewrite_head(PAGE, 'Oswald', faces, str(tmp_path))
+    assert 'fonts.googleapis.com' not in rewritten
+    assert '<link rel="preload" href="./fonts/subset/oswald-700.woff2" as="font" type="font/woff2" crossorigin>' \
+        in rewritten
+    assert 'unicode-range: U+41-42, U+44;' in rewritten
+    # Idempotent: the generated block is replaced, not duplicated
+    assert rewrite_head(rewritten, 'Oswald', faces, str(tmp_path)) == rewritten
+
+
+def test_missing_requirements_names_the_missing_font(tmp_path, monkeypatch):
+    import subset_fonts
+    monkeypatch.setattr(subset_fonts, 'font_subset', object())
+    assert 'gone.ttf not found' in missing_requirements([str(tmp_path / 'gone.ttf')])
+    monkeypatch.setattr(subset_fonts, 'font_subset', None)
+    assert 'fontTools' in missing_requirements([])
@@ -0,0 +1,107 @@
+import validate_workflow
+from validate_workflow import validate_text
+
+WORKFLOW = '''name: Deploy
+on: push
+permissions:
+  pages: write
+jobs:
+  deploy:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/deploy-pages@v4 \n
+'''
+
+
+def test_line_and_tree_rules_in_one_pass():
+    result = validate_text(WORKFLOW.replace('      - uses', '     - uses'))
+    # The root rule sees the action used deep in the tree
+    assert rules(result) == [('indentation', 9), ('pages-concurrency', 1), ('trailing-space', 9)]
+    assert 'lines' in result['timings']
+
+
+# Block scalars with every chomping indicator, folding and an explicit indent
+SCRIPTS = WORKFLOW + '''      - name: Build
+        run: |
+          python3 build.py
+
+          ls dist
+      - name: Summary
+        env:
+          TITLE: >-
+            folded
+            text
+          BODY: >
+            one
+            two
+
+            three
+              indented
+          KEEP: |+
+            kept
+
+          EXACT: |2-
+              two extra
+             one extra
+        run: echo "$TITLE"
+'''
+
+
+def rules(result):
+    return sorted((issue['rule'], issue['line']) for issue in result['issues'])
+
+
+def tree(node):
+    """
+    Return a Node tree as nested (kind, value, line) tuples.
+    """
+    if node.kind == 'map':
+        value = {key: tree(child) for key, child in node.value.items()}
+    elif node.kind == 'seq':
+        value = [tree(child) for child in node.value]
+    else:
+        value = node.value
+    return node.kind, value, node.line
+
+
+def test_tokenizer_matches_yaml(monkeypatch):
+    expected = validate_text(WORKFLOW)
+    expected_tree, _ = validate_workflow.parse_workflow(SCRIPTS)
+    monkeypatch.setattr(validate_workflow, 'yaml', None)
+    result = validate_text(WORKFLOW)
+    assert result['parser'] == 'tokenizer'
+    assert rules(result) == rules(expected)
+
+    root, parser = validate_workflow.parse_workflow(SCRIPTS)
+    assert parser == 'tokenizer'
+    assert tree(root) == tree(expected_tree)
+    env = root.get('jobs').get('deploy').get('steps').value[2].get('env')
+    assert env.get('TITLE').value == 'folded text'
+    assert env.get('KEEP').value == 'kept\n\n'
+    assert env.get('EXACT').value == '  two extra\n one extra'
+
+
+def test_result_cache_hashes_the_validator_once(tmp_path, monkeypatch):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'workflow{index}.yml'
+        path.write_text(WORKFLOW.replace('Deploy', f'Deploy {index}'))
+        paths.append(str(path))
+
+    hashed = []
+    real_digest = validate_workflow.file_digest
+    monkeypatch.setattr(validate_workflow, '_validator_digest', None)
+    monkeypatch.setattr(validate_workflow, 'file_digest', lambda path: hashed.append(path) or real_digest(path))
+
+    cache_path = str(tmp_path / 'workflows.json')
+    with validate_workflow.ResultCache(cache_path) as cache:
+        first = validate_workflow.validate_files(paths, jobs=1, repo_root=str(tmp_path), cache=cache)
+    with validate_workflow.ResultCache(cache_path) as cache:
+        second = validate_workflow.validate_files(paths, jobs=1, repo_root=str(tmp_path), cache=cache)
+        single = validate_workflow.validate_file(paths[0], repo_root=str(tmp_path), cache=cache)
+
+    assert len(hashed) == 1
+    assert not any(result['cached'] for result in first)
+    assert all(result['cached'] for result in second)
+    assert single['cached']
+    assert [rules(result) for result in second] == [rules(result) for result in first]
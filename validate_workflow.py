@@ -1,150 +1,899 @@
 #!/usr/bin/env python3
 """
-Validate GitHub Actions workflow syntax
+Validate GitHub Actions workflow files.
+
+Each file is parsed once into a tree of nodes that remember their line
+numbers, with PyYAML's C loader when it is installed and a line-indexed
+tokenizer for the YAML subset workflows use otherwise. The checks are a
+table of rules: every line rule is tried on each line during a single
+scan of the text, and tree rules are dispatched by path (('jobs', '*',
+'steps', '*') for every step, ...) during one walk of the tree, which
+also collects the actions the workflow uses. Adding a check means adding
+a row.
+
+Any number of files or directories can be given; they are validated in
+parallel and reported in order. Exits with 1 if any file has errors.
+
+Results are cached in .build-cache/workflows.json, keyed by the file's
+contents, RULES_VERSION, the parser and this script, so re-validating an
+unchanged workflow (on every save from an editor or pre-commit hook) only
+costs a hash. Reports can be printed as text, JSON or SARIF 2.1.0 for code
+scanning; the machine-readable formats include the time spent in the line
+scan and in each tree rule.
+
+Usage:
+    python validate_workflow.py [PATH ...] [--jobs N] [--format text|json|sarif] [--no-cache]
+
+    PATH defaults to every .yml/.yaml file in .github/workflows.
 """
-import yaml
-import sys
+
+import argparse
+import glob
+import json
 import os
+import re
+import sys
+import time
+
+from build_cache import BuildCache, cache_key, file_digest
+
+try:
+    import yaml
+    YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+except ImportError:
+    yaml = None
+
+WORKFLOW_DIR = '.github/workflows'
+
+RESULT_CACHE_PATH = '.build-cache/workflows.json'
+
+# Bump when a rule changes what it reports; cached results are discarded
+RULES_VERSION = 1
+
+# Bump when the cache file layout changes
+RESULT_CACHE_FORMAT = 1
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_LEVELS = {'error': 'error', 'warning': 'warning', 'info': 'note'}
+
+SEVERITY_SYMBOLS = {'error': '✗', 'warning': '⚠', 'info': 'ℹ'}
+
+VALID_PERMISSIONS = {
+    'actions', 'attestations', 'checks', 'contents', 'deployments', 'discussions', 'id-token',
+    'issues', 'models', 'packages', 'pages', 'pull-requests', 'repository-projects',
+    'security-events', 'statuses',
+}
+PERMISSION_LEVELS = {'read', 'write', 'none'}
 
-def validate_yaml_syntax(file_path):
-    """Check if YAML file has valid syntax"""
+# Oldest major version of an action that is still supported
+MINIMUM_ACTION_VERSIONS = {
+    'actions/checkout': 3,
+    'actions/setup-node': 2,
+    'actions/setup-python': 4,
+    'actions/upload-artifact': 4,
+    'actions/download-artifact': 4,
+    'actions/upload-pages-artifact': 3,
+    'actions/deploy-pages': 4,
+}
+
+_NPM_COMMAND = re.compile(r'\bnpm (ci|install|run)\b')
+
+
+class Node:
+    """
+    One value of the parsed workflow.
+
+    Attributes:
+        kind: 'map', 'seq' or 'scalar'
+        value: Dict of key -> Node, list of Nodes, or the scalar string
+            (None for null)
+        line: 1-based line of the node (of its key, for mapping values)
+    """
+
+    __slots__ = ('kind', 'value', 'line')
+
+    def __init__(self, kind, value, line):
+        self.kind = kind
+        self.value = value
+        self.line = line
+
+    def get(self, key):
+        """
+        Return the child Node for key of a mapping, or None.
+        """
+        return self.value.get(key) if self.kind == 'map' else None
+
+    def text(self):
+        """
+        Return the scalar value, or '' for other kinds.
+        """
+        return self.value or '' if self.kind == 'scalar' else ''
+
+
+class ParseError(Exception):
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+
+
+# ---------------------------------------------------------------- parsing
+
+def _from_yaml(node, line=None):
+    """
+    Convert a PyYAML composed node. Keys keep their source text, so 'on'
+    stays 'on' instead of becoming True.
+    """
+    line = line or node.start_mark.line + 1
+    if isinstance(node, yaml.MappingNode):
+        value = {}
+        for key, child in node.value:
+            value[key.value] = _from_yaml(child, key.start_mark.line + 1)
+        return Node('map', value, line)
+    if isinstance(node, yaml.SequenceNode):
+        return Node('seq', [_from_yaml(child) for child in node.value], line)
+    text = node.value
+    if node.tag == 'tag:yaml.org,2002:null' and not node.style:
+        text = None
+    return Node('scalar', text, line)
+
+
+def parse_with_yaml(text):
     try:
-        with open(file_path, 'r') as f:
-            data = yaml.safe_load(f)
-        print(f"✓ YAML syntax is valid for {file_path}")
-        return data
+        node = yaml.compose(text, Loader=YamlLoader)
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        raise ParseError(mark.line + 1 if mark else 1, f"YAML syntax error: {e.problem or e}")
     except yaml.YAMLError as e:
-        print(f"✗ YAML syntax error in {file_path}:")
-        print(f"  {e}")
-        return None
-
-def validate_github_actions_schema(data, file_path):
-    """Validate GitHub Actions workflow structure"""
-    errors = []
-    warnings = []
-
-    # Check required top-level fields
-    if 'name' not in data:
-        warnings.append("Missing 'name' field (recommended)")
-
-    if 'on' not in data:
-        errors.append("Missing required 'on' field")
-
-    if 'jobs' not in data:
-        errors.append("Missing required 'jobs' field")
-    elif not isinstance(data['jobs'], dict) or len(data['jobs']) == 0:
-        errors.append("'jobs' must be a non-empty dictionary")
-
-    # Validate permissions
-    if 'permissions' in data:
-        valid_permissions = ['actions', 'checks', 'contents', 'deployments',
-                           'id-token', 'issues', 'discussions', 'packages',
-                           'pages', 'pull-requests', 'repository-projects',
-                           'security-events', 'statuses']
-        for perm in data['permissions']:
-            if perm not in valid_permissions:
-                warnings.append(f"Unknown permission: {perm}")
-
-    # Validate jobs
-    if 'jobs' in data and isinstance(data['jobs'], dict):
-        for job_name, job_data in data['jobs'].items():
-            if not isinstance(job_data, dict):
-                errors.append(f"Job '{job_name}' must be a dictionary")
+        raise ParseError(1, f"YAML syntax error: {e}")
+    return _from_yaml(node) if node is not None else Node('map', {}, 1)
+
+
+def _strip_comment(text):
+    quote = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '#' and (index == 0 or text[index - 1] in ' \t'):
+            return text[:index].rstrip()
+    return text.rstrip()
+
+
+def _split_key(text):
+    """
+    Split 'key: value' outside quotes; returns (key, value) or None.
+    """
+    quote = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'' and index == 0:
+            quote = char
+        elif char == ':' and (index + 1 == len(text) or text[index + 1] == ' '):
+            return _unquote(text[:index].strip()), text[index + 1:].strip()
+        elif char in '[{' and index == 0:
+            return None
+    return None
+
+
+def _unquote(text):
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        return text[1:-1]
+    return text
+
+
+def _parse_flow(text, line):
+    """
+    Parse a flow scalar, [sequence] or {mapping} on one line.
+    """
+    text = text.strip()
+    if not text or text in ('~', 'null'):
+        return Node('scalar', None, line)
+    if text[0] not in '[{':
+        return Node('scalar', _unquote(text), line)
+    if text[-1] != {'[': ']', '{': '}'}[text[0]]:
+        raise ParseError(line, f"Unterminated flow collection: {text}")
+
+    items = []
+    depth = 0
+    quote = None
+    current = ''
+    for char in text[1:-1]:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char in '[{':
+            depth += 1
+        elif char in ']}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(current)
+            current = ''
+            continue
+        current += char
+    if current.strip():
+        items.append(current)
+
+    if text[0] == '[':
+        return Node('seq', [_parse_flow(item, line) for item in items], line)
+    value = {}
+    for item in items:
+        pair = _split_key(item.strip()) or (_unquote(item.strip()), '')
+        value[pair[0]] = _parse_flow(pair[1], line)
+    return Node('map', value, line)
+
+
+class _Tokenizer:
+    """
+    Parser for the block YAML subset used by workflows: mappings,
+    sequences, plain/quoted/flow scalars and | / > block scalars.
+    """
+
+    def __init__(self, text):
+        self.raw = text.split('\n')
+        # (line number, indent, content) of every line with content
+        self.lines = []
+        for number, raw in enumerate(self.raw, 1):
+            content = _strip_comment(raw)
+            if not content.strip() or content.strip() in ('---', '...'):
                 continue
+            stripped = content.lstrip(' ')
+            self.lines.append([number, len(content) - len(stripped), stripped])
+        self.index = 0
+
+    def parse(self):
+        if not self.lines:
+            return Node('map', {}, 1)
+        node = self.block(self.lines[0][1])
+        if self.index < len(self.lines):
+            number, _, content = self.lines[self.index]
+            raise ParseError(number, f"Unexpected indentation: {content}")
+        return node
+
+    def block(self, indent):
+        number, _, content = self.lines[self.index]
+        if content == '-' or content.startswith('- '):
+            return self.sequence(indent)
+        if _split_key(content):
+            return self.mapping(indent)
+        self.index += 1
+        return _parse_flow(content, number)
+
+    def sequence(self, indent):
+        items = []
+        line = self.lines[self.index][0]
+        while self.index < len(self.lines):
+            number, current, content = self.lines[self.index]
+            if current != indent or not (content == '-' or content.startswith('- ')):
+                break
+            rest = content[1:].lstrip(' ')
+            if not rest:
+                self.index += 1
+                items.append(self.child(indent, number))
+            else:
+                # Re-read the item's content as a block at its own column
+                self.lines[self.index] = [number, indent + len(content) - len(rest), rest]
+                items.append(self.block(indent + len(content) - len(rest)))
+        return Node('seq', items, line)
+
+    def mapping(self, indent):
+        value = {}
+        line = self.lines[self.index][0]
+        while self.index < len(self.lines):
+            number, current, content = self.lines[self.index]
+            if current < indent:
+                break
+            if current > indent:
+                raise ParseError(number, f"Unexpected indentation: {content}")
+            pair = _split_key(content)
+            if not pair:
+                break
+            key, rest = pair
+            if key in value:
+                raise ParseError(number, f"Duplicate key '{key}'")
+            self.index += 1
+            if re.fullmatch(r'[|>](?:[+-]?[1-9]?|[1-9][+-])', rest):
+                value[key] = self.block_scalar(number, current, rest)
+            elif rest:
+                value[key] = _parse_flow(rest, number)
+            else:
+                value[key] = self.child(indent, number, allow_sequence=True)
+        return Node('map', value, line)
 
-            # Check required job fields
-            if 'runs-on' not in job_data:
-                errors.append(f"Job '{job_name}' missing required 'runs-on' field")
+    def child(self, indent, number, allow_sequence=False):
+        if self.index < len(self.lines):
+            _, next_indent, next_content = self.lines[self.index]
+            if next_indent > indent:
+                node = self.block(next_indent)
+                node.line = number
+                return node
+            # "key:" followed by "- item" at the same indent is a sequence
+            if allow_sequence and next_indent == indent and next_content.startswith('-'):
+                node = self.sequence(indent)
+                node.line = number
+                return node
+        return Node('scalar', None, number)
 
-            # Validate steps
-            if 'steps' in job_data:
-                if not isinstance(job_data['steps'], list):
-                    errors.append(f"Job '{job_name}': 'steps' must be a list")
+    def block_scalar(self, number, indent, header):
+        """
+        Read the | or > block scalar whose header ends line number, with
+        its indentation indicator and chomping: '-' strips the final line
+        breaks, '+' keeps them all, and by default exactly one is kept.
+        """
+        start = number
+        body = []
+        while number < len(self.raw):
+            raw = self.raw[number]
+            if raw.strip() and len(raw) - len(raw.lstrip(' ')) <= indent:
+                break
+            body.append(raw)
+            number += 1
+        while self.index < len(self.lines) and self.lines[self.index][0] <= number:
+            self.index += 1
+        # Every line ends in a break except the last one of the file; an
+        # empty last element is just what follows the file's final break
+        final_break = number < len(self.raw)
+        if not final_break and body and not body[-1]:
+            body.pop()
+            final_break = True
+
+        explicit = re.search(r'\d', header)
+        if explicit:
+            margin = indent + int(explicit.group())
+        else:
+            margin = next((len(raw) - len(raw.lstrip(' ')) for raw in body if raw.strip()), 0)
+        lines = [raw[margin:] for raw in body]
+        trailing = 0
+        while lines and not lines[-1]:
+            lines.pop()
+            trailing += 1
+
+        if header[0] == '|':
+            text = '\n'.join(lines)
+        else:
+            # Breaks between two plain lines fold into a space (or vanish
+            # before empty lines); next to more-indented lines they stay
+            text = ''
+            previous = None
+            empty = 0
+            for line in lines:
+                if not line:
+                    empty += 1
+                    continue
+                if previous is not None:
+                    if previous[0] in ' \t' or line[0] in ' \t':
+                        text += '\n' * (empty + 1)
+                    else:
+                        text += '\n' * empty or ' '
                 else:
-                    for idx, step in enumerate(job_data['steps']):
-                        if not isinstance(step, dict):
-                            errors.append(f"Job '{job_name}', step {idx}: must be a dictionary")
-                        elif 'uses' not in step and 'run' not in step:
-                            errors.append(f"Job '{job_name}', step {idx}: must have either 'uses' or 'run'")
+                    text += '\n' * empty
+                text += line
+                previous = line
+                empty = 0
+
+        content_break = int(bool(lines) and (final_break or trailing > 0))
+        if '-' in header:
+            breaks = 0
+        elif '+' in header:
+            breaks = content_break + trailing
+        else:
+            breaks = content_break
+        return Node('scalar', text + '\n' * breaks, start)
+
+
+def parse_workflow(text):
+    """
+    Parse workflow YAML into a Node tree.
+
+    Returns:
+        (root Node, name of the parser used)
+
+    Raises:
+        ParseError: with the line of the first syntax error
+    """
+    if yaml is not None:
+        return parse_with_yaml(text), 'yaml'
+    return _Tokenizer(text).parse(), 'tokenizer'
+
+
+# ------------------------------------------------------------------ rules
+
+def check_root(node, context, key):
+    if node.kind != 'map':
+        yield 'error', node.line, "A workflow must be a mapping of top-level keys"
+        return
+    if node.get('name') is None:
+        yield 'warning', 1, "Missing 'name' field (recommended for workflow identification)"
+    if node.get('on') is None:
+        yield 'error', 1, "Missing required 'on' field (workflow triggers)"
+    jobs = node.get('jobs')
+    if jobs is None:
+        yield 'error', 1, "Missing required 'jobs' field"
+    elif jobs.kind != 'map' or not jobs.value:
+        yield 'error', jobs.line, "'jobs' must be a non-empty mapping"
+    if node.get('permissions') is None:
+        yield 'warning', 1, "Missing 'permissions' field (the token gets the repository defaults)"
+
+
+def check_deploy_concurrency(node, context, key):
+    if node.kind == 'map' and node.get('concurrency') is None and 'actions/deploy-pages' in context['actions']:
+        yield 'warning', 1, "Deploys to Pages without a 'concurrency' group"
+
+
+def check_permissions(node, context, key):
+    if node.kind == 'scalar' and node.text() not in ('read-all', 'write-all', '{}', ''):
+        yield 'error', node.line, f"'permissions' must be read-all, write-all or a mapping, not '{node.text()}'"
+
+
+def check_permission(node, context, key):
+    if key not in VALID_PERMISSIONS:
+        yield 'warning', node.line, f"Unknown permission: {key}"
+    if node.text() not in PERMISSION_LEVELS:
+        yield 'error', node.line, f"Permission '{key}' must be read, write or none, not '{node.text()}'"
 
-    return errors, warnings
 
-def check_action_versions(data):
-    """Check if actions use specific versions (not latest)"""
-    recommendations = []
+def check_job(node, context, key):
+    if node.kind != 'map':
+        yield 'error', node.line, f"Job '{key}' must be a mapping"
+        return
+    if node.get('uses') is not None:
+        return  # reusable workflow call
+    if node.get('runs-on') is None:
+        yield 'error', node.line, f"Job '{key}' missing required 'runs-on' field"
+    steps = node.get('steps')
+    if steps is None:
+        yield 'error', node.line, f"Job '{key}' has neither 'steps' nor 'uses'"
+    elif steps.kind != 'seq':
+        yield 'error', steps.line, f"Job '{key}': 'steps' must be a list"
 
-    if 'jobs' in data and isinstance(data['jobs'], dict):
-        for job_name, job_data in data['jobs'].items():
-            if 'steps' in job_data and isinstance(job_data['steps'], list):
-                for idx, step in enumerate(job_data['steps']):
-                    if isinstance(step, dict) and 'uses' in step:
-                        action = step['uses']
-                        if '@' not in action:
-                            recommendations.append(
-                                f"Job '{job_name}', step {idx}: Action '{action}' should specify a version"
-                            )
 
-    return recommendations
+def check_step(node, context, key):
+    if node.kind != 'map':
+        yield 'error', node.line, f"Step {key + 1} must be a mapping"
+        return
+    if node.get('uses') is None and node.get('run') is None:
+        yield 'error', node.line, f"Step {key + 1} must have either 'uses' or 'run'"
+    if node.get('uses') is not None and node.get('run') is not None:
+        yield 'error', node.line, f"Step {key + 1} can't have both 'uses' and 'run'"
 
-def main():
-    workflow_file = '.github/workflows/deploy.yml'
 
-    if not os.path.exists(workflow_file):
-        print(f"✗ Workflow file not found: {workflow_file}")
-        sys.exit(1)
+def check_uses(node, context, key):
+    action = node.text()
+    if action.startswith(('./', 'docker://')):
+        return
+    if '@' not in action:
+        yield 'warning', node.line, f"Action '{action}' should specify a version (e.g., @v4)"
+        return
+    name, ref = action.split('@', 1)
+    major = re.match(r'v(\d+)', ref)
+    minimum = MINIMUM_ACTION_VERSIONS.get(name.lower())
+    if minimum and major and int(major.group(1)) < minimum:
+        yield 'warning', node.line, f"Using deprecated action '{action}' - use @v{minimum} or later"
+    elif not major and not re.fullmatch(r'[0-9a-f]{40}', ref):
+        yield 'info', node.line, f"Action '{action}' uses a non-standard version reference"
 
-    print(f"Validating GitHub Actions workflow: {workflow_file}")
-    print("=" * 60)
 
-    # Step 1: Validate YAML syntax
-    data = validate_yaml_syntax(workflow_file)
-    if data is None:
-        sys.exit(1)
+def check_run(node, context, key):
+    if _NPM_COMMAND.search(node.text()) and not context['has_package_json']:
+        yield 'error', node.line, "Runs npm but the repository has no package.json"
 
-    # Step 2: Validate GitHub Actions schema
-    errors, warnings = validate_github_actions_schema(data, workflow_file)
 
-    # Step 3: Check action versions
-    recommendations = check_action_versions(data)
+def check_setup_node(node, context, key):
+    if node.text().startswith('actions/setup-node') and not context['has_package_json']:
+        yield 'warning', node.line, "Sets up Node.js but the repository has no package.json"
 
-    # Report results
-    print("\n" + "=" * 60)
-    print("VALIDATION RESULTS")
-    print("=" * 60)
 
+# Tree rules: (rule id, path pattern, check). '*' matches any key or index;
+# each check gets (node, context, last path key) and yields
+# (severity, line, message)
+TREE_RULES = [
+    ('structure', (), check_root),
+    ('pages-concurrency', (), check_deploy_concurrency),
+    ('permissions', ('permissions',), check_permissions),
+    ('permission', ('permissions', '*'), check_permission),
+    ('job', ('jobs', '*'), check_job),
+    ('step', ('jobs', '*', 'steps', '*'), check_step),
+    ('action-version', ('jobs', '*', 'steps', '*', 'uses'), check_uses),
+    ('static-site', ('jobs', '*', 'steps', '*', 'run'), check_run),
+    ('static-site', ('jobs', '*', 'steps', '*', 'uses'), check_setup_node),
+]
+
+# Line rules: (rule id, severity, compiled pattern, message)
+LINE_RULES = [
+    ('tabs', 'error', re.compile(r'^ *\t'), "Tabs are not allowed in YAML indentation, use spaces"),
+    ('indentation', 'warning', re.compile(r'^(?:  )* \S'), "Indentation is not a multiple of 2 spaces"),
+    ('trailing-space', 'info', re.compile(r'\S[ \t]+$'), "Trailing whitespace"),
+]
+
+# Every rule id that can appear in a report, for the SARIF rule table
+RULE_DESCRIPTIONS = {
+    'file': "The workflow file can be read",
+    'syntax': "The workflow is valid YAML",
+    'tabs': "Indentation uses spaces, not tabs",
+    'indentation': "Indentation is a multiple of 2 spaces",
+    'trailing-space': "Lines have no trailing whitespace",
+    'structure': "The workflow has a name, triggers, jobs and permissions",
+    'pages-concurrency': "Pages deployments are serialized with a concurrency group",
+    'permissions': "'permissions' is read-all, write-all or a mapping",
+    'permission': "Each permission is known and set to read, write or none",
+    'job': "Each job has runs-on and steps, or calls a reusable workflow",
+    'step': "Each step has exactly one of uses or run",
+    'action-version': "Actions are pinned to a supported version",
+    'static-site': "No npm or Node.js setup without a package.json",
+}
+
+
+def _compile_rules(rules):
+    """
+    Index tree rules by path length for dispatch during the walk.
+    """
+    table = {}
+    for rule_id, pattern, check in rules:
+        table.setdefault(len(pattern), []).append((rule_id, pattern, check))
+    return table
+
+
+_TREE_DISPATCH = _compile_rules(TREE_RULES)
+
+
+def _walk(node, path=()):
+    """
+    Yield (path, node) for every node, children before their parent, so
+    the root comes last.
+    """
+    if node.kind == 'map':
+        for key, child in node.value.items():
+            yield from _walk(child, path + (key,))
+    elif node.kind == 'seq':
+        for index, child in enumerate(node.value):
+            yield from _walk(child, path + (index,))
+    yield path, node
+
+
+def workflow_summary(root):
+    """
+    Return the workflow's name, triggers and jobs for the report.
+    """
+    on = root.get('on') if root.kind == 'map' else None
+    if on is None:
+        triggers = []
+    elif on.kind == 'map':
+        triggers = list(on.value)
+    elif on.kind == 'seq':
+        triggers = [item.text() for item in on.value]
+    else:
+        triggers = [on.text()]
+    jobs = root.get('jobs') if root.kind == 'map' else None
+    name = root.get('name') if root.kind == 'map' else None
+    return {
+        'name': name.text() if name is not None else None,
+        'triggers': triggers,
+        'jobs': list(jobs.value) if jobs is not None and jobs.kind == 'map' else [],
+    }
+
+
+def validate_text(text, path='<workflow>', repo_root='.'):
+    """
+    Validate workflow text.
+
+    Args:
+        text: Workflow YAML
+        path: File name used in the report
+        repo_root: Repository root, for rules that look at other files
+
+    Returns:
+        Dict with 'path', 'parser', 'issues' (list of dicts with 'rule',
+        'severity', 'line' and 'message', sorted by line), 'summary',
+        'timings' (seconds spent parsing, in the line scan and in each
+        tree rule) and 'cached'
+    """
+    issues = []
+    timings = {}
+
+    def report(rule_id, severity, line, message):
+        issues.append({'rule': rule_id, 'severity': severity, 'line': line, 'message': message})
+
+    def result(parser, summary):
+        issues.sort(key=lambda issue: issue['line'])
+        return {'path': path, 'parser': parser, 'issues': issues, 'summary': summary,
+                'timings': timings, 'cached': False}
+
+    if not text.strip():
+        report('structure', 'error', 1, "Workflow file is empty")
+        return result(None, None)
+
+    started = time.perf_counter()
+    for number, line in enumerate(text.split('\n'), 1):
+        for rule_id, severity, pattern, message in LINE_RULES:
+            if pattern.search(line):
+                report(rule_id, severity, number, message)
+    timings['lines'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        root, parser = parse_workflow(text)
+    except ParseError as e:
+        timings['parse'] = time.perf_counter() - started
+        if not any(issue['rule'] == 'tabs' and issue['line'] == e.line for issue in issues):
+            report('syntax', 'error', e.line, str(e))
+        return result(None, None)
+    timings['parse'] = time.perf_counter() - started
+
+    # 'actions' fills up during the walk; the root rules that read it run
+    # last, since the walk visits the root after everything below it
+    context = {
+        'actions': set(),
+        'has_package_json': os.path.exists(os.path.join(repo_root, 'package.json')),
+    }
+    for node_path, node in _walk(root):
+        if node_path[-1:] == ('uses',) and node.kind == 'scalar':
+            context['actions'].add(node.text().split('@')[0].lower())
+        for rule_id, pattern, check in _TREE_DISPATCH.get(len(node_path), ()):
+            if all(want == '*' or want == got for want, got in zip(pattern, node_path)):
+                key = node_path[-1] if node_path else None
+                started = time.perf_counter()
+                for severity, line, message in check(node, context, key):
+                    report(rule_id, severity, line, message)
+                timings[rule_id] = timings.get(rule_id, 0.0) + time.perf_counter() - started
+
+    return result(parser, workflow_summary(root))
+
+
+def _read_error(path, error):
+    return {'path': path, 'parser': None, 'summary': None, 'timings': {}, 'cached': False,
+            'issues': [{'rule': 'file', 'severity': 'error', 'line': 1, 'message': f"Cannot read file: {error}"}]}
+
+
+_validator_digest = None
+
+
+def validator_digest():
+    """
+    Return the digest of this script, hashed once per process: every
+    cache key depends on it.
+    """
+    global _validator_digest
+    if _validator_digest is None:
+        _validator_digest = file_digest(os.path.abspath(__file__))
+    return _validator_digest
+
+
+class ResultCache(BuildCache):
+    """
+    Validation results of workflow files, keyed by everything that can
+    change them: the file's bytes, RULES_VERSION, the parser in use, this
+    script and whether the repository has a package.json.
+
+    A BuildCache whose entries hold a result instead of an output checksum;
+    use it as a context manager to save it on exit.
+
+    Args:
+        path: Cache location (default .build-cache/workflows.json)
+        enabled: When False, nothing is ever found but new results are
+            still recorded
+    """
+
+    FORMAT = RESULT_CACHE_FORMAT
+
+    def __init__(self, path=RESULT_CACHE_PATH, enabled=True):
+        super().__init__(path, enabled)
+
+    @staticmethod
+    def key(data, repo_root='.'):
+        """
+        Return the cache key for a workflow's bytes.
+        """
+        params = {
+            'rules': RULES_VERSION,
+            'parser': 'yaml' if yaml is not None else 'tokenizer',
+            'has_package_json': os.path.exists(os.path.join(repo_root, 'package.json')),
+            'validator': validator_digest(),
+        }
+        return cache_key(params, data=data)
+
+    def get(self, path, key):
+        """
+        Return the cached result for path if it was produced from key.
+        """
+        if not self.enabled:
+            return None
+        entry = self.entries.get(os.path.normpath(path))
+        if not entry or entry.get('key') != key:
+            return None
+        return dict(entry['result'], path=path, cached=True)
+
+    def record(self, path, key, result):
+        """
+        Remember the result of validating path's contents with key.
+        """
+        self.entries[os.path.normpath(path)] = {'key': key, 'result': result}
+        self._dirty = True
+
+
+def _read_workflow(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def validate_file(path, repo_root='.', cache=None):
+    """
+    Validate one workflow file; see validate_text() for the result.
+
+    Args:
+        cache: Optional ResultCache to look the file up in and record it to
+    """
+    return validate_files([path], jobs=1, repo_root=repo_root, cache=cache)[0]
+
+
+def collect_workflows(paths):
+    """
+    Expand directories into the workflow files they contain.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.yml')) + glob.glob(os.path.join(path, '*.yaml'))))
+        else:
+            files.append(path)
+    return files
+
+
+def validate_files(paths, jobs=None, repo_root='.', cache=None):
+    """
+    Validate several workflow files, in parallel for those not in cache.
+
+    Returns:
+        List of results in the order of paths
+    """
+    if cache is None:
+        cache = ResultCache(enabled=False)
+    results = [None] * len(paths)
+    pending = []
+    for index, path in enumerate(paths):
+        try:
+            data = _read_workflow(path)
+            text = data.decode('utf-8')
+        except (OSError, UnicodeDecodeError) as e:
+            results[index] = _read_error(path, e)
+            continue
+        key = ResultCache.key(data, repo_root)
+        results[index] = cache.get(path, key)
+        if results[index] is None:
+            pending.append((index, path, key, text))
+
+    if len(pending) <= 1 or jobs == 1:
+        fresh = [validate_text(text, path, repo_root) for _, path, _, text in pending]
+    else:
+        # Imported here: multiprocessing is the slowest import, and cached
+        # runs never need it
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            fresh = list(pool.map(validate_text, [item[3] for item in pending], [item[1] for item in pending],
+                                  [repo_root] * len(pending)))
+    for (index, path, key, _), result in zip(pending, fresh):
+        cache.record(path, key, result)
+        results[index] = result
+    return results
+
+
+def print_result(result):
+    """
+    Print one file's result in the human-readable format.
+    """
+    print(f"Validating GitHub Actions workflow: {result['path']}")
+    for issue in result['issues']:
+        print(f"  {SEVERITY_SYMBOLS[issue['severity']]} {result['path']}:{issue['line']}: "
+              f"{issue['message']} [{issue['rule']}]")
+    summary = result['summary']
+    if summary:
+        print(f"  Name: {summary['name'] or '-'}; triggers: {', '.join(map(str, summary['triggers'])) or '-'}; "
+              f"jobs: {', '.join(summary['jobs']) or '-'}")
+    errors = sum(1 for issue in result['issues'] if issue['severity'] == 'error')
+    cached = ' (cached)' if result['cached'] else ''
     if errors:
-        print(f"\n✗ ERRORS ({len(errors)}):")
-        for error in errors:
-            print(f"  - {error}")
-
-    if warnings:
-        print(f"\n⚠ WARNINGS ({len(warnings)}):")
-        for warning in warnings:
-            print(f"  - {warning}")
-
-    if recommendations:
-        print(f"\n💡 RECOMMENDATIONS ({len(recommendations)}):")
-        for rec in recommendations:
-            print(f"  - {rec}")
-
-    if not errors and not warnings:
-        print("\n✓ All checks passed! Workflow is valid.")
-    elif not errors:
-        print("\n✓ No errors found. Workflow is valid (with warnings/recommendations).")
+        print(f"✗ {result['path']}: {errors} error(s){cached}")
+    else:
+        print(f"✓ {result['path']} is valid{cached}")
+
+
+def rule_timings(results):
+    """
+    Total seconds spent in each rule over the freshly validated results.
+    """
+    totals = {}
+    for result in results:
+        if result['cached']:
+            continue
+        for rule_id, seconds in result['timings'].items():
+            totals[rule_id] = totals.get(rule_id, 0.0) + seconds
+    return {rule_id: round(seconds, 6) for rule_id, seconds in sorted(totals.items())}
+
+
+def json_report(results):
+    """
+    Return the results as a JSON-serializable report.
+    """
+    return {
+        'tool': 'validate_workflow',
+        'rules_version': RULES_VERSION,
+        'results': results,
+        'timings': rule_timings(results),
+        'cached': sum(1 for result in results if result['cached']),
+        'errors': sum(1 for result in results for issue in result['issues'] if issue['severity'] == 'error'),
+    }
+
+
+def sarif_report(results):
+    """
+    Return the results as a SARIF 2.1.0 log (one run, one result per issue).
+    """
+    rule_ids = list(RULE_DESCRIPTIONS)
+    findings = []
+    for result in results:
+        for issue in result['issues']:
+            findings.append({
+                'ruleId': issue['rule'],
+                'ruleIndex': rule_ids.index(issue['rule']),
+                'level': SARIF_LEVELS[issue['severity']],
+                'message': {'text': issue['message']},
+                'locations': [{
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': result['path'].replace(os.sep, '/')},
+                        'region': {'startLine': issue['line']},
+                    },
+                }],
+            })
+    return {
+        '$schema': SARIF_SCHEMA,
+        'version': '2.1.0',
+        'runs': [{
+            'tool': {
+                'driver': {
+                    'name': 'validate_workflow',
+                    'version': str(RULES_VERSION),
+                    'rules': [{'id': rule_id, 'shortDescription': {'text': RULE_DESCRIPTIONS[rule_id]}}
+                              for rule_id in rule_ids],
+                },
+            },
+            'results': findings,
+            'properties': {'timings': rule_timings(results)},
+        }],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate GitHub Actions workflow files")
+    parser.add_argument('paths', nargs='*', help=f"workflow files or directories (default {WORKFLOW_DIR})")
+    parser.add_argument('--jobs', type=int, default=None, help="parallel workers (default: one per CPU)")
+    parser.add_argument('--format', choices=('text', 'json', 'sarif'), default='text',
+                        help="report format (default text)")
+    parser.add_argument('--no-cache', action='store_true', help=f"revalidate files found in {RESULT_CACHE_PATH}")
+    args = parser.parse_args(argv)
+
+    files = collect_workflows(args.paths or [WORKFLOW_DIR])
+    if not files:
+        print("✗ No workflow files found", file=sys.stderr)
+        return 1
+
+    with ResultCache(enabled=not args.no_cache) as cache:
+        results = validate_files(files, args.jobs, cache=cache)
+    failed = sum(1 for result in results if any(issue['severity'] == 'error' for issue in result['issues']))
+
+    if args.format == 'json':
+        print(json.dumps(json_report(results), indent=2))
+    elif args.format == 'sarif':
+        print(json.dumps(sarif_report(results), indent=2))
     else:
-        print(f"\n✗ Validation failed with {len(errors)} error(s).")
-        sys.exit(1)
-
-    print("\n" + "=" * 60)
-    print("WORKFLOW SUMMARY")
-    print("=" * 60)
-    if 'name' in data:
-        print(f"Name: {data['name']}")
-    if 'on' in data:
-        print(f"Triggers: {', '.join(data['on'].keys()) if isinstance(data['on'], dict) else data['on']}")
-    if 'jobs' in data:
-        print(f"Jobs: {', '.join(data['jobs'].keys())}")
-    print("=" * 60)
+        for result in results:
+            print_result(result)
+        if len(results) > 1:
+            print(f"{'✗' if failed else '✓'} {len(results) - failed} of {len(results)} workflow(s) valid")
+    return 1 if failed else 0
+
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())